@@ -1,21 +1,27 @@
-import mysql.connector
-from datetime import datetime
 import json
-import os
-from .PDFreader import extract_text_from_pdf, extract_text_from_image
-import anthropic
-import unicodedata
+import logging
+from .llm_cache import cached_llm_call
+from .llm_gateway import get_llm_gateway
+from .loader import insert_into_database as load_menu
+from .pipeline import IngestionError, MenuIngestion, build_pipeline, to_common_schema
 
+logger = logging.getLogger(__name__)
 
-def process_with_anthropic_api(text):
-    try:
-        # Use API key from environment variable
-        api_key = os.getenv('ANTHROPIC_API_KEY')
-        if not api_key:
-            raise ValueError("ANTHROPIC_API_KEY environment variable not set")
+ANTHROPIC_MODEL = "claude-3-sonnet-20240229"
+# Bump whenever the prompt below changes so responses cached for the old prompt are not reused
+PROMPT_VERSION = "schema-tables-v1"
+
+
+def process_with_anthropic_api(text, use_cache=True):
+    return cached_llm_call(
+        ANTHROPIC_MODEL, PROMPT_VERSION, text,
+        lambda: _call_anthropic_api(text),
+        use_cache=use_cache
+    )
 
-        client = anthropic.Anthropic(api_key=api_key)
 
+def _call_anthropic_api(text):
+    try:
         # Constructing the prompt
         prompt = f"""
         Given the following restaurant menu data:
@@ -82,9 +88,9 @@ def process_with_anthropic_api(text):
         - Do not include any additional text or explanation
         """
 
-        # Make the API request using messages method
-        response = client.messages.create(
-            model="claude-3-sonnet-20240229",
+        # Make the API request through the shared gateway
+        response = get_llm_gateway().create(
+            model=ANTHROPIC_MODEL,
             max_tokens=4000,
             messages=[{
                 "role": "user",
@@ -98,169 +104,58 @@ def process_with_anthropic_api(text):
         return structured_data_json
 
     except Exception as e:
-        print(f"Error processing with Anthropic's Claude API: {e}")
+        logger.error("Error processing with Anthropic's Claude API: %s", e)
         return None
 
 
-def normalize_spanish_text(text):
+def structure_menu_text(text):
     """
-    Normalize Spanish text by removing accents and converting to standard characters
-    This method preserves the base character while removing diacritical marks
+    Structure stage for this script: parse Claude's answer, dropping any text around the JSON
     """
-    if isinstance(text, str):
-        # Decompose characters into base character and accent
-        normalized = unicodedata.normalize('NFKD', text)
-        # Keep only the base characters
-        return ''.join(c for c in normalized if not unicodedata.combining(c))
-    return text
+    structured_data_json = process_with_anthropic_api(text)
+    if not structured_data_json:
+        raise ValueError("Failed to process structured data with the Anthropics Claude API.")
 
-
-def clean_structured_data(structured_data):
-    """
-    Clean the structured data by applying accent normalization
-    """
-
-    def deep_normalize(obj):
-        if isinstance(obj, dict):
-            return {k: deep_normalize(v) for k, v in obj.items()}
-        elif isinstance(obj, list):
-            return [deep_normalize(item) for item in obj]
-        elif isinstance(obj, str):
-            return normalize_spanish_text(obj)
-        return obj
-
-    return deep_normalize(structured_data)
+    # Clean the JSON string of extra backticks or formatting
+    structured_data_json = structured_data_json.replace('```json', '').replace('```', '').strip()
+    structured_data_json = '{' + structured_data_json.split('{', 1)[-1]
+    return json.loads(structured_data_json)
 
 
 # Function to insert data into the MySQL database
 def insert_into_database(structured_data):
-    try:
-        # Use database credentials from environment variables
-        conn = mysql.connector.connect(
-            host=os.getenv('DB_HOST', 'localhost'),
-            port=int(os.getenv('DB_PORT', '3306')),
-            user=os.getenv('DB_USER', 'root'),
-            password=os.getenv('DB_PASSWORD'),
-            database=os.getenv('DB_NAME', 'restaurant_menus')
-        )
-        cursor = conn.cursor()
-
-        # Insert Restaurant
-        cursor.execute(
-            "INSERT INTO menu_app_restaurant (name, location) VALUES (%s, %s)",
-            (structured_data.get('restaurant_name', 'Unknown'),
-             structured_data.get('restaurant_location', 'Unknown'))
-        )
-        restaurant_id = cursor.lastrowid
-
-        # Insert Menu
-        cursor.execute(
-            "INSERT INTO menu_app_menu (restaurant_id, version, date) VALUES (%s, %s, %s)",
-            (restaurant_id, 1, datetime.now().date())
-        )
-        menu_id = cursor.lastrowid
-
-        # Ensure a default dietary restriction exists
-        cursor.execute("INSERT IGNORE INTO menu_app_dietaryrestriction (label) VALUES ('No Restriction')")
-        cursor.execute("SELECT restriction_id FROM menu_app_dietaryrestriction WHERE label = 'No Restriction'")
-        default_dietary_id = cursor.fetchone()[0]
-
-        # Insert Menu Sections and Items
-        for section_order, section in enumerate(structured_data.get('menu_sections', []), 1):
-            cursor.execute(
-                "INSERT INTO menu_app_menusection (menu_id, section_name, section_order) VALUES (%s, %s, %s)",
-                (menu_id, section.get('section_name', 'Unknown Section'), section_order)
-            )
-            section_id = cursor.lastrowid
-
-            for item in section.get('items', []):
-                cursor.execute(
-                    "INSERT INTO menu_app_menuitem (section_id, name, description, price, dietary_restriction_id) VALUES (%s, %s, %s, %s, %s)",
-                    (section_id,
-                     item.get('name', 'Unknown Item'),
-                     item.get('description'),
-                     item.get('price', 0.00),
-                     default_dietary_id)
-                )
-
-        # Insert Processing Log
-        cursor.execute(
-            "INSERT INTO menu_app_processinglog (menu_id, status, error_message) VALUES (%s, %s, %s)",
-            (menu_id, 'successful', None)
-        )
-
-        conn.commit()
-        print("Data successfully inserted into database")
-    except Exception as e:
-        print(f"Database insertion error: {e}")
-        conn.rollback()
-    finally:
-        if conn.is_connected():
-            cursor.close()
-            conn.close()
+    """
+    Load this script's restaurant_name/restaurant_location output through the shared loader
+    """
+    return load_menu(to_common_schema(structured_data))
 
 
 # Main function to process the PDF and integrate with the database
 def main():
     pdf_file_path = r"C:\Users\User\Downloads\PETRUS-PRESTIGE-211024.pdf"
-    image_credentials_path = r"C:\Users\User\Downloads\database-443218-8d1a699e81ad.json"
-
-    # Extract text from the PDF
-    extracted_text = extract_text_from_pdf(pdf_file_path)
-
-    if not extracted_text:
-        print("No text extracted from the PDF. Attempting to extract text from an image.")
-        extracted_text = extract_text_from_image("path_to_image.jpg", image_credentials_path)
-
-    if extracted_text:
-        print("Extracted Text:")
-        print(extracted_text)
-
-        # Process the text using the Anthropics Claude API
-        structured_data_json = process_with_anthropic_api(extracted_text)
-
-        if structured_data_json:
-            try:
-                # Clean the JSON string of extra backticks or formatting
-                structured_data_json = structured_data_json.strip('`')
-                structured_data_json = structured_data_json.replace('```json', '').replace('```', '').strip()
-                structured_data_json = structured_data_json.split('{', 1)[-1]
-                structured_data_json = '{' + structured_data_json
-
-                # Debug: Check what the cleaned string looks like
-                print("Cleaned JSON String:")
-                print(structured_data_json)
-
-                # Parse the JSON string
-                structured_data = json.loads(structured_data_json)
-                print("Successfully parsed JSON:")
-                print(json.dumps(structured_data, indent=2))
-                cleaned_data = clean_structured_data(structured_data)
-
-                # Apply normalization to clean accents
-                if "MenuItems" in structured_data:
-                    for item in structured_data["MenuItems"]:
-                        for i in range(len(item)):
-                            if isinstance(item[i], str):
-                                item[i] = normalize_spanish_text(item[i])
-
-                # Save JSON to a file
-                with open("normalized_menu_data.json", "w", encoding="utf-8") as f:
-                    json.dump(cleaned_data, f, indent=4, ensure_ascii=False)
-
-                # Insert structured data into the database
-                insert_into_database(structured_data)
-            except json.JSONDecodeError as e:
-                print("JSON Decode Error:")
-                print(f"Error details: {e}")
-                print("Problematic JSON string:")
-                print(structured_data_json)
-        else:
-            print("Failed to process structured data with the Anthropics Claude API.")
-
-    else:
-        print("No text could be extracted from the PDF or image.")
+
+    # Extract -> structure -> normalize -> validate -> load, the same pipeline the web upload uses
+    ingestion = MenuIngestion(source=pdf_file_path)
+    try:
+        build_pipeline(structure_menu_text).run(ingestion)
+    except IngestionError as e:
+        print(f"Processing failed at {e.stage}: {e}")
+        return
+    except json.JSONDecodeError as e:
+        print("JSON Decode Error:")
+        print(f"Error details: {e}")
+        return
+    except ValueError as e:
+        print(e)
+        return
+
+    # Save JSON to a file
+    with open("normalized_menu_data.json", "w", encoding="utf-8") as f:
+        json.dump(ingestion.structured, f, indent=4, ensure_ascii=False)
+
+    print(f"Menu {ingestion.menu_id} loaded; stage timings: "
+          + ", ".join(f"{name} {seconds:.3f}s" for name, seconds in ingestion.timings.items()))
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
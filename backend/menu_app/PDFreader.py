@@ -1,60 +1,146 @@
+import logging
 import os
-from typing import Optional
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple, Union
 import fitz  # PyMuPDF
 
+from .logging_utils import Payload
 
-def extract_text_from_pdf(pdf_file_path: str) -> Optional[str]:
+logger = logging.getLogger(__name__)
+
+PdfSource = Union[str, bytes]
+
+# Below this many pages extraction stays serial when workers is not given explicitly
+PARALLEL_MIN_PAGES = int(os.getenv('PDF_PARALLEL_MIN_PAGES', '16'))
+
+
+def open_pdf(pdf_source: PdfSource) -> "fitz.Document":
     """
-    Extract text from a PDF file using PyMuPDF only.
-    Returns a single string with page texts separated by blank lines, or None on error/empty.
+    Open a PDF given either a file path or the raw PDF bytes (no disk round-trip).
+    """
+    if isinstance(pdf_source, (bytes, bytearray, memoryview)):
+        return fitz.open(stream=bytes(pdf_source), filetype="pdf")
+    return fitz.open(pdf_source)
+
+
+def _page_ranges(page_count: int, parts: int) -> List[Tuple[int, int]]:
+    """
+    Split [0, page_count) into at most `parts` contiguous (start, stop) ranges of near-equal size.
+    """
+    parts = max(1, min(parts, page_count))
+    size, extra = divmod(page_count, parts)
+    ranges = []
+    start = 0
+    for part in range(parts):
+        stop = start + size + (1 if part < extra else 0)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
+
+def _extract_page_range(pdf_source: PdfSource, start: int, stop: int) -> List[str]:
+    """
+    Extract pages [start, stop). Runs in a worker process, which opens its own document:
+    fitz documents cannot be shared across processes.
     """
+    doc = open_pdf(pdf_source)
     try:
-        if not os.path.exists(pdf_file_path):
-            print(f"[PDF] File not found: {pdf_file_path}")
-            return None
+        return [doc.load_page(page_num).get_text("text").strip() for page_num in range(start, stop)]
+    finally:
+        doc.close()
+
 
-        print(f"[PDF] Opening: {pdf_file_path}")
-        doc = fitz.open(pdf_file_path)
+def _resolve_workers(page_count: int, workers: Optional[int]) -> int:
+    """
+    workers=None picks automatically: serial below PDF_PARALLEL_MIN_PAGES pages (a process pool
+    costs more than it saves on short menus), otherwise one process per CPU.
+    """
+    if workers is None:
+        if page_count < PARALLEL_MIN_PAGES:
+            return 1
+        workers = os.cpu_count() or 1
+    return max(1, min(workers, page_count))
+
+
+def iter_pdf_pages(pdf_source: PdfSource, workers: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (page_number, text) for every page, in page order, as pages are extracted.
+    With more than one worker, page ranges are extracted in parallel worker processes and
+    each range is yielded as soon as it and every range before it are done.
+    Raises fitz errors for unreadable PDFs.
+    """
+    doc = open_pdf(pdf_source)
+    page_count = doc.page_count
+    workers = _resolve_workers(page_count, workers)
+
+    if workers <= 1:
         try:
-            pages = []
-            for page_num in range(doc.page_count):
-                page = doc.load_page(page_num)
-                page_text = page.get_text("text").strip()
-                if page_text:
-                    pages.append(page_text)
-
-            combined = "\n\n".join(pages).strip()
-            if not combined:
-                print("[PDF] No extractable text found (might be scanned images).")
-                return None
-
-            # Debug slice
-            print(f"[PDF] Extracted length: {len(combined)}")
-            print(f"[PDF] Preview: {combined[:200]!r}")
-            return combined
+            for page_num in range(page_count):
+                yield page_num, doc.load_page(page_num).get_text("text").strip()
         finally:
             doc.close()
+        return
+
+    doc.close()
+    ranges = _page_ranges(page_count, workers)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_extract_page_range, pdf_source, start, stop) for start, stop in ranges]
+        for (start, _), future in zip(ranges, futures):
+            for offset, page_text in enumerate(future.result()):
+                yield start + offset, page_text
+
+
+def extract_text_from_pdf(pdf_source: PdfSource, workers: Optional[int] = None) -> Optional[str]:
+    """
+    Extract text from a PDF file path or in-memory PDF bytes using PyMuPDF only.
+    Returns a single string with page texts separated by blank lines, or None on error/empty.
+    Large PDFs are extracted page-parallel; pass workers=1 to force a serial walk
+    (e.g. when already running inside a worker process).
+    """
+    try:
+        if isinstance(pdf_source, str) and not os.path.exists(pdf_source):
+            logger.warning("PDF not found: %s", pdf_source)
+            return None
+
+        logger.debug("Opening PDF: %s", pdf_source if isinstance(pdf_source, str) else f"<{len(pdf_source)} bytes>")
+        pages = [page_text for _, page_text in iter_pdf_pages(pdf_source, workers) if page_text]
+
+        combined = "\n\n".join(pages).strip()
+        if not combined:
+            logger.info("No extractable text in PDF (might be scanned images)")
+            return None
+
+        logger.debug("Extracted PDF text: chars=%d pages=%d text=%s", len(combined), len(pages), Payload(combined))
+        return combined
 
     except fitz.FileDataError as e:
-        print(f"[PDF] Invalid/corrupted PDF: {e}")
+        logger.warning("Invalid or corrupted PDF: %s", e)
         return None
     except Exception as e:
-        print(f"[PDF] Unexpected error: {type(e).__name__}: {e}")
+        logger.exception("Unexpected error extracting PDF text")
         return None
 
 
-def extract_text_from_image(image_path: str) -> Optional[str]:
+def extract_text_from_image(image_path: PdfSource) -> Optional[str]:
     """
-    Placeholder for image OCR. Google Vision removed to keep the project light.
-    - Returns None, but never raises due to missing OCR libs.
-    - If you later add OCR (e.g., Tesseract or Google Vision), implement here.
+    OCR fallback for scanned, image-only PDFs (file path or in-memory bytes), see menu_app.ocr.
+    - Returns None when nothing could be read, and never raises due to missing OCR libs
+      (pytesseract and the tesseract binary are optional).
     """
-    if not os.path.exists(image_path):
-        print(f"[IMG] File not found: {image_path}")
+    if isinstance(image_path, str) and not os.path.exists(image_path):
+        logger.warning("PDF not found for OCR: %s", image_path)
         return None
 
-    print("[IMG] OCR disabled in this build (no external OCR dependency).")
-    return None
+    try:
+        # Imported here: OCR needs Django settings, plain text extraction does not
+        from .ocr import ocr_pdf
+        return ocr_pdf(image_path)
+    except fitz.FileDataError as e:
+        logger.warning("Invalid or corrupted PDF for OCR: %s", e)
+        return None
+    except Exception as e:
+        logger.exception("OCR failed")
+        return None
 
 
 def save_text_to_file(text: Optional[str], output_file_path: str) -> bool:
@@ -63,14 +149,14 @@ def save_text_to_file(text: Optional[str], output_file_path: str) -> bool:
     """
     try:
         if not text:
-            print("[SAVE] No text to save.")
+            logger.info("No text to save")
             return False
 
         os.makedirs(os.path.dirname(output_file_path) or ".", exist_ok=True)
         with open(output_file_path, "w", encoding="utf-8") as f:
             f.write(text)
-        print(f"[SAVE] Wrote text to: {output_file_path}")
+        logger.info("Wrote text to %s", output_file_path)
         return True
     except Exception as e:
-        print(f"[SAVE] Error: {type(e).__name__}: {e}")
+        logger.exception("Could not save text to %s", output_file_path)
         return False
@@ -0,0 +1,115 @@
+import logging
+from collections import Counter
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+
+from .analytics_cache import invalidate_analytics
+from .models import Menu, MenuDietaryStats, MenuItem, MenuStats
+
+logger = logging.getLogger(__name__)
+
+CENTS = Decimal('0.01')
+
+
+class MenuStatsAccumulator:
+    """
+    Running aggregates of the items written for one menu. The loaders feed every batch they
+    insert through add() and call save() in the same transaction, so the summary tables are
+    maintained without reading the items back.
+    """
+
+    def __init__(self):
+        self.item_count = 0
+        self.price_sum = Decimal('0')
+        self.min_price = None
+        self.max_price = None
+        self.dietary_counts = Counter()
+
+    def add(self, items):
+        for item in items:
+            # Rounded like the DecimalField the price is stored in
+            price = Decimal(str(item.price)).quantize(CENTS)
+            self.item_count += 1
+            self.price_sum += price
+            self.min_price = price if self.min_price is None else min(self.min_price, price)
+            self.max_price = price if self.max_price is None else max(self.max_price, price)
+            self.dietary_counts[item.dietary_restriction_id] += 1
+
+    def save(self, menu):
+        MenuStats.objects.create(
+            menu=menu, restaurant_id=menu.restaurant_id, item_count=self.item_count,
+            price_sum=self.price_sum, min_price=self.min_price, max_price=self.max_price
+        )
+        MenuDietaryStats.objects.bulk_create([
+            MenuDietaryStats(menu=menu, dietary_restriction_id=restriction_id, item_count=count)
+            for restriction_id, count in self.dietary_counts.items()
+        ])
+        # Bulk inserts send no model signals; cached analytics are retired when the load commits
+        invalidate_analytics()
+
+
+def _build_stats(menu_ids=None):
+    """
+    Aggregate the items of menu_ids (every menu when None) into unsaved stats rows
+    """
+    menus = Menu.objects.all() if menu_ids is None else Menu.objects.filter(menu_id__in=menu_ids)
+    items = MenuItem.objects.all() if menu_ids is None else MenuItem.objects.filter(section__menu_id__in=menu_ids)
+
+    totals = {
+        row['section__menu_id']: row
+        for row in items.values('section__menu_id').annotate(
+            item_count=Count('item_id'), price_sum=Sum('price'), min_price=Min('price'), max_price=Max('price')
+        ).order_by()
+    }
+    stats = [
+        MenuStats(
+            menu_id=menu_id, restaurant_id=restaurant_id,
+            item_count=totals.get(menu_id, {}).get('item_count', 0),
+            price_sum=totals.get(menu_id, {}).get('price_sum') or 0,
+            min_price=totals.get(menu_id, {}).get('min_price'),
+            max_price=totals.get(menu_id, {}).get('max_price'),
+        )
+        for menu_id, restaurant_id in menus.values_list('menu_id', 'restaurant_id')
+    ]
+    dietary_stats = [
+        MenuDietaryStats(menu_id=row['section__menu_id'], dietary_restriction_id=row['dietary_restriction_id'],
+                         item_count=row['item_count'])
+        for row in items.values('section__menu_id', 'dietary_restriction_id').annotate(
+            item_count=Count('item_id')
+        ).order_by()
+    ]
+    return stats, dietary_stats
+
+
+def refresh_menu_stats(menu_ids):
+    """
+    Recompute the summary rows of the given menus, e.g. after their items were edited through the API or admin
+    """
+    menu_ids = [menu_id for menu_id in set(menu_ids) if menu_id is not None]
+    if not menu_ids:
+        return
+    with transaction.atomic():
+        MenuStats.objects.filter(menu_id__in=menu_ids).delete()
+        MenuDietaryStats.objects.filter(menu_id__in=menu_ids).delete()
+        stats, dietary_stats = _build_stats(menu_ids)
+        MenuStats.objects.bulk_create(stats)
+        MenuDietaryStats.objects.bulk_create(dietary_stats)
+        invalidate_analytics()
+
+
+def rebuild_analytics(batch_size=1000):
+    """
+    Rebuild every summary row from the menu items in one transaction; returns (menus, dietary rows)
+    """
+    with transaction.atomic():
+        MenuDietaryStats.objects.all().delete()
+        MenuStats.objects.all().delete()
+        stats, dietary_stats = _build_stats()
+        MenuStats.objects.bulk_create(stats, batch_size=batch_size)
+        MenuDietaryStats.objects.bulk_create(dietary_stats, batch_size=batch_size)
+        invalidate_analytics()
+    logger.info("Rebuilt analytics: menus=%d dietary_rows=%d", len(stats), len(dietary_stats))
+    return len(stats), len(dietary_stats)
+
@@ -0,0 +1,100 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.db.models import F
+
+from .models import AnalyticsVersion
+from .views_queries import (
+    get_menu_items_per_restaurant,
+    get_dietary_restrictions_distribution,
+    get_price_analysis
+)
+
+# settings.CACHES alias for the results. The version they are keyed by lives in the database, so every
+# process sees a bump; a cache shared by the processes (file, redis) also shares the computed results
+ANALYTICS_CACHE_ALIAS = 'analytics'
+VERSION_ROW_ID = 1
+
+
+def _cache():
+    return caches[ANALYTICS_CACHE_ALIAS]
+
+
+def analytics_version():
+    """
+    Current version of the analytics data
+    """
+    version = AnalyticsVersion.objects.filter(pk=VERSION_ROW_ID).values_list('version', flat=True).first()
+    if version is None:
+        # Seeded from the clock so a recreated row never reissues a version clients still hold
+        version = AnalyticsVersion.objects.get_or_create(
+            pk=VERSION_ROW_ID, defaults={'version': time.time_ns()}
+        )[0].version
+    return version
+
+
+def bump_analytics_version():
+    # A single UPDATE, so concurrent bumps never overwrite each other; a missing row is seeded on the next read
+    AnalyticsVersion.objects.filter(pk=VERSION_ROW_ID).update(version=F('version') + 1)
+
+
+def invalidate_analytics(using=None):
+    """
+    Retire every cached result once the current transaction commits (immediately outside one),
+    so a reader never caches data a rolled back load was about to change
+    """
+    transaction.on_commit(bump_analytics_version, using=using)
+
+
+def analytics_etag(request=None):
+    return f'analytics-{analytics_version()}'
+
+
+ANALYTICS_QUERIES = {
+    'menu_items_per_restaurant': get_menu_items_per_restaurant,
+    'dietary_restrictions': get_dietary_restrictions_distribution,
+    'price_analysis': get_price_analysis,
+}
+
+
+def _run_on_own_connection(query, all_versions):
+    try:
+        return query(all_versions)
+    finally:
+        # Each pool thread opened its own connection; closing hands it back to the pool (pooled_mysql)
+        connection.close()
+
+
+def run_analytics_queries(all_versions=False):
+    """
+    Run the analytics queries, concurrently on separate connections when
+    settings.ANALYTICS_QUERY_WORKERS > 1, so a miss costs the slowest query rather than the sum
+    """
+    workers = min(getattr(settings, 'ANALYTICS_QUERY_WORKERS', 1), len(ANALYTICS_QUERIES))
+    # Other connections cannot see this transaction's uncommitted rows; stay on it inside one
+    if workers <= 1 or connection.in_atomic_block:
+        return {name: query(all_versions) for name, query in ANALYTICS_QUERIES.items()}
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            name: executor.submit(_run_on_own_connection, query, all_versions)
+            for name, query in ANALYTICS_QUERIES.items()
+        }
+        return {name: future.result() for name, future in futures.items()}
+
+
+def get_analytics(all_versions=False):
+    """
+    The analytics endpoint's payload, computed at most once per data version
+    """
+    cache = _cache()
+    version = analytics_version()
+    key = f"menu-analytics:v{version}:{'all' if all_versions else 'current'}"
+    analytics = cache.get(key)
+    if analytics is None:
+        analytics = run_analytics_queries(all_versions)
+        cache.set(key, analytics)
+    return analytics
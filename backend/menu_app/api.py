@@ -1,30 +1,79 @@
-from rest_framework import viewsets
-from rest_framework.decorators import api_view
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from rest_framework import filters, viewsets
+from django.shortcuts import get_object_or_404
+from rest_framework.decorators import action, api_view
 from rest_framework.response import Response
-from .models import Restaurant, Menu, MenuItem
-from .serializers import RestaurantSerializer, MenuSerializer, MenuItemSerializer
-from .views_queries import (
-    get_menu_items_per_restaurant,
-    get_dietary_restrictions_distribution,
-    get_price_analysis
-)
+from .models import Restaurant, Menu, MenuItem, MenuItemChange
+from .filters import all_versions_requested, filter_item_changes, filter_menu_items, filter_menus
+from .serializers import RestaurantSerializer, MenuSerializer, MenuItemSerializer, MenuItemChangeSerializer
+from .analytics_cache import analytics_etag, get_analytics
+from .dedup import get_dedup_stats
+from .llm_cache import get_llm_cache_stats
+from .llm_gateway import get_llm_gateway_stats
+from .loader import get_loader_stats
 
+# The nested serializers walk restaurant -> menus -> sections -> items; prefetching each level
+# keeps a list to one query per level however many rows it returns. Foreign keys are emitted as
+# primary keys only, so nothing is joined in for them
 class RestaurantViewSet(viewsets.ModelViewSet):
-    queryset = Restaurant.objects.all()
+    queryset = Restaurant.objects.prefetch_related('menus__sections__items')
     serializer_class = RestaurantSerializer
 
+    @action(detail=True, url_path='price-history')
+    def price_history(self, request, pk=None):
+        # ?section=&name=; one row per added, removed or repriced item, in load order
+        restaurant = get_object_or_404(Restaurant.objects.only('restaurant_id'), pk=pk)
+        changes = filter_item_changes(
+            MenuItemChange.objects.filter(restaurant=restaurant).select_related('menu'), request.query_params
+        )
+        page = self.paginate_queryset(changes)
+        return self.get_paginated_response(MenuItemChangeSerializer(page, many=True).data)
+
 class MenuViewSet(viewsets.ModelViewSet):
-    queryset = Menu.objects.all()
+    queryset = Menu.objects.prefetch_related('sections__items')
     serializer_class = MenuSerializer
+    filter_backends = [filters.OrderingFilter]
+    ordering_fields = ['pk', 'version', 'date']
+
+    def get_queryset(self):
+        # ?restaurant=&version=&all_versions=; lists show current menus only, detail any version
+        return filter_menus(super().get_queryset(), self.request.query_params, current_only=self.action == 'list')
+
+    @action(detail=True)
+    def changes(self, request, pk=None):
+        # Stored at load time against the restaurant's previous version; the first version lists every item as added
+        menu = get_object_or_404(Menu.objects.only('menu_id', 'version'), pk=pk)
+        diff = {kind: [] for kind in (MenuItemChange.KIND_ADDED, MenuItemChange.KIND_REMOVED,
+                                      MenuItemChange.KIND_REPRICED)}
+        for change in MenuItemChangeSerializer(menu.item_changes.select_related('menu'), many=True).data:
+            diff[change['kind']].append(change)
+        return Response({'menu': menu.menu_id, 'version': menu.version, **diff})
 
 class MenuItemViewSet(viewsets.ModelViewSet):
     queryset = MenuItem.objects.all()
     serializer_class = MenuItemSerializer
+    # ?ordering=price or name is also used as the pagination cursor
+    filter_backends = [filters.OrderingFilter]
+    ordering_fields = ['pk', 'price', 'name']
 
+    def get_queryset(self):
+        # ?min_price=&max_price=&dietary_restriction=&section=&name=&menu=&version=&restaurant=
+        return filter_menu_items(super().get_queryset(), self.request.query_params)
+
+# Clients revalidate with If-None-Match; an unchanged data version costs one cache lookup and a 304
+@cache_control(no_cache=True)
+@condition(etag_func=analytics_etag)
 @api_view(['GET'])
 def analytics_views(request):
+    # ?all_versions=1 aggregates every loaded version instead of each restaurant's current menu
+    return Response(get_analytics(all_versions_requested(request.query_params)))
+
+@api_view(['GET'])
+def ingestion_stats(request):
     return Response({
-        'menu_items_per_restaurant': get_menu_items_per_restaurant(),
-        'dietary_restrictions': get_dietary_restrictions_distribution(),
-        'price_analysis': get_price_analysis()
-    })
\ No newline at end of file
+        'dedup': get_dedup_stats(),
+        'llm_response_cache': get_llm_cache_stats(),
+        'loader': get_loader_stats(),
+        'llm_gateway': get_llm_gateway_stats()
+    })
@@ -1,10 +1,13 @@
-import fitz  # PyMuPDF
 import json
 import re
-import time
 from typing import Dict, Any
 import anthropic
-from django.conf import settings
+from .llm_cache import cached_llm_call
+from .llm_gateway import get_llm_gateway
+from .metrics import span
+from .chunking import structure_in_chunks
+from .PDFreader import iter_pdf_pages
+from .pipeline import MenuIngestion, build_pipeline
 
 class ClaudeError(Exception):
     """Custom exception for Anthropic API related errors"""
@@ -12,21 +15,17 @@ class ClaudeError(Exception):
 
 def parse_pdf(pdf_file_path: str) -> str:
     """
-    Extract text from a PDF file using PyMuPDF.
+    Extract text from a PDF file using PyMuPDF (page-parallel for large PDFs).
     """
     try:
-        doc = fitz.open(pdf_file_path)
-        pdf_text = ""
-        for page in doc:
-            pdf_text += page.get_text("text")
-        doc.close()  # Properly close the document
-        return pdf_text.strip()
+        return "\n\n".join(page_text for _, page_text in iter_pdf_pages(pdf_file_path) if page_text)
     except Exception as e:
         raise ClaudeError(f"Failed to extract text from PDF: {str(e)}")
 
-def extract_json_from_text(text: str) -> Dict[str, Any]:
+def extract_json_from_text(text: str, strict: bool = False) -> Dict[str, Any]:
     """
-    Attempt to extract JSON from text using multiple methods
+    Attempt to extract JSON from text using multiple methods.
+    With strict, text without JSON raises ClaudeError instead of returning a basic structure.
     """
     # Try standard JSON parsing first
     try:
@@ -40,6 +39,9 @@ def extract_json_from_text(text: str) -> Dict[str, Any]:
             except json.JSONDecodeError:
                 pass
         
+        if strict:
+            raise ClaudeError("Claude's response contained no JSON")
+
         # If all else fails, create a basic structure
         return {
             "restaurant_name": "Unknown Restaurant",
@@ -48,26 +50,50 @@ def extract_json_from_text(text: str) -> Dict[str, Any]:
             "raw_text": text
         }
 
-def get_claude_response(pdf_text: str, max_retries: int = 3) -> Dict[str, Any]:
+CLAUDE_MODEL = "claude-3-haiku-20240307"
+# Bump whenever the prompt below changes so responses cached for the old prompt are not reused
+PROMPT_VERSION = "menu-json-v1"
+
+
+def get_claude_response(pdf_text: str, max_retries: int = 3, use_cache: bool = True) -> Dict[str, Any]:
     """
     Get response from Claude API with retry mechanism and error handling.
+    Long menus are structured in concurrent chunks and merged; identical requests are
+    served from the LLM response cache.
+    """
+    def structure_chunk(chunk):
+        # A response is only cached once it parses, so a malformed answer is asked for again on retry
+        return cached_llm_call(
+            CLAUDE_MODEL, PROMPT_VERSION, chunk,
+            lambda: _request_claude_response(chunk, max_retries),
+            use_cache=use_cache,
+            parse=parse_claude_response
+        )
+
+    return structure_in_chunks(pdf_text, structure_chunk)
+
+
+def parse_claude_response(response_text: str) -> Dict[str, Any]:
+    with span('parse'):
+        return extract_json_from_text(response_text, strict=True)
+
+
+def _request_claude_response(pdf_text: str, max_retries: int) -> str:
     """
-    # Verify API key
-    api_key = getattr(settings, 'ANTHROPIC_API_KEY', None)
-    if not api_key:
-        raise ClaudeError("Anthropic API key is not configured in settings")
-
-    for attempt in range(max_retries):
-        try:
-            client = anthropic.Anthropic(api_key=api_key)
-            response = client.messages.create(
-                model="claude-3-haiku-20240307",
-                max_tokens=2000,
-                system="You are a menu parsing assistant. Extract menu information into structured JSON data.",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": f"""Carefully extract menu information from this text and return a structured JSON:
+    Call Claude and return the raw response text.
+    """
+    # One shared client for every call; the gateway handles rate limits and jittered retries
+    # (max_retries counts attempts here, the gateway counts retries after the first)
+    try:
+        response = get_llm_gateway().create(
+            max_retries=max(0, max_retries - 1),
+            model=CLAUDE_MODEL,
+            max_tokens=2000,
+            system="You are a menu parsing assistant. Extract menu information into structured JSON data.",
+            messages=[
+                {
+                    "role": "user",
+                    "content": f"""Carefully extract menu information from this text and return a structured JSON:
 
 {pdf_text}
 
@@ -90,37 +116,29 @@ Required JSON format:
     ]
 }}
 """
-                    }
-                ]
-            )
-            
-            # Extract content from Claude's response
-            content = response.content[0].text
-            
-            # Extract and parse JSON
-            return extract_json_from_text(content)
-        
-        except anthropic.APIError as e:
-            if e.status_code == 529 and attempt < max_retries - 1:
-                time.sleep(2 ** attempt)  # Exponential backoff
-            else:
-                raise ClaudeError(f"Claude API error: {str(e)}")
-        except Exception as e:
-            raise ClaudeError(f"Failed to communicate with Anthropic API: {str(e)}")
+                }
+            ]
+        )
+
+        # Extract content from Claude's response
+        return response.content[0].text
+
+    except anthropic.APIError as e:
+        raise ClaudeError(f"Claude API error: {str(e)}")
+    except Exception as e:
+        raise ClaudeError(f"Failed to communicate with Anthropic API: {str(e)}")
 
 def process_menu_pdf(pdf_file_path: str) -> Dict[str, Any]:
     """
-    Process the menu PDF and return structured data.
+    Process the menu PDF and return structured data in the shared loader schema
+    (extract -> structure -> normalize -> validate; nothing is written to the database).
     """
     try:
-        # Extract text from PDF
-        pdf_text = parse_pdf(pdf_file_path)
-        
-        if not pdf_text:
-            raise ClaudeError("No text could be extracted from the PDF")
+        ingestion = MenuIngestion(source=pdf_file_path)
+        build_pipeline(get_claude_response, extract=parse_pdf, fallback=None).run(
+            ingestion, only=('extract', 'structure', 'normalize', 'validate')
+        )
+        return ingestion.structured
 
-        # Get and return the structured data
-        return get_claude_response(pdf_text)
-        
     except Exception as e:
-        raise ClaudeError(f"Menu processing failed: {str(e)}")
\ No newline at end of file
+        raise ClaudeError(f"Menu processing failed: {str(e)}")
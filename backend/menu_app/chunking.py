@@ -0,0 +1,105 @@
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def split_menu_text(text, max_chars):
+    """
+    Split extracted menu text into chunks of at most max_chars characters.
+    Chunks break on blank lines (page and section boundaries from extract_text_from_pdf) and
+    only fall back to line boundaries for a single block that is longer than max_chars.
+    """
+    chunks = []
+    current = []
+    current_len = 0
+
+    def flush():
+        nonlocal current, current_len
+        if current:
+            chunks.append('\n\n'.join(current))
+        current, current_len = [], 0
+
+    for block in (b.strip() for b in text.split('\n\n')):
+        if not block:
+            continue
+
+        if len(block) > max_chars:
+            flush()
+            lines = []
+            lines_len = 0
+            for line in block.split('\n'):
+                if lines and lines_len + len(line) + 1 > max_chars:
+                    chunks.append('\n'.join(lines))
+                    lines, lines_len = [], 0
+                lines.append(line)
+                lines_len += len(line) + 1
+            if lines:
+                chunks.append('\n'.join(lines))
+            continue
+
+        if current and current_len + len(block) + 2 > max_chars:
+            flush()
+        current.append(block)
+        current_len += len(block) + 2
+
+    flush()
+    return chunks
+
+
+def merge_structured_chunks(results):
+    """
+    Merge per-chunk structured menus, in chunk order, into one menu.
+    - Top-level fields (restaurant, restaurant_name, ...) take the first non-empty value.
+    - Sections keep their order of appearance; a section that continues across a chunk
+      boundary (same name as the previous section) is joined rather than duplicated.
+    - Every merged section gets its final section_order.
+    """
+    merged = {}
+    sections = []
+
+    for result in results:
+        if not isinstance(result, dict):
+            continue
+        for key, value in result.items():
+            if key == 'menu_sections':
+                continue
+            if value and not merged.get(key):
+                merged[key] = value
+
+        for section in result.get('menu_sections') or []:
+            name = (section.get('section_name') or '').strip()
+            if sections and name and name.casefold() == (sections[-1].get('section_name') or '').strip().casefold():
+                sections[-1]['items'].extend(section.get('items') or [])
+            else:
+                sections.append({**section, 'items': list(section.get('items') or [])})
+
+    for section_order, section in enumerate(sections, 1):
+        section['section_order'] = section_order
+    merged['menu_sections'] = sections
+    return merged
+
+
+def structure_in_chunks(text, structure_chunk, max_chars=None, max_workers=None):
+    """
+    Run structure_chunk(text) -> dict over the text, splitting it first when it is longer than
+    max_chars. Chunks are structured concurrently on a bounded thread pool and merged in order.
+    """
+    max_chars = max_chars or settings.LLM_CHUNK_MAX_CHARS
+    max_workers = max_workers or settings.LLM_MAX_CONCURRENCY
+
+    if len(text) <= max_chars:
+        return structure_chunk(text)
+
+    chunks = split_menu_text(text, max_chars)
+    logger.info("Structuring chunks=%d max_concurrency=%d", len(chunks), max_workers)
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+        # map() yields results in submission order, which keeps the merge deterministic.
+        # Each chunk runs in its own copy of the caller's context so its spans and tokens
+        # are attributed to the ingestion being collected (see metrics.collect)
+        contexts = [contextvars.copy_context() for _ in chunks]
+        results = list(executor.map(lambda context, chunk: context.run(structure_chunk, chunk), contexts, chunks))
+    return merge_structured_chunks(results)
@@ -0,0 +1,92 @@
+import hashlib
+import re
+import threading
+import unicodedata
+
+from django.db.models import F
+
+from .models import ProcessingLog
+
+_stats_lock = threading.Lock()
+_stats = {
+    'pdf_hits': 0,
+    'pdf_misses': 0,
+    'text_hits': 0,
+    'text_misses': 0,
+}
+
+
+def upload_sha256(pdf_file):
+    """
+    SHA-256 of an uploaded file, computed chunk by chunk so large uploads are never fully buffered
+    """
+    digest = hashlib.sha256()
+    for chunk in pdf_file.chunks():
+        digest.update(chunk)
+    pdf_file.seek(0)
+    return digest.hexdigest()
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def normalize_text_for_hash(text):
+    """
+    Normalize extracted text so that re-exports of the same menu hash identically:
+    accents stripped, case folded and all whitespace runs collapsed to one space
+    """
+    decomposed = unicodedata.normalize('NFKD', text)
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return re.sub(r'\s+', ' ', stripped).strip().casefold()
+
+
+def text_sha256(text):
+    return hashlib.sha256(normalize_text_for_hash(text).encode('utf-8')).hexdigest()
+
+
+def find_duplicate(pdf_sha256=None, text_sha256=None, exclude_log_id=None):
+    """
+    Return the most recent successful ProcessingLog whose PDF or text hash matches, or None.
+    Only a menu that is still its restaurant's current version counts: a restaurant going back to
+    an earlier card is loaded again as a new version. Updates the hit/miss counters as a side effect.
+    """
+    if pdf_sha256:
+        lookup, kind = {'pdf_sha256': pdf_sha256}, 'pdf'
+    elif text_sha256:
+        lookup, kind = {'text_sha256': text_sha256}, 'text'
+    else:
+        return None
+
+    logs = ProcessingLog.objects.filter(
+        status=ProcessingLog.STATUS_SUCCESSFUL, menu__restaurant__current_menu_id=F('menu_id'), **lookup
+    )
+    if exclude_log_id is not None:
+        logs = logs.exclude(log_id=exclude_log_id)
+    duplicate = logs.select_related('menu').order_by('-log_id').first()
+
+    with _stats_lock:
+        _stats[f"{kind}_{'hits' if duplicate else 'misses'}"] += 1
+    return duplicate
+
+
+def get_dedup_stats():
+    """
+    Hit/miss counters for this process since start-up
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    for kind in ('pdf', 'text'):
+        lookups = stats[f'{kind}_hits'] + stats[f'{kind}_misses']
+        stats[f'{kind}_hit_rate'] = stats[f'{kind}_hits'] / lookups if lookups else 0.0
+    return stats
+
+
+def reset_dedup_stats():
+    with _stats_lock:
+        for key in _stats:
+            _stats[key] = 0
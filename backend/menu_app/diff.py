@@ -0,0 +1,91 @@
+import logging
+
+from django.db import connection
+from django.db.models import DecimalField, F, OuterRef, Subquery, Value
+
+from .models import Menu, MenuItem, MenuItemChange
+from .normalize import normalize_spanish_text
+
+logger = logging.getLogger(__name__)
+
+
+def item_match_key(section_name, item_name):
+    """
+    Key under which an item is recognised across menu versions: section and item name with
+    accents, case and spacing normalized, so "Croquetas  caseras" in "TAPAS" matches
+    "croquetas caseras" in "Tapas" on the next card
+    """
+    def normalize(text):
+        return ' '.join(normalize_spanish_text(text or '').lower().split())
+
+    return f"{normalize(section_name)}|{normalize(item_name)}"[:255]
+
+
+# MenuItemChange fields filled by _change_rows, in the order of its SELECT (see _insert_select)
+CHANGE_FIELDS = ['match_key', 'name', 'menu', 'restaurant', 'kind', 'section_name', 'old_price', 'new_price']
+
+
+def _change_rows(menu, previous_menu_id):
+    """
+    One SELECT per kind of change, producing the CHANGE_FIELDS of MenuItemChange for menu against
+    previous_menu_id (every item is added when there is no previous version)
+    """
+    new_items = MenuItem.objects.filter(section__menu_id=menu.menu_id)
+    no_price = Value(None, output_field=DecimalField(max_digits=10, decimal_places=2))
+
+    def rows(items, kind, old_price, new_price):
+        # Model fields before annotations, the order the SELECT lists them in (CHANGE_FIELDS)
+        return items.annotate(
+            change_menu_id=Value(menu.menu_id), change_restaurant_id=Value(menu.restaurant_id),
+            change_kind=Value(kind), change_section_name=F('section__section_name'),
+            change_old_price=old_price, change_new_price=new_price
+        ).values('match_key', 'name', 'change_menu_id', 'change_restaurant_id', 'change_kind',
+                 'change_section_name', 'change_old_price', 'change_new_price')
+
+    if previous_menu_id is None:
+        return [rows(new_items, MenuItemChange.KIND_ADDED, no_price, F('price'))]
+
+    old_items = MenuItem.objects.filter(section__menu_id=previous_menu_id)
+    added = new_items.exclude(match_key__in=old_items.values('match_key'))
+    removed = old_items.exclude(match_key__in=new_items.values('match_key'))
+    repriced = (new_items
+                .annotate(previous_price=Subquery(old_items.filter(match_key=OuterRef('match_key'))
+                                                  .order_by('item_id').values('price')[:1]))
+                .filter(previous_price__isnull=False)
+                .exclude(previous_price=F('price')))
+    return [
+        rows(added, MenuItemChange.KIND_ADDED, no_price, F('price')),
+        rows(removed, MenuItemChange.KIND_REMOVED, F('price'), no_price),
+        rows(repriced, MenuItemChange.KIND_REPRICED, F('previous_price'), F('price')),
+    ]
+
+
+def _insert_select(rows, fields):
+    """
+    INSERT INTO menuitemchange (fields) SELECT rows, so changed items never leave the database;
+    rows must select a value for each of fields, in that order
+    """
+    columns = [MenuItemChange._meta.get_field(field).column for field in fields]
+    select_sql, params = rows.query.sql_with_params()
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {quote(MenuItemChange._meta.db_table)} ({', '.join(map(quote, columns))}) {select_sql}",
+            params
+        )
+        return cursor.rowcount
+
+
+def record_menu_changes(menu, replace=False):
+    """
+    Store how menu differs from the restaurant's previous version. The loaders call this in the
+    load transaction, so diffs and price history are read back without comparing menus again;
+    replace=True recomputes a menu's stored changes. Returns the number of changes.
+    """
+    previous_menu_id = (Menu.objects.filter(restaurant_id=menu.restaurant_id, version__lt=menu.version)
+                        .order_by('-version').values_list('menu_id', flat=True).first())
+    if replace:
+        MenuItemChange.objects.filter(menu_id=menu.menu_id).delete()
+    changes = sum(_insert_select(rows, CHANGE_FIELDS) for rows in _change_rows(menu, previous_menu_id))
+    logger.debug("Recorded %d item changes for menu id=%d", changes, menu.menu_id)
+    return changes
@@ -0,0 +1,112 @@
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import F
+from rest_framework.exceptions import ValidationError
+
+from .diff import item_match_key
+
+# Query parameters are mapped onto lookups the existing indexes can serve:
+# - min_price/max_price: the price indexes; with dietary_restriction the (price, dietary_restriction)
+#   composite index lets the restriction be checked without reading the rows
+# - section (+ name): (section, name) composite index
+# - name alone: the name index (prefix LIKE)
+# - restaurant (+ version) on menus: (restaurant, version) composite index
+# - menu lists default to current versions: a join on the indexed restaurant.current_menu pointer
+# - price history section (+ name): (restaurant, match_key) composite index
+
+
+def _param(params, name, convert, label):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return convert(value)
+    except (TypeError, ValueError, InvalidOperation):
+        raise ValidationError({name: f"Expected {label}, got {value!r}"})
+
+
+def _int(params, name):
+    return _param(params, name, int, 'an integer')
+
+
+def _decimal(params, name):
+    return _param(params, name, Decimal, 'a number')
+
+
+def filter_menu_items(queryset, params):
+    """
+    Narrow menu items by the request's query parameters:
+    min_price, max_price, dietary_restriction, section, name (prefix), menu, version, restaurant
+    """
+    lookups = {}
+
+    min_price = _decimal(params, 'min_price')
+    if min_price is not None:
+        lookups['price__gte'] = min_price
+    max_price = _decimal(params, 'max_price')
+    if max_price is not None:
+        lookups['price__lte'] = max_price
+
+    dietary_restriction = _int(params, 'dietary_restriction')
+    if dietary_restriction is not None:
+        lookups['dietary_restriction_id'] = dietary_restriction
+
+    section = _int(params, 'section')
+    if section is not None:
+        lookups['section_id'] = section
+
+    name = params.get('name')
+    if name:
+        # LIKE 'prefix%' under the column's case-insensitive collation: MySQL range-scans the index
+        lookups['name__istartswith'] = name
+
+    menu = _int(params, 'menu')
+    if menu is not None:
+        lookups['section__menu_id'] = menu
+    version = _int(params, 'version')
+    if version is not None:
+        lookups['section__menu__version'] = version
+    restaurant = _int(params, 'restaurant')
+    if restaurant is not None:
+        lookups['section__menu__restaurant_id'] = restaurant
+
+    return queryset.filter(**lookups) if lookups else queryset
+
+
+def all_versions_requested(params):
+    return params.get('all_versions', '').lower() in ('1', 'true', 'yes')
+
+
+def filter_menus(queryset, params, current_only=True):
+    """
+    Narrow menus by the request's query parameters: restaurant, version, all_versions.
+    With current_only, menus are limited to each restaurant's current version unless a
+    version or all_versions=1 is asked for.
+    """
+    lookups = {}
+
+    restaurant = _int(params, 'restaurant')
+    if restaurant is not None:
+        lookups['restaurant_id'] = restaurant
+    version = _int(params, 'version')
+    if version is not None:
+        lookups['version'] = version
+    elif current_only and not all_versions_requested(params):
+        lookups['restaurant__current_menu_id'] = F('menu_id')
+
+    return queryset.filter(**lookups) if lookups else queryset
+
+
+def filter_item_changes(queryset, params):
+    """
+    Narrow a restaurant's item changes by the request's query parameters: section, name.
+    Both are matched on the normalized key the diff uses, so case and accents do not matter.
+    """
+    section, name = params.get('section'), params.get('name')
+    if section and name:
+        return queryset.filter(match_key=item_match_key(section, name))
+    if section:
+        return queryset.filter(match_key__istartswith=item_match_key(section, ''))
+    if name:
+        return queryset.filter(match_key__endswith=item_match_key('', name))
+    return queryset
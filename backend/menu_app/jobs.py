@@ -0,0 +1,224 @@
+import logging
+import os
+import threading
+import time
+import uuid
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ProcessingLog
+from .dedup import find_duplicate
+from .pipeline import IngestionError, MenuIngestion
+from .metrics import record_ingestion
+
+logger = logging.getLogger(__name__)
+
+
+def get_queue_dir():
+    """
+    Directory where uploads waiting for a worker are spooled
+    """
+    queue_dir = getattr(settings, 'MENU_INGESTION_QUEUE_DIR', None) or os.path.join(settings.MEDIA_ROOT, 'ingestion_queue')
+    os.makedirs(queue_dir, exist_ok=True)
+    return str(queue_dir)
+
+
+def enqueue_menu_pdf(pdf_file, pdf_sha256=None, force_reprocess=False):
+    """
+    Store an uploaded PDF under a unique name and create a queued ProcessingLog row for it.
+    The returned log row doubles as the job: its log_id is the job ID handed back to the client.
+    """
+    queue_path = os.path.join(get_queue_dir(), f"{uuid.uuid4().hex}.pdf")
+    with open(queue_path, 'wb') as destination:
+        for chunk in pdf_file.chunks():
+            destination.write(chunk)
+
+    return ProcessingLog.objects.create(
+        status=ProcessingLog.STATUS_QUEUED,
+        source_file=queue_path,
+        pdf_sha256=pdf_sha256,
+        force_reprocess=force_reprocess
+    )
+
+
+def claim_next_job():
+    """
+    Atomically move the oldest queued job to 'processing' and return it, or None when the queue is empty.
+    SKIP LOCKED lets several workers poll the same table without handing out a job twice.
+    A job whose worker sent no heartbeat (see JobHeartbeat) for MENU_INGESTION_JOB_TIMEOUT seconds
+    belonged to a worker that crashed or was killed, and is claimed again under a new claimed_at.
+    """
+    stale_before = timezone.now() - timedelta(seconds=getattr(settings, 'MENU_INGESTION_JOB_TIMEOUT', 300))
+    with transaction.atomic():
+        job = (ProcessingLog.objects
+               .select_for_update(skip_locked=True)
+               # A job without a heartbeat was claimed before heartbeats were recorded: never presumed dead
+               .filter(Q(status=ProcessingLog.STATUS_QUEUED)
+                       | Q(status=ProcessingLog.STATUS_PROCESSING, heartbeat_at__lt=stale_before))
+               .order_by('log_id')
+               .first())
+        if job is None:
+            return None
+        if job.status == ProcessingLog.STATUS_PROCESSING:
+            logger.warning("Reclaiming job %d, last heartbeat at %s", job.log_id, job.heartbeat_at)
+        job.status = ProcessingLog.STATUS_PROCESSING
+        job.claimed_at = job.heartbeat_at = timezone.now()
+        job.save(update_fields=['status', 'claimed_at', 'heartbeat_at'])
+    return job
+
+
+def _claimed(job):
+    """
+    The job's row, as long as it is still held under the claim this worker took
+    """
+    return ProcessingLog.objects.filter(log_id=job.log_id, claimed_at=job.claimed_at)
+
+
+def send_heartbeat(job):
+    """
+    Mark the job's worker as alive; False when the job was reclaimed by another worker
+    """
+    return bool(_claimed(job).filter(status=ProcessingLog.STATUS_PROCESSING).update(heartbeat_at=timezone.now()))
+
+
+class JobHeartbeat:
+    """
+    Send a heartbeat every MENU_INGESTION_HEARTBEAT_INTERVAL seconds from a background thread while
+    the job runs, so a slow but live worker is never mistaken for a dead one
+    """
+
+    def __init__(self, job, interval=None):
+        self.job = job
+        self.interval = interval or getattr(settings, 'MENU_INGESTION_HEARTBEAT_INTERVAL', 60)
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'job-{job.log_id}-heartbeat', daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        try:
+            while not self._stopped.wait(self.interval):
+                if not send_heartbeat(self.job):
+                    logger.warning("Job %d was reclaimed by another worker", self.job.log_id)
+                    return
+        finally:
+            connection.close()
+
+
+def _finish_job(job, **fields):
+    """
+    Write the job's outcome if this worker still holds it; returns False (nothing written) otherwise
+    """
+    if not _claimed(job).update(**fields):
+        logger.warning("Job %d was reclaimed by another worker; leaving it to the new owner", job.log_id)
+        return False
+    for name, value in fields.items():
+        setattr(job, name, value)
+    return True
+
+
+def fail_job(job, error_message):
+    return _finish_job(job, status=ProcessingLog.STATUS_FAILED, error_message=error_message)
+
+
+def complete_duplicate_job(job, duplicate, text_sha256=None):
+    """
+    Finish a job by pointing it at the menu an earlier upload already produced
+    """
+    return _finish_job(
+        job, menu_id=duplicate.menu_id, status=ProcessingLog.STATUS_SUCCESSFUL,
+        text_sha256=text_sha256 or duplicate.text_sha256
+    )
+
+
+def run_job(job):
+    """
+    Run the ingestion pipeline for a claimed job.
+    On success the loader attaches the new menu to the job's log row; on failure the row is marked failed.
+    Should the job be reclaimed meanwhile (see claim_next_job), this run writes nothing and leaves
+    the spooled file to the worker that now holds it.
+    """
+    # Imported here: views imports this module to enqueue uploads
+    from .views import build_menu_pipeline
+
+    dedup = settings.MENU_DEDUP_ENABLED and not job.force_reprocess
+    ingestion = MenuIngestion(
+        source=job.source_file, pdf_sha256=job.pdf_sha256, log_id=job.log_id, claimed_at=job.claimed_at,
+        dedup=dedup, stream=settings.MENU_STREAMING_INGESTION
+    )
+    outcome = 'failed'
+    held = True
+
+    try:
+        with JobHeartbeat(job):
+            # Another job may have loaded the same PDF while this one was waiting in the queue
+            if dedup and job.pdf_sha256:
+                duplicate = find_duplicate(pdf_sha256=job.pdf_sha256, exclude_log_id=job.log_id)
+                if duplicate:
+                    held = complete_duplicate_job(job, duplicate)
+                    return held
+
+            build_menu_pipeline().run(ingestion)
+            if ingestion.duplicate:
+                held = complete_duplicate_job(job, ingestion.duplicate, text_sha256=ingestion.text_sha256)
+                outcome = 'duplicate'
+            else:
+                outcome = 'success'
+            return held
+
+    except IngestionError as e:
+        held = fail_job(job, str(e))
+        return False
+    except Exception as e:
+        logger.exception("Job %d failed", job.log_id)
+        held = fail_job(job, str(e))
+        return False
+    finally:
+        if held:
+            record_ingestion(ingestion, outcome)
+            if job.source_file and os.path.exists(job.source_file):
+                os.remove(job.source_file)
+
+
+def worker_loop(poll_interval=1.0, max_jobs=None, exit_when_idle=False):
+    """
+    Claim and run queued jobs until max_jobs have been processed (forever when None).
+    Sleeps for poll_interval seconds whenever the queue is empty, or returns if exit_when_idle is set.
+    """
+    processed = 0
+    while max_jobs is None or processed < max_jobs:
+        close_old_connections()
+        job = claim_next_job()
+        if job is None:
+            if exit_when_idle:
+                break
+            time.sleep(poll_interval)
+            continue
+        run_job(job)
+        processed += 1
+    return processed
+
+
+def worker_main(poll_interval=1.0, max_jobs=None, exit_when_idle=False):
+    """
+    Entry point for a worker process. Safe under both fork and spawn start methods.
+    """
+    import django
+    django.setup()
+
+    from django.db import connections
+    # Never share a connection inherited from the parent process
+    connections.close_all()
+
+    worker_loop(poll_interval=poll_interval, max_jobs=max_jobs, exit_when_idle=exit_when_idle)
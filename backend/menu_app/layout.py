@@ -0,0 +1,208 @@
+import logging
+import re
+from collections import Counter, namedtuple
+from typing import List, Optional
+
+from .PDFreader import PdfSource, open_pdf
+
+logger = logging.getLogger(__name__)
+
+# PyMuPDF span flag bit for bold text
+BOLD_FLAG = 1 << 4
+
+# A heading is set noticeably larger than the body text of the menu
+HEADING_SIZE_RATIO = 1.15
+
+# Trailing price: "Name ..... 12.50", "Name  $12", "Name 12,50 €"
+PRICE_RE = re.compile(
+    r'(?:\s*\.{2,}\s*|\s+)(?:[$€£]\s*)?(\d{1,4}(?:[.,]\d{1,2})?)\s*(?:€|EUR|eur)?\s*$'
+)
+# A line holding nothing but a price (two-column layouts put prices on their own line)
+PRICE_ONLY_RE = re.compile(r'^\s*(?:[$€£]\s*)?(\d{1,4}(?:[.,]\d{1,2})?)\s*(?:€|EUR|eur)?\s*$')
+
+LayoutLine = namedtuple('LayoutLine', ['page', 'text', 'size', 'bold'])
+
+
+def extract_layout_lines(pdf_source: PdfSource) -> List[LayoutLine]:
+    """
+    Read every text line of the PDF with its font size and weight from PyMuPDF's "dict" output
+    """
+    lines = []
+    doc = open_pdf(pdf_source)
+    try:
+        for page_num in range(doc.page_count):
+            page_dict = doc.load_page(page_num).get_text("dict")
+            for block in page_dict.get('blocks', []):
+                for line in block.get('lines', []):
+                    spans = [span for span in line.get('spans', []) if span.get('text', '').strip()]
+                    if not spans:
+                        continue
+                    text = ' '.join(''.join(span['text'] for span in line['spans']).split())
+                    size = max(round(span['size'], 1) for span in spans)
+                    bold = all(span['flags'] & BOLD_FLAG or 'bold' in span.get('font', '').lower()
+                               for span in spans)
+                    lines.append(LayoutLine(page_num, text, size, bold))
+    finally:
+        doc.close()
+    return lines
+
+
+def parse_price(token: str) -> float:
+    return float(token.replace(',', '.'))
+
+
+def split_price(text: str):
+    """
+    Return (text without its trailing price, price) or (text, None)
+    """
+    match = PRICE_RE.search(text)
+    if not match or match.start() == 0:
+        return text, None
+    return text[:match.start()].rstrip(' .'), parse_price(match.group(1))
+
+
+def body_font_size(lines: List[LayoutLine]) -> float:
+    """
+    The font size covering the most characters is taken to be the menu's body text
+    """
+    sizes = Counter()
+    for line in lines:
+        sizes[line.size] += len(line.text)
+    return sizes.most_common(1)[0][0] if sizes else 0.0
+
+
+def _is_heading(line: LayoutLine, body_size: float) -> bool:
+    if PRICE_ONLY_RE.match(line.text) or split_price(line.text)[1] is not None:
+        return False
+    if body_size and line.size >= body_size * HEADING_SIZE_RATIO:
+        return True
+    return line.bold and len(line.text) <= 60 and not line.text.endswith('.')
+
+
+def structure_layout(lines: List[LayoutLine]) -> dict:
+    """
+    Turn layout lines into the {restaurant, menu_sections[items]} schema the loader consumes.
+    - The largest heading on the first page, when it is set larger than every other heading,
+      is the restaurant name.
+    - Other headings open sections; lines ending in a price (or followed by a price-only line)
+      are items; plain lines under an item become its description.
+    - Every other line (location, notes, set-menu text, unpriced items) is kept verbatim in the
+      'notes' of the section it appeared in, or of the menu before the first section.
+    Dietary restrictions are not inferred here and default to 1 (no restriction).
+    """
+    body_size = body_font_size(lines)
+    headings = [line for line in lines if _is_heading(line, body_size)]
+
+    restaurant_name = None
+    if headings:
+        largest = max(headings, key=lambda line: line.size)
+        others = [line.size for line in headings if line is not largest]
+        if largest.page == 0 and (not others or largest.size > max(others)):
+            restaurant_name = largest.text
+
+    notes = []
+    sections = []
+    current_item = None
+    pending_name = None
+
+    def current_section():
+        if not sections:
+            sections.append({'section_name': 'Menu', 'items': [], 'notes': []})
+        return sections[-1]
+
+    def add_item(name, price):
+        item = {'name': name, 'description': None, 'price': price, 'dietary_restriction_id': 1}
+        current_section()['items'].append(item)
+        return item
+
+    def keep(text):
+        # A plain line that is not an item's description: a note, or the previous item's description
+        if current_item is not None:
+            current_item['description'] = ' '.join(filter(None, [current_item['description'], text]))
+        else:
+            (sections[-1]['notes'] if sections else notes).append(text)
+
+    for line in lines:
+        if restaurant_name is not None and line.text == restaurant_name and not sections:
+            continue
+
+        price_only = PRICE_ONLY_RE.match(line.text)
+        if price_only:
+            if pending_name is not None:
+                current_item = add_item(pending_name, parse_price(price_only.group(1)))
+                pending_name = None
+            else:
+                keep(line.text)
+            continue
+
+        if _is_heading(line, body_size):
+            if pending_name is not None:
+                keep(pending_name)
+            sections.append({'section_name': line.text, 'items': [], 'notes': []})
+            current_item = pending_name = None
+            continue
+
+        name, price = split_price(line.text)
+        if price is not None:
+            if pending_name is not None:
+                keep(pending_name)
+            current_item = add_item(name, price)
+            pending_name = None
+        else:
+            # Held back in case a price-only line follows; otherwise it describes the previous item
+            if pending_name is not None:
+                keep(pending_name)
+            pending_name = line.text
+
+    if pending_name is not None:
+        keep(pending_name)
+
+    return {
+        'restaurant': {'name': restaurant_name, 'location': None},
+        'notes': notes,
+        'menu_sections': [section for section in sections if section['items'] or section['notes']],
+    }
+
+
+def to_compact_text(structured: dict) -> str:
+    """
+    Render pre-structured menu data in the compact form sent to Claude:
+    "# Restaurant", then per section "## Section" followed by its notes verbatim and
+    "name | description | price" lines ("name | price" when there is no description).
+    Sections are separated by blank lines so the chunker splits between them.
+    """
+    blocks = []
+    header = []
+    restaurant_name = (structured.get('restaurant') or {}).get('name')
+    if restaurant_name:
+        header.append(f"# {restaurant_name}")
+    header.extend(structured.get('notes', []))
+    if header:
+        blocks.append('\n'.join(header))
+    for section in structured.get('menu_sections', []):
+        lines = [f"## {section['section_name']}", *section.get('notes', [])]
+        for item in section['items']:
+            fields = [item['name'], item['description'], f"{item['price']:.2f}"]
+            lines.append(' | '.join(field for field in fields if field))
+        blocks.append('\n'.join(lines))
+    return '\n\n'.join(blocks)
+
+
+def extract_layout_text(pdf_source: PdfSource) -> Optional[str]:
+    """
+    Layout-aware counterpart of extract_text_from_pdf: returns the compact pre-structured text,
+    or None when no priced items were recognised (the caller falls back to flat text).
+    """
+    try:
+        structured = structure_layout(extract_layout_lines(pdf_source))
+    except Exception as e:
+        logger.warning("Layout extraction failed: %s: %s", type(e).__name__, e)
+        return None
+
+    if not any(section['items'] for section in structured['menu_sections']):
+        logger.info("Layout extraction recognised no priced items")
+        return None
+
+    compact = to_compact_text(structured)
+    logger.debug("Layout extraction: sections=%d chars=%d", len(structured['menu_sections']), len(compact))
+    return compact
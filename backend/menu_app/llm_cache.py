@@ -0,0 +1,231 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+_stats_lock = threading.Lock()
+_stats = {
+    'hits': 0,
+    'misses': 0,
+    'writes': 0,
+}
+
+
+def make_cache_key(model: str, prompt_version: str, text: str) -> str:
+    """
+    Key a response on everything that determines it: the model, the prompt template version
+    and the exact text sent. Bump the prompt version whenever a prompt template changes.
+    """
+    text_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    return hashlib.sha256(f"{model}\0{prompt_version}\0{text_hash}".encode('utf-8')).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Interface for LLM response cache backends. Values are the raw response strings.
+    """
+
+    def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: str) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class NullLLMCache(LLMResponseCache):
+    """
+    Backend that never stores anything
+    """
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def clear(self):
+        pass
+
+
+class SQLiteLLMCache(LLMResponseCache):
+    """
+    Local SQLite-backed cache shared by every process on the host.
+    Entries older than ttl seconds are ignored and purged; when the cache grows past max_entries
+    or max_bytes the least recently used entries are evicted.
+    """
+
+    def __init__(self, path, max_entries=10000, max_bytes=256 * 1024 * 1024, ttl=30 * 24 * 3600):
+        self.path = str(path)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_response_cache ("
+                " cache_key TEXT PRIMARY KEY,"
+                " response TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS llm_response_cache_accessed ON llm_response_cache (accessed_at)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT response, created_at FROM llm_response_cache WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            response, created_at = row
+            if self.ttl is not None and now - created_at > self.ttl:
+                conn.execute("DELETE FROM llm_response_cache WHERE cache_key = ?", (key,))
+                return None
+            conn.execute("UPDATE llm_response_cache SET accessed_at = ? WHERE cache_key = ?", (now, key))
+            return response
+
+    def set(self, key, value):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_response_cache (cache_key, response, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value.encode('utf-8')), now, now)
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        if self.ttl is not None:
+            conn.execute("DELETE FROM llm_response_cache WHERE created_at < ?", (now - self.ttl,))
+        if self.max_entries is not None:
+            conn.execute(
+                "DELETE FROM llm_response_cache WHERE cache_key IN ("
+                " SELECT cache_key FROM llm_response_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+        if self.max_bytes is not None:
+            # Keep the most recently used entries whose running size fits in max_bytes
+            conn.execute(
+                "DELETE FROM llm_response_cache WHERE cache_key IN ("
+                " SELECT cache_key FROM ("
+                "  SELECT cache_key, SUM(size) OVER (ORDER BY accessed_at DESC, cache_key) AS running_size"
+                "  FROM llm_response_cache)"
+                " WHERE running_size > ?)",
+                (self.max_bytes,)
+            )
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM llm_response_cache")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMResponseCache:
+    """
+    Return the process-wide cache built from settings.LLM_CACHE
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            config = getattr(settings, 'LLM_CACHE', {})
+            backend = import_string(config.get('BACKEND', 'menu_app.llm_cache.NullLLMCache'))
+            _cache = backend(**config.get('OPTIONS', {}))
+        return _cache
+
+
+def reset_llm_cache():
+    """
+    Drop the configured backend so the next get_llm_cache() call re-reads settings
+    """
+    global _cache
+    with _cache_lock:
+        _cache = None
+    with _stats_lock:
+        for key in _stats:
+            _stats[key] = 0
+
+
+def llm_cache_bypassed() -> bool:
+    return getattr(settings, 'LLM_CACHE_BYPASS', False)
+
+
+def cached_llm_call(model, prompt_version, text, call, use_cache=True, parse=None):
+    """
+    Return the cached response for (model, prompt_version, text) or run call() and cache its result.
+    call must return the response string, or None for results that should not be cached.
+    When parse is given the response is returned parsed; a fresh response is only cached
+    once parse accepts it, so invalid output never poisons the cache.
+    """
+    parse = parse or (lambda response: response)
+
+    if not use_cache or llm_cache_bypassed():
+        response = call()
+        return parse(response) if response is not None else None
+
+    cached = lookup_llm_response(model, prompt_version, text)
+    if cached is not None:
+        return parse(cached)
+
+    response = call()
+    if response is None:
+        return None
+    parsed = parse(response)
+    store_llm_response(model, prompt_version, text, response)
+    return parsed
+
+
+def store_llm_response(model, prompt_version, text, response):
+    """
+    Cache a response obtained outside cached_llm_call (e.g. assembled from a stream)
+    """
+    if llm_cache_bypassed():
+        return
+    get_llm_cache().set(make_cache_key(model, prompt_version, text), response)
+    with _stats_lock:
+        _stats['writes'] += 1
+
+
+def lookup_llm_response(model, prompt_version, text):
+    """
+    Return a cached response without calling the model, updating the hit/miss counters
+    """
+    if llm_cache_bypassed():
+        return None
+    cached = get_llm_cache().get(make_cache_key(model, prompt_version, text))
+    with _stats_lock:
+        _stats['hits' if cached is not None else 'misses'] += 1
+    return cached
+
+
+def get_llm_cache_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+    return stats
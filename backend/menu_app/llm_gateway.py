@@ -0,0 +1,368 @@
+import asyncio
+import os
+import queue
+import random
+import threading
+import time
+
+import anthropic
+from django.conf import settings
+
+from .metrics import record_tokens, span
+
+# Statuses worth retrying: rate limited (429), overloaded (529), and transient server/proxy errors
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+# Statuses that mean we are sending too much and should lower concurrency
+THROTTLE_STATUS = {429, 529}
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at per_minute / 60 tokens per second, holding at most
+    one minute's worth. acquire() waits for capacity in FIFO order; consume() charges usage
+    learned after the fact and may leave the bucket in debt, which later callers wait out.
+    """
+
+    def __init__(self, per_minute, clock=time.monotonic):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.clock = clock
+        self.updated = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def consume(self, amount):
+        self._refill()
+        self.tokens -= amount
+
+    async def acquire(self, amount=1):
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+class AdaptiveConcurrencyLimit:
+    """
+    AIMD concurrency cap: every successful call raises the limit by 1/limit (about +1 per
+    round of calls), every throttled call (429/529) halves it, within [minimum, maximum].
+    """
+
+    def __init__(self, initial, minimum=1, maximum=None):
+        self.minimum = minimum
+        self.maximum = maximum or initial
+        self.limit = float(min(max(initial, minimum), self.maximum))
+        self.in_flight = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self, throttled=False):
+        async with self._condition:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(self.minimum, self.limit / 2)
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+
+def estimate_input_tokens(params):
+    """
+    Rough prompt size (about 4 characters per token) used to reserve tokens-per-minute budget
+    """
+    chars = len(params.get('system') or '')
+    for message in params.get('messages', []):
+        content = message.get('content')
+        chars += len(content) if isinstance(content, str) else len(str(content))
+    return chars // 4 + 1
+
+
+class LLMGateway:
+    """
+    Process-wide access point to the Anthropic API.
+    - One AsyncAnthropic client (and so one HTTP connection pool) is reused for every call,
+      running on a dedicated event loop thread; create() and stream_text() are sync wrappers.
+    - Requests and tokens per minute are shaped by token buckets before a call is sent.
+    - 429/5xx/529 and connection errors are retried with full-jitter exponential backoff,
+      honouring retry-after when the API sends it.
+    - An AIMD limit adapts the number of concurrent calls to what the API accepts.
+    """
+
+    def __init__(self, api_key, base_url=None, requests_per_minute=None, tokens_per_minute=None,
+                 max_concurrency=4, min_concurrency=1, max_retries=5, backoff_base=1.0, backoff_max=30.0,
+                 timeout=120.0):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'requests': 0,
+            'retries': 0,
+            'throttled': 0,
+            'errors': 0,
+            'input_tokens': 0,
+            'output_tokens': 0,
+        }
+
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name='llm-gateway', daemon=True)
+        self._thread.start()
+
+        async def build():
+            # Loop-bound primitives are created on the gateway's own loop
+            self.client = anthropic.AsyncAnthropic(
+                api_key=api_key, base_url=base_url, timeout=timeout, max_retries=0
+            )
+            self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+            self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+            self.concurrency = AdaptiveConcurrencyLimit(max_concurrency, minimum=min_concurrency)
+
+        self._run(build())
+
+    def _run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def close(self):
+        if self.loop.is_closed():
+            return
+        try:
+            self._run(self.client.close())
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout=5)
+            self.loop.close()
+
+    def _count(self, **increments):
+        with self._stats_lock:
+            for key, value in increments.items():
+                self._stats[key] += value
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['concurrency_limit'] = int(self.concurrency.limit)
+        stats['in_flight'] = self.concurrency.in_flight
+        return stats
+
+    async def _admit(self, params):
+        if self.request_bucket:
+            await self.request_bucket.acquire(1)
+        if self.token_bucket:
+            await self.token_bucket.acquire(estimate_input_tokens(params))
+
+    def _record_usage(self, usage, params):
+        if usage is None:
+            return
+        self._count(input_tokens=usage.input_tokens, output_tokens=usage.output_tokens)
+        if self.token_bucket:
+            # Input was reserved up front from the estimate; charge the output and any shortfall now
+            self.token_bucket.consume(
+                usage.output_tokens + max(0, usage.input_tokens - estimate_input_tokens(params))
+            )
+
+    def _retry_delay(self, error, attempt, max_retries):
+        """
+        Seconds to wait before retrying error, or None when it must not be retried
+        """
+        if isinstance(error, anthropic.APIStatusError):
+            if error.status_code not in RETRYABLE_STATUS:
+                return None
+            retry_after = error.response.headers.get('retry-after') if error.response is not None else None
+        elif isinstance(error, anthropic.APIConnectionError):
+            retry_after = None
+        else:
+            return None
+
+        if attempt >= max_retries:
+            return None
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        try:
+            return max(delay, float(retry_after)) if retry_after is not None else delay
+        except ValueError:
+            return delay
+
+    @staticmethod
+    def _is_throttle(error):
+        return isinstance(error, anthropic.APIStatusError) and error.status_code in THROTTLE_STATUS
+
+    def _failed(self, error, attempt, max_retries, retryable=True):
+        """
+        Count a failed attempt and return the retry delay, or None if the error is final
+        """
+        throttled = self._is_throttle(error)
+        delay = self._retry_delay(error, attempt, max_retries) if retryable else None
+        self._count(throttled=int(throttled), retries=int(delay is not None), errors=int(delay is None))
+        return delay
+
+    async def acreate(self, max_retries=None, **params):
+        """
+        messages.create() through the limiter, retries and adaptive concurrency
+        """
+        max_retries = self.max_retries if max_retries is None else max_retries
+        attempt = 0
+        while True:
+            # Every attempt, retries included, is charged to the rate limiter
+            await self._admit(params)
+            await self.concurrency.acquire()
+            self._count(requests=1)
+            throttled = False
+            try:
+                message = await self.client.messages.create(**params)
+            except Exception as e:
+                throttled = self._is_throttle(e)
+                delay = self._failed(e, attempt, max_retries)
+                if delay is None:
+                    raise
+            else:
+                self._record_usage(getattr(message, 'usage', None), params)
+                return message
+            finally:
+                await self.concurrency.release(throttled=throttled)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def astream_text(self, max_retries=None, on_usage=None, **params):
+        """
+        Stream the response text. Calls are only retried before the first fragment arrived,
+        so a consumer never sees a fragment twice. on_usage(usage) is called once the final
+        message (and so the token usage) is known.
+        """
+        max_retries = self.max_retries if max_retries is None else max_retries
+        attempt = 0
+        while True:
+            # Every attempt, retries included, is charged to the rate limiter
+            await self._admit(params)
+            await self.concurrency.acquire()
+            self._count(requests=1)
+            throttled = False
+            started = False
+            try:
+                async with self.client.messages.stream(**params) as stream:
+                    async for fragment in stream.text_stream:
+                        started = True
+                        yield fragment
+                    message = await stream.get_final_message()
+            except Exception as e:
+                throttled = self._is_throttle(e)
+                delay = self._failed(e, attempt, max_retries, retryable=not started)
+                if delay is None:
+                    raise
+            else:
+                usage = getattr(message, 'usage', None)
+                self._record_usage(usage, params)
+                if on_usage is not None and usage is not None:
+                    on_usage(usage)
+                return
+            finally:
+                # Also runs when the consumer stops early and the stream is cancelled
+                await self.concurrency.release(throttled=throttled)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def create(self, **params):
+        """
+        Sync messages.create(); the call is timed as the 'llm' span of the ingestion being
+        collected on the calling thread, which is also charged the tokens used
+        """
+        with span('llm'):
+            message = self._run(self.acreate(**params))
+        record_tokens(getattr(message, 'usage', None))
+        return message
+
+    def stream_text(self, **params):
+        """
+        Sync generator over astream_text(); fragments are handed over from the gateway loop.
+        Time spent waiting for them is the 'llm' span of the ingestion being collected, as in create()
+        """
+        fragments = queue.Queue()
+        usages = []
+        done = object()
+
+        async def pump():
+            try:
+                async for fragment in self.astream_text(on_usage=usages.append, **params):
+                    fragments.put(fragment)
+            except Exception as e:
+                fragments.put(e)
+            finally:
+                fragments.put(done)
+
+        future = asyncio.run_coroutine_threadsafe(pump(), self.loop)
+        try:
+            while True:
+                # Timed per fragment: the consumer's work between fragments is not LLM time
+                with span('llm'):
+                    fragment = fragments.get()
+                if fragment is done:
+                    # Back on the calling thread, where the current ingestion is known
+                    for usage in usages:
+                        record_tokens(usage)
+                    return
+                if isinstance(fragment, Exception):
+                    raise fragment
+                yield fragment
+        finally:
+            future.cancel()
+
+
+_gateway = None
+_gateway_pid = None
+_gateway_lock = threading.Lock()
+
+
+def get_llm_gateway() -> LLMGateway:
+    """
+    Return this process's gateway built from settings.LLM_GATEWAY (one per process: the event
+    loop thread does not survive a fork)
+    """
+    global _gateway, _gateway_pid
+    with _gateway_lock:
+        if _gateway is None or _gateway_pid != os.getpid():
+            api_key = os.getenv('ANTHROPIC_API_KEY') or getattr(settings, 'ANTHROPIC_API_KEY', None)
+            if not api_key:
+                raise ValueError("ANTHROPIC_API_KEY environment variable not set")
+            config = getattr(settings, 'LLM_GATEWAY', {})
+            _gateway = LLMGateway(
+                api_key=api_key,
+                base_url=config.get('BASE_URL'),
+                requests_per_minute=config.get('REQUESTS_PER_MINUTE'),
+                tokens_per_minute=config.get('TOKENS_PER_MINUTE'),
+                max_concurrency=config.get('MAX_CONCURRENCY', 4),
+                max_retries=config.get('MAX_RETRIES', 5),
+                backoff_base=config.get('BACKOFF_BASE', 1.0),
+                backoff_max=config.get('BACKOFF_MAX', 30.0),
+                timeout=config.get('TIMEOUT', 120.0),
+            )
+            _gateway_pid = os.getpid()
+        return _gateway
+
+
+def reset_llm_gateway():
+    """
+    Close the current gateway so the next get_llm_gateway() call re-reads settings
+    """
+    global _gateway, _gateway_pid
+    with _gateway_lock:
+        if _gateway is not None and _gateway_pid == os.getpid():
+            _gateway.close()
+        _gateway = None
+        _gateway_pid = None
+
+
+def get_llm_gateway_stats():
+    with _gateway_lock:
+        gateway = _gateway if _gateway_pid == os.getpid() else None
+    return gateway.stats() if gateway is not None else {}
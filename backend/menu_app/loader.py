@@ -0,0 +1,346 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Max, Subquery
+from django.utils import timezone
+
+from .analytics import MenuStatsAccumulator
+from .diff import item_match_key, record_menu_changes
+from .models import Restaurant, Menu, MenuSection, MenuItem, DietaryRestriction, ProcessingLog
+
+logger = logging.getLogger(__name__)
+
+# dietary_restriction_id values the structuring prompt asks Claude to assign
+DIETARY_RESTRICTIONS = {
+    1: 'No Restriction',
+    2: 'Vegan',
+    3: 'Vegetarian',
+    4: 'Gluten-Free',
+    5: 'Lactose-Free'
+}
+
+_restriction_lock = threading.Lock()
+_restriction_ids = {}
+
+_stats_lock = threading.Lock()
+_stats = {
+    'menus_loaded': 0,
+    'rows_inserted': 0,
+    'seconds': 0.0,
+    'last_rows_per_second': 0.0,
+}
+
+
+def get_dietary_restriction_ids():
+    """
+    Map dietary restriction labels to their IDs, creating missing labels once per process.
+    The restriction table is tiny and append-only, so the mapping is cached in-process.
+    """
+    with _restriction_lock:
+        if all(label in _restriction_ids for label in DIETARY_RESTRICTIONS.values()):
+            return _restriction_ids
+
+        DietaryRestriction.objects.bulk_create(
+            [DietaryRestriction(label=label) for label in DIETARY_RESTRICTIONS.values()],
+            ignore_conflicts=True
+        )
+        _restriction_ids.clear()
+        _restriction_ids.update(
+            {label: restriction_id for restriction_id, label
+             in DietaryRestriction.objects.values_list('restriction_id', 'label')}
+        )
+        return _restriction_ids
+
+
+def clear_dietary_restriction_cache():
+    with _restriction_lock:
+        _restriction_ids.clear()
+
+
+def clean_price(value):
+    try:
+        price = float(value if value is not None else 0)
+    except (TypeError, ValueError):
+        return 0.01
+    return price if price > 0 else 0.01
+
+
+def build_items(section_id, items, dietary_ids, section_name='Unknown Section'):
+    default_id = dietary_ids['No Restriction']
+    for item in items:
+        dietary_label = DIETARY_RESTRICTIONS.get(item.get('dietary_restriction_id', 1), 'No Restriction')
+        name = item.get('name', 'Unknown Item')
+        yield MenuItem(
+            section_id=section_id,
+            name=name,
+            match_key=item_match_key(section_name, name),
+            description=item.get('description'),
+            price=clean_price(item.get('price', 0)),
+            dietary_restriction_id=dietary_ids.get(dietary_label, default_id)
+        )
+
+
+def _record_load(rows, seconds):
+    with _stats_lock:
+        _stats['menus_loaded'] += 1
+        _stats['rows_inserted'] += rows
+        _stats['seconds'] += seconds
+        _stats['last_rows_per_second'] = rows / seconds if seconds else 0.0
+
+
+def get_loader_stats():
+    """
+    Cumulative loader throughput for this process since start-up
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['rows_per_second'] = stats['rows_inserted'] / stats['seconds'] if stats['seconds'] else 0.0
+    return stats
+
+
+def _lock_restaurant(restaurant_name):
+    """
+    The restaurant loads of restaurant_name go to, locked until the load commits, or None.
+    Restaurants created outside the loaders are adopted by name the first time one is loaded.
+    """
+    restaurant = Restaurant.objects.select_for_update().filter(name_key=restaurant_name).first()
+    if restaurant is not None:
+        return restaurant
+    restaurant = (Restaurant.objects.select_for_update()
+                  .filter(name=restaurant_name, name_key__isnull=True).order_by('restaurant_id').first())
+    if restaurant is not None:
+        restaurant.name_key = restaurant_name
+        restaurant.save(update_fields=['name_key'])
+    return restaurant
+
+
+def resolve_restaurant(restaurant_data):
+    """
+    Return the restaurant named in restaurant_data (created if new) and its next menu version.
+    The restaurant row stays locked until the load commits, so concurrent loads of the same
+    restaurant take consecutive versions; Menu's unique (restaurant, version) backs this up.
+    """
+    restaurant_name = restaurant_data.get('name')
+
+    if restaurant_name:
+        try:
+            with transaction.atomic():
+                restaurant = _lock_restaurant(restaurant_name)
+                if restaurant is None:
+                    restaurant = Restaurant.objects.create(
+                        name=restaurant_name, name_key=restaurant_name,
+                        location=restaurant_data.get('location') or 'Unknown'
+                    )
+                    logger.debug("Created restaurant id=%d", restaurant.restaurant_id)
+                    return restaurant, 1
+        except IntegrityError:
+            # A concurrent load created or adopted it first; its row is visible once that load committed
+            restaurant = _lock_restaurant(restaurant_name)
+
+        logger.debug("Using existing restaurant id=%d", restaurant.restaurant_id)
+        latest_version = Menu.objects.filter(restaurant=restaurant).aggregate(Max('version'))['version__max']
+        return restaurant, (latest_version or 0) + 1
+
+    restaurant = Restaurant.objects.create(name='Unknown', location=restaurant_data.get('location') or 'Unknown')
+    logger.debug("Created restaurant id=%d", restaurant.restaurant_id)
+    return restaurant, 1
+
+
+def refresh_current_menu(restaurant_id):
+    """
+    Point the restaurant at its highest menu version (None once it has no menus left)
+    """
+    latest = Menu.objects.filter(restaurant_id=restaurant_id).order_by('-version').values('menu_id')[:1]
+    Restaurant.objects.filter(restaurant_id=restaurant_id).update(current_menu_id=Subquery(latest))
+
+
+class JobClaimLost(Exception):
+    """
+    Raised when a queued job was reclaimed by another worker before this load could complete it
+    """
+
+
+def complete_processing_log(menu, log_id=None, pdf_sha256=None, text_sha256=None, claimed_at=None):
+    """
+    Record the loaded menu on its ProcessingLog row. With claimed_at (queued jobs) the row is only
+    completed while it is still held under that claim; JobClaimLost otherwise rolls the load back.
+    """
+    log_fields = {
+        'menu': menu,
+        'status': ProcessingLog.STATUS_SUCCESSFUL,
+        'error_message': None,
+        'pdf_sha256': pdf_sha256,
+        'text_sha256': text_sha256,
+    }
+    if log_id is None:
+        ProcessingLog.objects.create(**log_fields)
+    elif claimed_at is None:
+        ProcessingLog.objects.filter(log_id=log_id).update(**log_fields)
+    elif not ProcessingLog.objects.filter(log_id=log_id, claimed_at=claimed_at).update(**log_fields):
+        raise JobClaimLost(f"Job {log_id} was reclaimed by another worker")
+
+
+def insert_into_database(structured_data, log_id=None, pdf_sha256=None, text_sha256=None, claimed_at=None):
+    """
+    Load structured menu data as a new menu version and return its menu_id, or None on failure.
+    When log_id is given (queued jobs) that ProcessingLog row is completed instead of creating a new one,
+    and nothing is loaded if the job is no longer held under claimed_at.
+    The content hashes are stored on the log so later uploads of the same menu can be deduplicated.
+
+    Runs in one transaction on Django's default connection (persistent or pooled, see DATABASES).
+    Sections and items are written with batched bulk inserts, so a menu costs a fixed
+    number of round trips rather than one per row.
+    """
+    started = time.perf_counter()
+    batch_size = getattr(settings, 'MENU_LOADER_BATCH_SIZE', 500)
+    try:
+        with transaction.atomic():
+            dietary_ids = get_dietary_restriction_ids()
+
+            restaurant, new_version = resolve_restaurant(structured_data.get('restaurant') or {})
+            menu = Menu.objects.create(restaurant=restaurant, version=new_version, date=timezone.now().date())
+            refresh_current_menu(restaurant.restaurant_id)
+
+            sections = structured_data.get('menu_sections', [])
+            MenuSection.objects.bulk_create(
+                [MenuSection(menu=menu, section_name=section.get('section_name', 'Unknown Section'),
+                             section_order=section_order)
+                 for section_order, section in enumerate(sections, 1)],
+                batch_size=batch_size
+            )
+
+            # MySQL does not return bulk-inserted IDs; section_order is unique within the new menu,
+            # so one query maps every section to its ID
+            section_ids = dict(
+                MenuSection.objects.filter(menu=menu).values_list('section_order', 'section_id')
+            )
+
+            items = [
+                item
+                for section_order, section in enumerate(sections, 1)
+                for item in build_items(section_ids[section_order], section.get('items', []), dietary_ids,
+                                        section.get('section_name', 'Unknown Section'))
+            ]
+            MenuItem.objects.bulk_create(items, batch_size=batch_size)
+
+            stats = MenuStatsAccumulator()
+            stats.add(items)
+            stats.save(menu)
+            record_menu_changes(menu)
+
+            complete_processing_log(menu, log_id, pdf_sha256, text_sha256, claimed_at)
+
+        elapsed = time.perf_counter() - started
+        rows = len(sections) + len(items)
+        _record_load(rows, elapsed)
+        logger.info("Loaded menu id=%d: rows=%d seconds=%.3f rows_per_second=%.0f",
+                    menu.menu_id, rows, elapsed, rows / elapsed if elapsed else 0)
+        return menu.menu_id
+
+    except JobClaimLost as e:
+        logger.warning("%s; discarding this load", e)
+        return None
+    except Exception as e:
+        logger.exception("Database insertion failed")
+        # A failed load may come from a stale restriction mapping; rebuild it next time
+        clear_dietary_restriction_cache()
+        return None
+
+
+class StreamingMenuLoader:
+    """
+    Incremental counterpart of insert_into_database for menus that arrive piece by piece.
+    Use as a context manager: everything is written in one transaction that commits on a clean
+    exit. Items are bulk-inserted every batch_size items; sections or items that arrive before
+    the restaurant are held back until it is known.
+    """
+
+    def __init__(self, log_id=None, pdf_sha256=None, text_sha256=None, batch_size=None, claimed_at=None):
+        self.log_id = log_id
+        self.claimed_at = claimed_at
+        self.pdf_sha256 = pdf_sha256
+        self.text_sha256 = text_sha256
+        self.batch_size = batch_size or getattr(settings, 'MENU_LOADER_BATCH_SIZE', 500)
+        self.menu = None
+        self.section_id = None
+        self.section_name = None
+        self.section_order = 0
+        self.pending_items = []
+        self.held_back = []
+        self.rows = 0
+        self.first_row_seconds = None
+        self.stats = MenuStatsAccumulator()
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        self._atomic = transaction.atomic()
+        self._atomic.__enter__()
+        self.dietary_ids = get_dietary_restriction_ids()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            clear_dietary_restriction_cache()
+        return self._atomic.__exit__(exc_type, exc, tb)
+
+    def set_restaurant(self, restaurant_data):
+        restaurant, version = resolve_restaurant(restaurant_data or {})
+        self.menu = Menu.objects.create(restaurant=restaurant, version=version, date=timezone.now().date())
+        refresh_current_menu(restaurant.restaurant_id)
+        held_back, self.held_back = self.held_back, []
+        for method, payload in held_back:
+            method(payload)
+
+    def add_section(self, section):
+        if self.menu is None:
+            self.held_back.append((self.add_section, section))
+            return
+        self.flush()
+        self.section_order += 1
+        self.section_name = section.get('section_name', 'Unknown Section')
+        self.section_id = MenuSection.objects.create(
+            menu=self.menu,
+            section_name=self.section_name,
+            section_order=self.section_order
+        ).section_id
+        self.rows += 1
+
+    def add_item(self, item):
+        if self.menu is None:
+            self.held_back.append((self.add_item, item))
+            return
+        if self.section_id is None:
+            self.add_section({})
+        self.pending_items.extend(build_items(self.section_id, [item], self.dietary_ids, self.section_name))
+        if len(self.pending_items) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending_items:
+            return
+        MenuItem.objects.bulk_create(self.pending_items, batch_size=self.batch_size)
+        self.stats.add(self.pending_items)
+        self.rows += len(self.pending_items)
+        self.pending_items = []
+        if self.first_row_seconds is None:
+            self.first_row_seconds = time.perf_counter() - self.started
+
+    def finish(self):
+        """
+        Write what is left and the processing log; returns the new menu_id
+        """
+        if self.menu is None:
+            self.set_restaurant({})
+        self.flush()
+        self.stats.save(self.menu)
+        record_menu_changes(self.menu)
+        complete_processing_log(self.menu, self.log_id, self.pdf_sha256, self.text_sha256, self.claimed_at)
+
+        elapsed = time.perf_counter() - self.started
+        _record_load(self.rows, elapsed)
+        logger.info("Streamed menu id=%d into database: rows=%d seconds=%.3f first_rows_after=%.3f",
+                    self.menu.menu_id, self.rows, elapsed, self.first_row_seconds or elapsed)
+        return self.menu.menu_id
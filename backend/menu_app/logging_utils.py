@@ -0,0 +1,97 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+DEFAULT_PAYLOAD_MAX_CHARS = 500
+
+
+def payload_max_chars():
+    from django.conf import settings
+    from django.core.exceptions import ImproperlyConfigured
+
+    try:
+        return getattr(settings, 'LOG_PAYLOAD_MAX_CHARS', DEFAULT_PAYLOAD_MAX_CHARS)
+    except ImproperlyConfigured:  # e.g. PDF extraction in a bare worker process
+        return DEFAULT_PAYLOAD_MAX_CHARS
+
+
+class Payload:
+    """
+    Lazily truncated log argument for menu texts and LLM responses. Nothing is copied or
+    sliced unless a handler actually formats the record, so DEBUG payloads cost nothing
+    when DEBUG is disabled:
+
+        logger.debug("Sending to Claude: %s", Payload(text))
+    """
+    __slots__ = ('value', 'limit')
+
+    def __init__(self, value, limit=None):
+        self.value = value
+        self.limit = limit
+
+    def __str__(self):
+        text = self.value if isinstance(self.value, str) else repr(self.value)
+        limit = self.limit
+        if limit is None:
+            limit = payload_max_chars()
+        if len(text) <= limit:
+            return repr(text)
+        return f"{text[:limit]!r}... [{len(text) - limit} more chars]"
+
+
+class QueueListenerHandler(QueueHandler):
+    """
+    Non-blocking handler for settings.LOGGING: records go onto a bounded in-memory queue and a
+    QueueListener thread hands them to the real handlers (console, file), so request threads
+    never wait on stream or disk writes. When the queue is full records are dropped rather than
+    blocking; the number dropped is kept in dropped.
+
+    The target handlers are listed as cfg:// references, e.g.
+        'queue': {'()': 'menu_app.logging_utils.QueueListenerHandler',
+                  'handlers': ['cfg://handlers.console', 'cfg://handlers.file']}
+    A process forked after start-up (ingestion workers, import_menus extraction) gets its own
+    queue and listener on first use, since the parent's listener thread does not survive the fork.
+    """
+
+    def __init__(self, handlers, queue_size=10000, respect_handler_level=True):
+        # Index access resolves the cfg:// references to the configured handlers
+        self.handlers = [handlers[i] for i in range(len(handlers))]
+        self.queue_size = queue_size
+        self.respect_handler_level = respect_handler_level
+        self.dropped = 0
+        self._start_lock = threading.Lock()
+        self._pid = None
+        self.listener = None
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self._start()
+
+    def _start(self):
+        self._pid = os.getpid()
+        self.listener = QueueListener(self.queue, *self.handlers, respect_handler_level=self.respect_handler_level)
+        self.listener.start()
+        atexit.register(self._stop, self.listener)
+
+    @staticmethod
+    def _stop(listener):
+        # Flushes everything still queued before the interpreter exits
+        if listener._thread is not None:
+            listener.stop()
+
+    def enqueue(self, record):
+        if self._pid != os.getpid():
+            with self._start_lock:
+                if self._pid != os.getpid():
+                    self.queue = queue.Queue(maxsize=self.queue_size)
+                    self._start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        if self._pid == os.getpid():
+            self._stop(self.listener)
+        super().close()
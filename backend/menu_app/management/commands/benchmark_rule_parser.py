@@ -0,0 +1,100 @@
+import glob
+import json
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from menu_app.PDFreader import extract_text_from_pdf
+from menu_app.rule_parser import parse_menu_text
+
+
+def item_keys(structured):
+    """
+    (section, name, price) triples used to compare a parse against the expected menu
+    """
+    return {
+        ((section.get('section_name') or '').strip().casefold(),
+         (item.get('name') or '').strip().casefold(),
+         round(float(item.get('price') or 0), 2))
+        for section in structured.get('menu_sections', [])
+        for item in section.get('items', [])
+    }
+
+
+def score_parse(parsed, expected):
+    """
+    Item-level precision, recall and F1 of a parse against the expected structure
+    """
+    got, want = item_keys(parsed), item_keys(expected)
+    matched = len(got & want)
+    precision = matched / len(got) if got else 0.0
+    recall = matched / len(want) if want else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {'precision': precision, 'recall': recall, 'f1': f1}
+
+
+class Command(BaseCommand):
+    help = ('Measures accuracy and speed of the rule-based menu parser over a corpus of .txt/.pdf menus; '
+            'a sibling .json file with the expected {restaurant, menu_sections} is scored when present')
+
+    def add_arguments(self, parser):
+        parser.add_argument('corpus', help='Directory holding the corpus')
+        parser.add_argument('--threshold', type=float, default=settings.MENU_RULE_PARSER_MIN_CONFIDENCE,
+                            help='Confidence above which the parse would be used instead of Claude')
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Parses per file when timing (the fastest run is reported)')
+
+    def handle(self, *args, **options):
+        paths = sorted(glob.glob(os.path.join(options['corpus'], '*.txt'))
+                       + glob.glob(os.path.join(options['corpus'], '*.pdf')))
+        if not paths:
+            raise CommandError(f"No .txt or .pdf menus found in {options['corpus']!r}")
+
+        threshold = options['threshold']
+        timings, scores, fast_path_scores = [], [], []
+        fast_path = 0
+
+        for path in paths:
+            text = self.load_text(path)
+            elapsed = None
+            for _ in range(max(1, options['repeat'])):
+                started = time.perf_counter()
+                parsed, confidence = parse_menu_text(text)
+                run = time.perf_counter() - started
+                elapsed = run if elapsed is None else min(elapsed, run)
+            timings.append(elapsed)
+
+            accepted = confidence >= threshold
+            fast_path += accepted
+            line = (f"{os.path.basename(path)}: confidence {confidence:.2f} "
+                    f"({'rules' if accepted else 'LLM'}), {elapsed * 1000:.2f} ms")
+
+            expected_path = os.path.splitext(path)[0] + '.json'
+            if os.path.exists(expected_path):
+                with open(expected_path, encoding='utf-8') as f:
+                    score = score_parse(parsed, json.load(f))
+                scores.append(score)
+                if accepted:
+                    fast_path_scores.append(score)
+                line += (f", precision {score['precision']:.2f} recall {score['recall']:.2f} "
+                         f"f1 {score['f1']:.2f}")
+            self.stdout.write(line)
+
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        summary = (f"{len(paths)} menu(s): {fast_path} parsed without the LLM at threshold {threshold:.2f}, "
+                   f"mean {sum(timings) / len(timings) * 1000:.2f} ms, p95 {p95 * 1000:.2f} ms")
+        if scores:
+            summary += f", mean f1 {sum(s['f1'] for s in scores) / len(scores):.2f}"
+        if fast_path_scores:
+            summary += (f", f1 on the fast path "
+                        f"{sum(s['f1'] for s in fast_path_scores) / len(fast_path_scores):.2f}")
+        self.stdout.write(self.style.SUCCESS(summary))
+
+    def load_text(self, path):
+        if path.lower().endswith('.pdf'):
+            return extract_text_from_pdf(path, workers=1) or ''
+        with open(path, encoding='utf-8') as f:
+            return f.read()
@@ -0,0 +1,178 @@
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from menu_app import views
+from menu_app.dedup import file_sha256
+from menu_app.models import ProcessingLog
+from menu_app.metrics import record_ingestion
+from menu_app.pipeline import IngestionError, MenuIngestion
+
+STRUCTURE_STAGES = ('structure', 'normalize', 'validate')
+
+
+def extract_pdf(path):
+    """
+    Hash and extract one PDF through the pipeline's extract stage. Runs in a worker process:
+    PyMuPDF extraction is CPU-bound. Files are already spread over processes, so pages are
+    walked serially here. ingestion.text stays None when nothing could be extracted.
+    """
+    ingestion = MenuIngestion(source=path, pdf_sha256=file_sha256(path))
+    try:
+        views.build_menu_pipeline(extract_workers=1).run(ingestion, only=('extract',))
+    except IngestionError:
+        pass
+    return ingestion
+
+
+class Command(BaseCommand):
+    help = 'Imports every menu PDF in a directory (or matching a glob) through extract -> structure -> load'
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help='Directory of PDFs or a glob pattern such as "menus/**/*.pdf"')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Processes used for PDF extraction (default: CPU count, 1 runs inline)')
+        parser.add_argument('--llm-concurrency', type=int, default=settings.LLM_MAX_CONCURRENCY,
+                            help='Menus structured by Claude at the same time')
+        parser.add_argument('--batch-size', type=int, default=20,
+                            help='Menus written per database transaction')
+        parser.add_argument('--force', action='store_true',
+                            help='Re-import files already ingested successfully')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Extract and structure, but stop before writing to the database')
+
+    def handle(self, *args, **options):
+        paths = self.find_pdfs(options['source'])
+        if not paths:
+            raise CommandError(f"No PDF files found for {options['source']!r}")
+
+        self.options = options
+        self.started = time.perf_counter()
+        self.counts = {'imported': 0, 'skipped': 0, 'failed': 0}
+        self.total = len(paths)
+        self.done = 0
+        self.pending = []
+        self.seen_text_hashes = set()
+        self.pipeline = views.build_menu_pipeline()
+
+        self.stdout.write(f"Importing {self.total} PDF(s) with {options['workers']} extraction worker(s) "
+                          f"and {options['llm_concurrency']} concurrent LLM call(s)"
+                          f"{' [dry run]' if options['dry_run'] else ''}")
+
+        with ThreadPoolExecutor(max_workers=max(1, options['llm_concurrency'])) as llm_pool:
+            llm_futures = {}
+            for ingestion in self.extract_all(paths):
+                if self.prepare(ingestion):
+                    future = llm_pool.submit(self.pipeline.run, ingestion, only=STRUCTURE_STAGES)
+                    llm_futures[future] = ingestion
+
+            for future in as_completed(llm_futures):
+                ingestion = llm_futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    self.fail(ingestion, f"Structuring failed: {e}")
+                    continue
+                self.pending.append(ingestion)
+                if len(self.pending) >= options['batch_size']:
+                    self.flush()
+
+        self.flush()
+        self.report()
+
+    def find_pdfs(self, source):
+        if os.path.isdir(source):
+            pattern = os.path.join(source, '*.pdf')
+        else:
+            pattern = source
+        return sorted(path for path in glob.glob(pattern, recursive=True)
+                      if os.path.isfile(path) and path.lower().endswith('.pdf'))
+
+    def extract_all(self, paths):
+        """
+        Yield extracted MenuIngestions as extraction finishes, in completion order
+        """
+        workers = self.options['workers'] or 1
+        if workers <= 1:
+            for path in paths:
+                yield extract_pdf(path)
+            return
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for future in as_completed([pool.submit(extract_pdf, path) for path in paths]):
+                yield future.result()
+
+    def prepare(self, ingestion):
+        """
+        Decide whether an extracted file still needs structuring; resumes from ProcessingLog
+        """
+        if not ingestion.text:
+            self.fail(ingestion, 'Could not extract text from PDF')
+            return False
+
+        if not self.options['force']:
+            already_loaded = ProcessingLog.objects.filter(status=ProcessingLog.STATUS_SUCCESSFUL, menu__isnull=False)
+            if (already_loaded.filter(pdf_sha256=ingestion.pdf_sha256).exists()
+                    or already_loaded.filter(text_sha256=ingestion.text_sha256).exists()
+                    or ingestion.text_sha256 in self.seen_text_hashes):
+                self.counts['skipped'] += 1
+                self.progress(ingestion, 'skipped (already imported)')
+                return False
+        self.seen_text_hashes.add(ingestion.text_sha256)
+        return True
+
+    def flush(self):
+        """
+        Write the structured menus collected so far in a single transaction
+        """
+        batch, self.pending = self.pending, []
+        if not batch:
+            return
+
+        if self.options['dry_run']:
+            for ingestion in batch:
+                sections = ingestion.structured.get('menu_sections', [])
+                items = sum(len(section.get('items', [])) for section in sections)
+                self.counts['imported'] += 1
+                self.progress(ingestion, f"would import {len(sections)} section(s), {items} item(s)")
+            return
+
+        with transaction.atomic():
+            for ingestion in batch:
+                try:
+                    self.pipeline.run(ingestion, only=('load',))
+                except IngestionError as e:
+                    self.fail(ingestion, str(e))
+                    continue
+                record_ingestion(ingestion, 'success')
+                self.counts['imported'] += 1
+                self.progress(ingestion, f"imported as menu {ingestion.menu_id}")
+
+    def fail(self, ingestion, message):
+        self.counts['failed'] += 1
+        if not self.options['dry_run']:
+            ProcessingLog.objects.create(
+                status=ProcessingLog.STATUS_FAILED,
+                error_message=message,
+                source_file=ingestion.source,
+                pdf_sha256=ingestion.pdf_sha256,
+            )
+        self.progress(ingestion, self.style.ERROR(f"failed: {message}"))
+
+    def progress(self, ingestion, message):
+        self.done += 1
+        elapsed = time.perf_counter() - self.started
+        self.stdout.write(f"[{self.done}/{self.total}] {os.path.basename(ingestion.source)}: {message} "
+                          f"({self.done / elapsed if elapsed else 0:.2f} files/s)")
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started
+        self.stdout.write(self.style.SUCCESS(
+            f"Done in {elapsed:.1f}s: {self.counts['imported']} imported, {self.counts['skipped']} skipped, "
+            f"{self.counts['failed']} failed ({self.total / elapsed if elapsed else 0:.2f} files/s)"
+        ))
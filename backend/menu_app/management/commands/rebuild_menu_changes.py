@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from menu_app.diff import record_menu_changes
+from menu_app.models import Menu
+
+
+class Command(BaseCommand):
+    help = ('Recomputes the stored item changes (menu diffs and price history) of every menu version. '
+            'The loaders record them as menus are loaded; run this after deleting versions')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurant', type=int, help='Only this restaurant_id')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        menus = Menu.objects.only('menu_id', 'restaurant_id', 'version').order_by('restaurant_id', 'version')
+        if options['restaurant'] is not None:
+            menus = menus.filter(restaurant_id=options['restaurant'])
+
+        count = changes = 0
+        for menu in menus.iterator():
+            with transaction.atomic():
+                changes += record_menu_changes(menu, replace=True)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(
+            f"Recorded {changes} item change(s) for {count} menu(s) in {time.perf_counter() - started:.2f}s"
+        ))
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from menu_app.analytics import rebuild_analytics
+
+
+class Command(BaseCommand):
+    help = ('Rebuilds the analytics summary tables from every menu item. The loaders keep them up to date; '
+            'run this after migrating or after editing menus outside the API')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk insert')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        menus, dietary_rows = rebuild_analytics(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt analytics for {menus} menu(s), {dietary_rows} dietary row(s) in {time.perf_counter() - started:.2f}s"
+        ))
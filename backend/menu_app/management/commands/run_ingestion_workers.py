@@ -0,0 +1,44 @@
+import multiprocessing
+
+from django.core.management.base import BaseCommand
+
+from menu_app.jobs import worker_main
+
+
+class Command(BaseCommand):
+    help = 'Starts a pool of worker processes that run queued menu ingestion jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(),
+                            help='Number of worker processes (default: CPU count)')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to wait between polls when the queue is empty')
+        parser.add_argument('--drain', action='store_true',
+                            help='Exit once the queue is empty instead of polling forever')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        self.stdout.write(f"Starting {workers} ingestion worker(s)")
+
+        processes = [
+            multiprocessing.Process(
+                target=worker_main,
+                kwargs={'poll_interval': options['poll_interval'], 'exit_when_idle': options['drain']},
+                name=f'ingestion-worker-{i}'
+            )
+            for i in range(workers)
+        ]
+        for process in processes:
+            process.start()
+
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping ingestion workers")
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.join()
+
+        self.stdout.write(self.style.SUCCESS("Ingestion workers stopped"))
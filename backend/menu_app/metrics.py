@@ -0,0 +1,239 @@
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds; ingestion stages range from milliseconds (dedup) to minutes (LLM)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# Spans that partition an ingestion's wall time; llm and parse are nested inside structure
+TOP_LEVEL_STAGES = ('spool', 'extract', 'dedup', 'structure', 'normalize', 'validate', 'load')
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    Monotonic counter with optional labels, rendered in the Prometheus text format
+    """
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(tuple(str(labels[name]) for name in self.labelnames), 0)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield f"{self.name}_total{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram with optional labels, rendered in the Prometheus text format
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            series = self._series.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def snapshot(self, **labels):
+        """
+        {'buckets': {bound: cumulative count}, 'sum': ..., 'count': ...} for one label set
+        """
+        with self._lock:
+            series = list(self._series.get(tuple(str(labels[name]) for name in self.labelnames),
+                                           [0] * len(self.buckets) + [0.0, 0]))
+        return {'buckets': dict(zip(self.buckets, series[:-2])), 'sum': series[-2], 'count': series[-1]}
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def samples(self):
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        for key, values in sorted(series.items()):
+            for bound, count in zip(self.buckets, values):
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', repr(float(bound)))])} {count}"
+            yield f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', '+Inf')])} {values[-1]}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(values[-2])}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {values[-1]}"
+
+
+INGESTION_STAGE_SECONDS = Histogram(
+    'menu_ingestion_stage_seconds',
+    'Time spent in each ingestion stage (spool, extract, dedup, structure, llm, parse, normalize, validate, load) '
+    'by ingestions run in this server process; worker and import_menus runs are in ProcessingLogStage only',
+    labelnames=('stage',)
+)
+INGESTION_SECONDS = Histogram(
+    'menu_ingestion_seconds',
+    'End-to-end ingestion time by outcome (success, duplicate, failed) of ingestions run in this server process',
+    labelnames=('outcome',)
+)
+LLM_TOKENS = Counter(
+    'menu_llm_tokens',
+    'Tokens sent to (input) and generated by (output) the LLM while structuring menus in this server process',
+    labelnames=('direction',)
+)
+
+REGISTRY = [INGESTION_STAGE_SECONDS, INGESTION_SECONDS, LLM_TOKENS]
+
+
+def render_metrics():
+    """
+    All metrics of this process in the Prometheus text exposition format (version 0.0.4)
+    """
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return '\n'.join(lines) + '\n'
+
+
+def reset_metrics():
+    for metric in REGISTRY:
+        metric.clear()
+
+
+# The ingestion whose spans and tokens are being collected in this context (see collect())
+_current = contextvars.ContextVar('menu_ingestion', default=None)
+_span_lock = threading.Lock()
+
+
+@contextmanager
+def collect(ingestion):
+    """
+    Attribute spans and token counts recorded in this context to ingestion (its timings and tokens).
+    Worker threads started inside must run in a copy of the context (see chunking) to be included.
+    """
+    token = _current.set(ingestion)
+    try:
+        yield ingestion
+    finally:
+        _current.reset(token)
+
+
+def add_span(name, seconds):
+    ingestion = _current.get()
+    if ingestion is None:
+        return
+    with _span_lock:
+        ingestion.timings[name] = ingestion.timings.get(name, 0.0) + seconds
+
+
+@contextmanager
+def span(name):
+    """
+    Time the block into the current ingestion's timings under name (summed when repeated,
+    e.g. one LLM call per chunk). Nothing is recorded outside collect().
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_span(name, time.perf_counter() - started)
+
+
+def record_tokens(usage):
+    """
+    Count an LLM response's usage (input_tokens/output_tokens) for the process and the current ingestion
+    """
+    if usage is None:
+        return
+    LLM_TOKENS.inc(usage.input_tokens, direction='input')
+    LLM_TOKENS.inc(usage.output_tokens, direction='output')
+    ingestion = _current.get()
+    if ingestion is None:
+        return
+    with _span_lock:
+        ingestion.tokens['input'] += usage.input_tokens
+        ingestion.tokens['output'] += usage.output_tokens
+
+
+def record_ingestion(ingestion, outcome):
+    """
+    Observe a finished ingestion's spans in the histograms and store them with its ProcessingLog
+    row (the job's row, or the one the loader created for the new menu) when there is one.
+    Returns the log_id the spans were stored under, or None (also when no stage ran).
+    """
+    from .models import ProcessingLog, ProcessingLogStage
+
+    if not ingestion.timings:
+        return None
+
+    total = sum(seconds for name, seconds in ingestion.timings.items() if name in TOP_LEVEL_STAGES)
+    for name, seconds in ingestion.timings.items():
+        INGESTION_STAGE_SECONDS.observe(seconds, stage=name)
+    INGESTION_SECONDS.observe(total, outcome=outcome)
+
+    log_id = ingestion.log_id
+    if log_id is None and ingestion.menu_id is not None and outcome == 'success':
+        log_id = (ProcessingLog.objects.filter(menu_id=ingestion.menu_id)
+                  .order_by('-log_id').values_list('log_id', flat=True).first())
+    if log_id is None:
+        return None
+
+    try:
+        ProcessingLog.objects.filter(log_id=log_id).update(
+            duration_seconds=total,
+            input_tokens=ingestion.tokens['input'],
+            output_tokens=ingestion.tokens['output']
+        )
+        ProcessingLogStage.objects.bulk_create([
+            ProcessingLogStage(log_id=log_id, stage=name, seconds=seconds)
+            for name, seconds in ingestion.timings.items()
+        ])
+    except Exception as e:
+        # Timings are diagnostics; never fail an ingestion over them
+        logger.warning("Could not store timings for log %d: %s", log_id, e)
+        return None
+    return log_id
+
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu_app', '0002_alter_dietaryrestriction_label_alter_menu_date_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='processinglog',
+            name='source_file',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AlterField(
+            model_name='processinglog',
+            name='menu',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='menu_app.menu'),
+        ),
+    ]
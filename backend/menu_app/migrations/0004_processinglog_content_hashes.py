@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu_app', '0003_processinglog_job_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='processinglog',
+            name='force_reprocess',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='processinglog',
+            name='pdf_sha256',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='processinglog',
+            name='text_sha256',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+    ]
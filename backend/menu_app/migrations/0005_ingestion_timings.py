@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu_app', '0004_processinglog_content_hashes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='processinglog',
+            name='duration_seconds',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='processinglog',
+            name='input_tokens',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='processinglog',
+            name='output_tokens',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='ProcessingLogStage',
+            fields=[
+                ('stage_id', models.AutoField(primary_key=True, serialize=False)),
+                ('stage', models.CharField(max_length=20)),
+                ('seconds', models.FloatField()),
+                ('log', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='menu_app.processinglog')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['stage', 'seconds'], name='menu_app_pr_stage_1b7581_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu_app', '0005_ingestion_timings'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='menu',
+            name='restaurant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='menus', to='menu_app.restaurant'),
+        ),
+        migrations.AlterField(
+            model_name='menuitem',
+            name='section',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='menu_app.menusection'),
+        ),
+        migrations.AlterField(
+            model_name='menusection',
+            name='menu',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sections', to='menu_app.menu'),
+        ),
+    ]
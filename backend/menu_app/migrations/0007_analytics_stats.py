@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Sum
+
+
+def build_stats(apps, schema_editor):
+    """
+    Fill the summary tables from the items already loaded (same aggregation as analytics._build_stats)
+    """
+    Menu = apps.get_model('menu_app', 'Menu')
+    MenuItem = apps.get_model('menu_app', 'MenuItem')
+    MenuStats = apps.get_model('menu_app', 'MenuStats')
+    MenuDietaryStats = apps.get_model('menu_app', 'MenuDietaryStats')
+
+    totals = {
+        row['section__menu_id']: row
+        for row in MenuItem.objects.values('section__menu_id').annotate(
+            item_count=Count('item_id'), price_sum=Sum('price'), min_price=Min('price'), max_price=Max('price')
+        ).order_by()
+    }
+    MenuStats.objects.bulk_create([
+        MenuStats(
+            menu_id=menu_id, restaurant_id=restaurant_id,
+            item_count=totals.get(menu_id, {}).get('item_count', 0),
+            price_sum=totals.get(menu_id, {}).get('price_sum') or 0,
+            min_price=totals.get(menu_id, {}).get('min_price'),
+            max_price=totals.get(menu_id, {}).get('max_price'),
+        )
+        for menu_id, restaurant_id in Menu.objects.values_list('menu_id', 'restaurant_id').iterator()
+    ], batch_size=1000)
+    MenuDietaryStats.objects.bulk_create([
+        MenuDietaryStats(menu_id=row['section__menu_id'], dietary_restriction_id=row['dietary_restriction_id'],
+                         item_count=row['item_count'])
+        for row in MenuItem.objects.values('section__menu_id', 'dietary_restriction_id').annotate(
+            item_count=Count('item_id')
+        ).order_by()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu_app', '0006_related_names'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MenuStats',
+            fields=[
+                ('menu', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='menu_app.menu')),
+                ('item_count', models.IntegerField(default=0)),
+                ('price_sum', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('min_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('max_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='menu_stats', to='menu_app.restaurant')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MenuDietaryStats',
+            fields=[
+                ('stat_id', models.AutoField(primary_key=True, serialize=False)),
+                ('item_count', models.IntegerField(default=0)),
+                ('dietary_restriction', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='menu_app.dietaryrestriction')),
+                ('menu', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dietary_stats', to='menu_app.menu')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['dietary_restriction', 'menu'], name='menu_app_me_dietary_6f8a6d_idx')],
+            },
+        ),
+        migrations.RunPython(build_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def point_at_latest_versions(apps, schema_editor):
+    Menu = apps.get_model('menu_app', 'Menu')
+    Restaurant = apps.get_model('menu_app', 'Restaurant')
+    Restaurant.objects.update(current_menu_id=Subquery(
+        Menu.objects.filter(restaurant_id=OuterRef('restaurant_id')).order_by('-version').values('menu_id')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu_app', '0007_analytics_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='current_menu',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='menu_app.menu'),
+        ),
+        migrations.RunPython(point_at_latest_versions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,127 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:18
+
+import unicodedata
+from itertools import groupby
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def item_match_key(section_name, item_name):
+    """
+    Frozen copy of menu_app.diff.item_match_key as of this migration, so later changes to the
+    app's key do not change what this migration computes
+    """
+    def normalize(text):
+        text = unicodedata.normalize('NFKD', text or '')
+        return ' '.join(''.join(c for c in text if not unicodedata.combining(c)).lower().split())
+
+    return f"{normalize(section_name)}|{normalize(item_name)}"[:255]
+
+
+def fill_match_keys(apps, schema_editor):
+    MenuItem = apps.get_model('menu_app', 'MenuItem')
+    batch = []
+    for item in MenuItem.objects.select_related('section').only('item_id', 'name', 'section__section_name').iterator():
+        item.match_key = item_match_key(item.section.section_name, item.name)
+        batch.append(item)
+        if len(batch) >= 1000:
+            MenuItem.objects.bulk_update(batch, ['match_key'])
+            batch = []
+    MenuItem.objects.bulk_update(batch, ['match_key'])
+
+
+def item_changes(MenuItemChange, menu, items, previous_items):
+    """
+    Changes of menu against the restaurant's previous version, as diff.record_menu_changes records them
+    (every item is added when there is no previous version)
+    """
+    def change(kind, item, old_price, new_price):
+        return MenuItemChange(menu_id=menu.menu_id, restaurant_id=menu.restaurant_id, kind=kind,
+                              match_key=item['match_key'], name=item['name'],
+                              section_name=item['section__section_name'], old_price=old_price, new_price=new_price)
+
+    if previous_items is None:
+        return [change('added', item, None, item['price']) for item in items]
+
+    previous = {}
+    for item in previous_items:  # In item_id order; the first item under a key is the one compared against
+        previous.setdefault(item['match_key'], item)
+    keys = {item['match_key'] for item in items}
+    return (
+        [change('added', item, None, item['price']) for item in items if item['match_key'] not in previous]
+        + [change('removed', item, item['price'], None) for item in previous_items if item['match_key'] not in keys]
+        + [change('repriced', item, previous[item['match_key']]['price'], item['price']) for item in items
+           if item['match_key'] in previous and previous[item['match_key']]['price'] != item['price']]
+    )
+
+
+def record_item_changes(apps, schema_editor):
+    """
+    Record the changes of every menu version already loaded, so diffs and price history cover them
+    """
+    Menu = apps.get_model('menu_app', 'Menu')
+    MenuItem = apps.get_model('menu_app', 'MenuItem')
+    MenuItemChange = apps.get_model('menu_app', 'MenuItemChange')
+
+    menus = Menu.objects.only('menu_id', 'restaurant_id', 'version').order_by('restaurant_id', 'version', 'menu_id')
+    for _, restaurant_menus in groupby(menus.iterator(), key=lambda menu: menu.restaurant_id):
+        # Items of the latest menu loaded so far, and of the latest one with a lower version than menu's
+        latest = earlier = version = None
+        for menu in restaurant_menus:
+            if menu.version != version:
+                earlier, version = latest, menu.version
+            latest = list(MenuItem.objects.filter(section__menu_id=menu.menu_id).order_by('item_id')
+                          .values('match_key', 'name', 'price', 'section__section_name'))
+            MenuItemChange.objects.bulk_create(item_changes(MenuItemChange, menu, latest, earlier), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu_app', '0008_restaurant_current_menu'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MenuItemChange',
+            fields=[
+                ('change_id', models.AutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(max_length=10)),
+                ('match_key', models.CharField(max_length=255)),
+                ('name', models.CharField(max_length=100)),
+                ('section_name', models.CharField(max_length=100)),
+                ('old_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('new_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='match_key',
+            field=models.CharField(default='', max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(fields=['section', 'match_key'], name='menu_app_me_section_40c343_idx'),
+        ),
+        migrations.AddField(
+            model_name='menuitemchange',
+            name='menu',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='item_changes', to='menu_app.menu'),
+        ),
+        migrations.AddField(
+            model_name='menuitemchange',
+            name='restaurant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='item_changes', to='menu_app.restaurant'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitemchange',
+            index=models.Index(fields=['menu', 'kind'], name='menu_app_me_menu_id_435541_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitemchange',
+            index=models.Index(fields=['restaurant', 'match_key'], name='menu_app_me_restaur_82af22_idx'),
+        ),
+        migrations.RunPython(fill_match_keys, migrations.RunPython.noop),
+        migrations.RunPython(record_item_changes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:02
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def start_heartbeats_at_claims(apps, schema_editor):
+    ProcessingLog = apps.get_model('menu_app', 'ProcessingLog')
+    ProcessingLog.objects.filter(claimed_at__isnull=False).update(heartbeat_at=F('claimed_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu_app', '0010_processinglog_claimed_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='processinglog',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(start_heartbeats_at_claims, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:44
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, OuterRef, Subquery
+
+
+def key_restaurants_by_name(apps, schema_editor):
+    """
+    The loaders matched restaurants by name, oldest first; that restaurant keeps receiving the loads
+    """
+    Restaurant = apps.get_model('menu_app', 'Restaurant')
+    first_ids = (Restaurant.objects.exclude(name='').values('name')
+                 .annotate(first_id=Min('restaurant_id')).values_list('first_id', flat=True))
+    for restaurant in Restaurant.objects.filter(restaurant_id__in=list(first_ids)).iterator():
+        restaurant.name_key = restaurant.name
+        restaurant.save(update_fields=['name_key'])
+
+
+def renumber_duplicate_versions(apps, schema_editor):
+    """
+    Menus that concurrent loads gave the same version move to the end, in load order, and the
+    restaurant points at whichever is now its latest
+    """
+    Menu = apps.get_model('menu_app', 'Menu')
+    Restaurant = apps.get_model('menu_app', 'Restaurant')
+    duplicates = (Menu.objects.values('restaurant_id', 'version').annotate(menus=Count('menu_id'))
+                  .filter(menus__gt=1).order_by())
+    for row in list(duplicates):
+        menus = Menu.objects.filter(restaurant_id=row['restaurant_id'])
+        next_version = menus.aggregate(Max('version'))['version__max'] + 1
+        for menu in menus.filter(version=row['version']).order_by('menu_id')[1:]:
+            menu.version = next_version
+            menu.save(update_fields=['version'])
+            next_version += 1
+        Restaurant.objects.filter(restaurant_id=row['restaurant_id']).update(current_menu_id=Subquery(
+            Menu.objects.filter(restaurant_id=OuterRef('restaurant_id')).order_by('-version').values('menu_id')[:1]
+        ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu_app', '0011_processinglog_heartbeat_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='name_key',
+            field=models.CharField(blank=True, editable=False, max_length=100, null=True, unique=True),
+        ),
+        migrations.RunPython(key_restaurants_by_name, migrations.RunPython.noop),
+        migrations.RunPython(renumber_duplicate_versions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='menu',
+            constraint=models.UniqueConstraint(fields=('restaurant', 'version'), name='unique_menu_version'),
+        ),
+    ]
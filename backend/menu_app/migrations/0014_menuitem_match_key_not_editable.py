@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu_app', '0013_analytics_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='menuitem',
+            name='match_key',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+    ]
@@ -4,13 +4,19 @@ class Restaurant(models.Model):
     restaurant_id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=100, db_index=True)  # Add index for searches
     location = models.CharField(max_length=200, db_index=True)  # Add index for location filtering
+    # Name the loaders find the restaurant under; unique, so concurrent loads cannot create it twice
+    # (null for restaurants created elsewhere until a load adopts them)
+    name_key = models.CharField(max_length=100, unique=True, null=True, blank=True, editable=False)
+    # Latest loaded version, kept by the loader; analytics and menu lists default to these
+    current_menu = models.ForeignKey('Menu', on_delete=models.SET_NULL, null=True, blank=True,
+                                     to_field='menu_id', related_name='+')
 
     def __str__(self):
         return self.name
 
 class Menu(models.Model):
     menu_id = models.AutoField(primary_key=True)
-    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, to_field='restaurant_id')
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, to_field='restaurant_id', related_name='menus')
     version = models.IntegerField(db_index=True)  # Add index for version queries
     date = models.DateField(db_index=True)  # Add index for date filtering
 
@@ -18,13 +24,16 @@ class Menu(models.Model):
         indexes = [
             models.Index(fields=['restaurant', 'version'])  # Composite index for restaurant-version queries
         ]
+        constraints = [
+            models.UniqueConstraint(fields=['restaurant', 'version'], name='unique_menu_version'),
+        ]
 
     def __str__(self):
         return f"Menu {self.version} for {self.restaurant.name}"
 
 class MenuSection(models.Model):
     section_id = models.AutoField(primary_key=True)
-    menu = models.ForeignKey(Menu, on_delete=models.CASCADE, to_field='menu_id')
+    menu = models.ForeignKey(Menu, on_delete=models.CASCADE, to_field='menu_id', related_name='sections')
     section_name = models.CharField(max_length=100, db_index=True)  # Add index for section name searches
     section_order = models.IntegerField(db_index=True)  # Add index for ordering
 
@@ -40,27 +49,74 @@ class DietaryRestriction(models.Model):
 
 class MenuItem(models.Model):
     item_id = models.AutoField(primary_key=True)
-    section = models.ForeignKey(MenuSection, on_delete=models.CASCADE, to_field='section_id')
+    section = models.ForeignKey(MenuSection, on_delete=models.CASCADE, to_field='section_id', related_name='items')
     name = models.CharField(max_length=100, db_index=True)  # Add index for name searches
     description = models.TextField(null=True, blank=True)
     price = models.DecimalField(max_digits=10, decimal_places=2, db_index=True)  # Add index for price filtering
     dietary_restriction = models.ForeignKey(DietaryRestriction, null=True, blank=True,
                                           on_delete=models.SET_NULL, to_field='restriction_id')
+    # Normalized "section|name" matched across versions; set on save (see signals) and by the loaders' bulk inserts
+    match_key = models.CharField(max_length=255, default='', editable=False)
 
     class Meta:
         indexes = [
             models.Index(fields=['section', 'name']),  # Composite index for section-name queries
-            models.Index(fields=['price', 'dietary_restriction'])  # Composite index for filtering
+            models.Index(fields=['price', 'dietary_restriction']),  # Composite index for filtering
+            models.Index(fields=['section', 'match_key'])  # Composite index for diffing menu versions
         ]
 
     def __str__(self):
         return self.name
 
+class MenuItemChange(models.Model):
+    """
+    How an item differs from the restaurant's previous menu version, recorded at load time.
+    A restaurant's rows for one match_key form that item's price history.
+    """
+    KIND_ADDED = 'added'
+    KIND_REMOVED = 'removed'
+    KIND_REPRICED = 'repriced'
+
+    change_id = models.AutoField(primary_key=True)
+    menu = models.ForeignKey(Menu, on_delete=models.CASCADE, to_field='menu_id', related_name='item_changes')  # Version the change appeared in
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, to_field='restaurant_id',
+                                   related_name='item_changes')
+    kind = models.CharField(max_length=10)
+    match_key = models.CharField(max_length=255)
+    name = models.CharField(max_length=100)
+    section_name = models.CharField(max_length=100)
+    old_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)  # Null when added
+    new_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)  # Null when removed
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['menu', 'kind']),  # Diff of one version
+            models.Index(fields=['restaurant', 'match_key'])  # Price history of one item
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.name}"
+
 class ProcessingLog(models.Model):
+    STATUS_QUEUED = 'queued'
+    STATUS_PROCESSING = 'processing'
+    STATUS_SUCCESSFUL = 'successful'
+    STATUS_FAILED = 'failed'
+
     log_id = models.AutoField(primary_key=True)
-    menu = models.ForeignKey(Menu, on_delete=models.CASCADE, to_field='menu_id')
+    # Null while an ingestion job is queued or processing; set once the menu is loaded
+    menu = models.ForeignKey(Menu, null=True, blank=True, on_delete=models.CASCADE, to_field='menu_id')
     status = models.CharField(max_length=50, db_index=True)  # Add index for status filtering
     error_message = models.TextField(null=True, blank=True)
+    source_file = models.CharField(max_length=255, null=True, blank=True)  # Spooled upload for queued jobs
+    pdf_sha256 = models.CharField(max_length=64, null=True, blank=True, db_index=True)  # Hash of the uploaded PDF bytes
+    text_sha256 = models.CharField(max_length=64, null=True, blank=True, db_index=True)  # Hash of the normalized extracted text
+    force_reprocess = models.BooleanField(default=False)  # Queued job bypasses duplicate detection
+    claimed_at = models.DateTimeField(null=True, blank=True)  # When a worker took the job; identifies its claim
+    heartbeat_at = models.DateTimeField(null=True, blank=True)  # Last sign of life from the worker; stale jobs are requeued
+    duration_seconds = models.FloatField(null=True, blank=True)  # Wall time of the ingestion (sum of its top-level stages)
+    input_tokens = models.PositiveIntegerField(null=True, blank=True)  # LLM prompt tokens spent on this menu
+    output_tokens = models.PositiveIntegerField(null=True, blank=True)  # LLM completion tokens spent on this menu
     timestamp = models.DateTimeField(auto_now_add=True, db_index=True)  # Add index for timestamp queries
 
     class Meta:
@@ -69,4 +125,61 @@ class ProcessingLog(models.Model):
         ]
 
     def __str__(self):
-        return f"Log for Menu {self.menu.menu_id}"
\ No newline at end of file
+        if self.menu_id is None:
+            return f"Log {self.log_id} ({self.status})"
+        return f"Log for Menu {self.menu_id}"
+
+class ProcessingLogStage(models.Model):
+    # One timing span of an ingestion: spool, extract, dedup, structure (with llm and parse inside), normalize, validate, load
+    stage_id = models.AutoField(primary_key=True)
+    log = models.ForeignKey(ProcessingLog, on_delete=models.CASCADE, to_field='log_id')
+    stage = models.CharField(max_length=20)
+    seconds = models.FloatField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['stage', 'seconds'])  # Composite index for per-stage percentile queries
+        ]
+
+    def __str__(self):
+        return f"{self.stage} {self.seconds:.3f}s (log {self.log_id})"
+
+
+class MenuStats(models.Model):
+    # Materialized aggregates of one menu's items, written when the menu is loaded (see menu_app.analytics)
+    menu = models.OneToOneField(Menu, primary_key=True, on_delete=models.CASCADE, to_field='menu_id', related_name='stats')
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, to_field='restaurant_id',
+                                   related_name='menu_stats')  # Denormalized so analytics never join menus
+    item_count = models.IntegerField(default=0)
+    price_sum = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    def __str__(self):
+        return f"Stats for Menu {self.menu_id}"
+
+
+class MenuDietaryStats(models.Model):
+    # Items per dietary restriction in one menu; restriction is null for items without one
+    stat_id = models.AutoField(primary_key=True)
+    menu = models.ForeignKey(Menu, on_delete=models.CASCADE, to_field='menu_id', related_name='dietary_stats')
+    dietary_restriction = models.ForeignKey(DietaryRestriction, null=True, blank=True,
+                                            on_delete=models.CASCADE, to_field='restriction_id')
+    item_count = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['dietary_restriction', 'menu'])  # Composite index for per-restriction totals
+        ]
+
+    def __str__(self):
+        return f"{self.item_count} items with restriction {self.dietary_restriction_id} in Menu {self.menu_id}"
+
+
+class AnalyticsVersion(models.Model):
+    # Single row numbering committed data changes; analytics results are cached per version (see menu_app.analytics_cache)
+    version_id = models.AutoField(primary_key=True)
+    version = models.BigIntegerField()
+
+    def __str__(self):
+        return f"Analytics version {self.version}"
@@ -0,0 +1,47 @@
+import unicodedata
+
+
+def normalize_spanish_text(text):
+    """
+    Normalize Spanish text by removing accents and converting to standard characters
+    """
+    if isinstance(text, str):
+        normalized = unicodedata.normalize('NFKD', text)
+        return ''.join(c for c in normalized if not unicodedata.combining(c))
+    return text
+
+
+def clean_structured_data(structured_data):
+    """
+    Clean the structured data by applying accent normalization
+    """
+
+    def deep_normalize(obj):
+        if isinstance(obj, dict):
+            return {k: deep_normalize(v) for k, v in obj.items()}
+        elif isinstance(obj, list):
+            return [deep_normalize(item) for item in obj]
+        elif isinstance(obj, str):
+            return normalize_spanish_text(obj)
+        return obj
+
+    return deep_normalize(structured_data)
+
+
+def normalize_in_place(obj):
+    """
+    Apply accent normalization to every string in a parsed JSON structure without copying it
+    """
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            if isinstance(value, str):
+                obj[key] = normalize_spanish_text(value)
+            else:
+                normalize_in_place(value)
+    elif isinstance(obj, list):
+        for index, value in enumerate(obj):
+            if isinstance(value, str):
+                obj[index] = normalize_spanish_text(value)
+            else:
+                normalize_in_place(value)
+    return obj
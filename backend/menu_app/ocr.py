@@ -0,0 +1,127 @@
+import hashlib
+import io
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+import fitz  # PyMuPDF
+from django.conf import settings
+
+from .PDFreader import PdfSource, open_pdf
+from .llm_cache import get_llm_cache, llm_cache_bypassed, make_cache_key
+
+try:
+    import pytesseract
+except ImportError:  # optional dependency; scanned menus simply cannot be read without it
+    pytesseract = None
+
+logger = logging.getLogger(__name__)
+
+OCR_ENGINE = 'tesseract'
+
+
+def ocr_available() -> bool:
+    return pytesseract is not None
+
+
+def render_pages(pdf_source: PdfSource, dpi: int) -> List[bytes]:
+    """
+    Render every page to a grayscale PNG. Higher DPI reads small print better but OCR time
+    grows roughly with the pixel count (300 DPI is about 2x the work of 200 DPI).
+    """
+    doc = open_pdf(pdf_source)
+    try:
+        return [
+            doc.load_page(page_num).get_pixmap(dpi=dpi, colorspace=fitz.csGRAY).tobytes("png")
+            for page_num in range(doc.page_count)
+        ]
+    finally:
+        doc.close()
+
+
+def ocr_image(png: bytes, lang: str, config: str, timeout: float) -> str:
+    """
+    OCR one rendered page. Runs in a worker process; Tesseract is killed after timeout seconds.
+    """
+    from PIL import Image
+
+    with Image.open(io.BytesIO(png)) as image:
+        return pytesseract.image_to_string(image, lang=lang, config=config, timeout=timeout).strip()
+
+
+def page_cache_key(png: bytes, lang: str, config: str) -> str:
+    """
+    Pages are keyed on the rendered image, so the same scan is only OCRed once per language/config
+    """
+    return make_cache_key(OCR_ENGINE, f"{lang}:{config}", hashlib.sha256(png).hexdigest())
+
+
+def kill_pool(executor: ProcessPoolExecutor):
+    """
+    Stop a pool with a wedged worker: a plain shutdown (or leaving a with block) would wait for it forever
+    """
+    processes = list((executor._processes or {}).values())  # shutdown() drops the reference
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.join(timeout=5)
+    logger.warning("OCR worker stopped responding; terminated %d worker process(es)", len(processes))
+
+
+def ocr_pdf(pdf_source: PdfSource) -> Optional[str]:
+    """
+    OCR an image-only PDF page by page and return the page texts separated by blank lines,
+    or None when nothing could be read. Uncached pages are spread over a process pool
+    (one page per task); results are cached per page in the LLM response cache backend.
+    A page that fails or exceeds MENU_OCR_PAGE_TIMEOUT is skipped, the rest are kept.
+    """
+    if not ocr_available():
+        logger.warning("pytesseract is not installed; cannot read image-only PDFs")
+        return None
+
+    lang = settings.MENU_OCR_LANG
+    config = settings.MENU_OCR_CONFIG
+    timeout = settings.MENU_OCR_PAGE_TIMEOUT
+
+    pages = render_pages(pdf_source, settings.MENU_OCR_DPI)
+    keys = [page_cache_key(png, lang, config) for png in pages]
+    cache = None if llm_cache_bypassed() else get_llm_cache()
+
+    texts = [cache.get(key) if cache else None for key in keys]
+    todo = [page_num for page_num, text in enumerate(texts) if text is None]
+    logger.info("OCR: pages=%d dpi=%d cached=%d", len(pages), settings.MENU_OCR_DPI, len(pages) - len(todo))
+
+    def collect(page_num, run):
+        try:
+            texts[page_num] = run()
+        except Exception as e:
+            logger.warning("OCR of page %d failed: %s: %s", page_num + 1, type(e).__name__, e)
+            texts[page_num] = ''
+            return
+        if cache:
+            cache.set(keys[page_num], texts[page_num])
+
+    workers = min(settings.MENU_OCR_WORKERS or os.cpu_count() or 1, len(todo))
+    if workers <= 1:
+        for page_num in todo:
+            collect(page_num, lambda: ocr_image(pages[page_num], lang, config, timeout))
+    elif todo:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        wedged = False
+        try:
+            futures = {page_num: executor.submit(ocr_image, pages[page_num], lang, config, timeout)
+                       for page_num in todo}
+            for page_num, future in futures.items():
+                # Tesseract's own timeout fires first; this only guards a wedged worker
+                collect(page_num, lambda: future.result(timeout=timeout + 10))
+                wedged = wedged or not future.done()
+        finally:
+            if wedged:
+                kill_pool(executor)
+            else:
+                executor.shutdown()
+
+    combined = "\n\n".join(text for text in texts if text).strip()
+    return combined or None
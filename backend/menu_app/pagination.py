@@ -0,0 +1,17 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class PrimaryKeyCursorPagination(CursorPagination):
+    """
+    Default pagination for the API viewsets. Pages are keyed on the primary key, so fetching
+    any page is an indexed range scan (no OFFSET, no COUNT) and costs the same however large
+    the table grows; rows inserted while a client pages through are neither skipped nor repeated.
+    ?page_size=N picks a page size up to API_MAX_PAGE_SIZE.
+    """
+    ordering = 'pk'
+    page_size_query_param = 'page_size'
+
+    @property
+    def max_page_size(self):
+        return settings.API_MAX_PAGE_SIZE
@@ -0,0 +1,267 @@
+import logging
+
+from .PDFreader import extract_text_from_pdf, extract_text_from_image
+from .dedup import find_duplicate, text_sha256
+from .loader import DIETARY_RESTRICTIONS, insert_into_database
+from .metrics import collect, span
+from .normalize import normalize_in_place
+
+logger = logging.getLogger(__name__)
+
+DIETARY_RESTRICTION_IDS = {label.casefold(): restriction_id for restriction_id, label in DIETARY_RESTRICTIONS.items()}
+
+
+class IngestionError(Exception):
+    """
+    Raised when a pipeline stage cannot produce its output; stage names the stage that failed
+    """
+
+    def __init__(self, message, stage):
+        super().__init__(message)
+        self.stage = stage
+
+
+class MenuIngestion:
+    """
+    One menu on its way through the pipeline. Each stage reads what earlier stages produced:
+    source -> text (+ text_sha256) -> structured -> menu_id. structured always uses the
+    loader's schema once normalized (see to_common_schema).
+    """
+
+    def __init__(self, source=None, text=None, pdf_sha256=None, text_sha256=None, log_id=None,
+                 dedup=False, stream=False, claimed_at=None):
+        self.source = source            # PDF path or in-memory bytes
+        self.text = text
+        self.pdf_sha256 = pdf_sha256
+        self.text_sha256 = text_sha256
+        self.log_id = log_id            # ProcessingLog row to complete (queued jobs)
+        self.claimed_at = claimed_at    # The job's claim; the load only completes the row while it holds
+        self.dedup = dedup
+        self.stream = stream
+        self.structured = None
+        self.menu_id = None
+        self.duplicate = None           # ProcessingLog of an earlier upload with the same text
+        self.timings = {}               # stage or span name -> seconds (see metrics.TOP_LEVEL_STAGES)
+        self.tokens = {'input': 0, 'output': 0}
+
+    @property
+    def finished(self):
+        return self.duplicate is not None or self.menu_id is not None
+
+
+def to_common_schema(data):
+    """
+    Bring the structuring outputs used across the project to the loader's schema, in place:
+    {"restaurant": {"name", "location"}, "menu_sections": [{"section_name", "items": [
+        {"name", "description", "price", "dietary_restriction_id"}]}]}
+    - restaurant_name / restaurant_location (api_integration and AIreader prompts) become "restaurant"
+    - a "dietary_restriction" label ("Vegan", ...) becomes its dietary_restriction_id
+    Anything that is not an object is returned unchanged for validation to reject.
+    """
+    if not isinstance(data, dict):
+        return data
+
+    if not isinstance(data.get('restaurant'), dict):
+        data['restaurant'] = {
+            'name': data.pop('restaurant_name', None),
+            'location': data.pop('restaurant_location', None),
+        }
+
+    for section in data.get('menu_sections') or []:
+        if not isinstance(section, dict):
+            continue
+        for item in section.get('items') or []:
+            item_to_common_schema(item)
+
+    return data
+
+
+def item_to_common_schema(item):
+    """
+    to_common_schema for a single item, in place (the streaming path sees items one at a time)
+    """
+    if isinstance(item, dict) and 'dietary_restriction_id' not in item:
+        label = str(item.pop('dietary_restriction', '') or '').strip().casefold()
+        item['dietary_restriction_id'] = DIETARY_RESTRICTION_IDS.get(label, 1)
+    return item
+
+
+def validate_item(item):
+    """
+    Validate one normalized item in place: returns it with the price coerced to a number and
+    an unknown dietary ID replaced by 1, or None when it is not an object or has no name
+    """
+    if not isinstance(item, dict) or not str(item.get('name') or '').strip():
+        return None
+    try:
+        item['price'] = float(item.get('price') or 0)
+    except (TypeError, ValueError):
+        item['price'] = 0
+    if item.get('dietary_restriction_id') not in DIETARY_RESTRICTIONS:
+        item['dietary_restriction_id'] = 1
+    return item
+
+
+def validate_menu(structured):
+    """
+    Check the normalized menu before it is loaded: malformed sections and items (not objects,
+    or items without a name) are dropped, prices are coerced to numbers and dietary IDs outside
+    the known set fall back to 1 (see validate_item). Raises ValueError when the menu itself is not an object.
+    """
+    if not isinstance(structured, dict):
+        raise ValueError(f"Structured menu must be an object, got {type(structured).__name__}")
+
+    sections = []
+    for section in structured.get('menu_sections') or []:
+        if not isinstance(section, dict):
+            continue
+        section['items'] = [item for item in section.get('items') or [] if validate_item(item) is not None]
+        sections.append(section)
+
+    structured['menu_sections'] = sections
+    return structured
+
+
+class Stage:
+    """
+    One step of the pipeline. run() reads and updates the MenuIngestion in place.
+    """
+    name = None
+
+    def run(self, ingestion):
+        raise NotImplementedError
+
+
+class ExtractStage(Stage):
+    """
+    PDF -> text, with the OCR fallback for image-only PDFs
+    """
+    name = 'extract'
+
+    def __init__(self, extract=extract_text_from_pdf, fallback=extract_text_from_image):
+        self.extract = extract
+        self.fallback = fallback
+
+    def run(self, ingestion):
+        text = self.extract(ingestion.source)
+        if not text and self.fallback is not None:
+            text = self.fallback(ingestion.source)
+        if not text:
+            raise IngestionError('Could not extract text from PDF', self.name)
+        ingestion.text = text
+        ingestion.text_sha256 = text_sha256(text)
+
+
+class DedupStage(Stage):
+    """
+    Stop early when an earlier upload already produced a menu from the same text
+    """
+    name = 'dedup'
+
+    def run(self, ingestion):
+        if ingestion.dedup:
+            ingestion.duplicate = find_duplicate(text_sha256=ingestion.text_sha256, exclude_log_id=ingestion.log_id)
+
+
+class StructureStage(Stage):
+    """
+    Text -> structured menu.
+    - rules(text) returns a structured menu when a local parse is good enough, else None.
+    - stream(ingestion) structures and loads in one go for ingestion.stream, returning the
+      menu_id or None when the text cannot be streamed; the remaining stages are then skipped,
+      so stream has to normalize and validate each item itself (see validate_item).
+    - structure(text) is the general path (the LLM).
+    """
+    name = 'structure'
+
+    def __init__(self, structure, rules=None, stream=None):
+        self.structure = structure
+        self.rules = rules
+        self.stream = stream
+
+    def run(self, ingestion):
+        structured = self.rules(ingestion.text) if self.rules is not None else None
+        if structured is None and ingestion.stream and self.stream is not None:
+            ingestion.menu_id = self.stream(ingestion)
+            if ingestion.menu_id is not None:
+                return
+        ingestion.structured = structured if structured is not None else self.structure(ingestion.text)
+
+
+class NormalizeStage(Stage):
+    name = 'normalize'
+
+    def __init__(self, normalize=normalize_in_place):
+        self.normalize = normalize
+
+    def run(self, ingestion):
+        ingestion.structured = self.normalize(to_common_schema(ingestion.structured))
+
+
+class ValidateStage(Stage):
+    name = 'validate'
+
+    def __init__(self, validate=validate_menu):
+        self.validate = validate
+
+    def run(self, ingestion):
+        try:
+            ingestion.structured = self.validate(ingestion.structured)
+        except ValueError as e:
+            raise IngestionError(str(e), self.name)
+
+
+class LoadStage(Stage):
+    name = 'load'
+
+    def __init__(self, load=insert_into_database):
+        self.load = load
+
+    def run(self, ingestion):
+        ingestion.menu_id = self.load(
+            ingestion.structured, log_id=ingestion.log_id, claimed_at=ingestion.claimed_at,
+            pdf_sha256=ingestion.pdf_sha256, text_sha256=ingestion.text_sha256
+        )
+        if not ingestion.menu_id:
+            raise IngestionError('Failed to insert data into database', self.name)
+
+
+class Pipeline:
+    """
+    Runs stages in order over a MenuIngestion, timing each one into ingestion.timings along
+    with the spans recorded inside it (llm, parse; see metrics.span). Stops as soon as the
+    ingestion is finished (duplicate found or menu loaded).
+    only / skip restrict which stages run, for callers that spread stages over workers.
+    """
+
+    def __init__(self, stages):
+        self.stages = list(stages)
+
+    def run(self, ingestion, only=None, skip=()):
+        with collect(ingestion):
+            for stage in self.stages:
+                if (only is not None and stage.name not in only) or stage.name in skip:
+                    continue
+                if ingestion.finished:
+                    break
+                with span(stage.name):
+                    stage.run(ingestion)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Stage timings: %s",
+                        " ".join(f"{name}={seconds:.3f}s" for name, seconds in ingestion.timings.items()))
+        return ingestion
+
+
+def build_pipeline(structure, extract=extract_text_from_pdf, fallback=extract_text_from_image,
+                   rules=None, stream=None, load=insert_into_database):
+    """
+    The standard extract -> dedup -> structure -> normalize -> validate -> load pipeline
+    """
+    return Pipeline([
+        ExtractStage(extract, fallback),
+        DedupStage(),
+        StructureStage(structure, rules=rules, stream=stream),
+        NormalizeStage(),
+        ValidateStage(),
+        LoadStage(load),
+    ])
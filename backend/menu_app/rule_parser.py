@@ -0,0 +1,215 @@
+import re
+from typing import List, Optional, Tuple
+
+from .layout import PRICE_ONLY_RE, parse_price, split_price
+
+# Menus priced above this are almost certainly mis-read numbers (years, phone numbers, ...)
+MAX_PLAUSIBLE_PRICE = 1000
+
+HEADING_MAX_CHARS = 40
+HEADING_MAX_WORDS = 6
+
+# Keyword -> dietary_restriction_id (see loader.DIETARY_RESTRICTIONS); first match wins
+DIETARY_KEYWORDS = [
+    (re.compile(r'\bvegan[oa]?\b|\(vg\)', re.IGNORECASE), 2),
+    (re.compile(r'\bvegetarian[oa]?\b|\(v\)', re.IGNORECASE), 3),
+    (re.compile(r'\bgluten[- ]free\b|\bsin gluten\b|\(gf\)', re.IGNORECASE), 4),
+    (re.compile(r'\blactose[- ]free\b|\bsin lactosa\b|\(lf\)', re.IGNORECASE), 5),
+]
+
+
+def guess_dietary_restriction(*texts) -> int:
+    """
+    Only explicit markers are recognised; unlike Claude the parser does not infer from ingredients
+    """
+    joined = ' '.join(text for text in texts if text)
+    for pattern, restriction_id in DIETARY_KEYWORDS:
+        if pattern.search(joined):
+            return restriction_id
+    return 1
+
+
+def _looks_like_heading(line: str) -> bool:
+    return (len(line) <= HEADING_MAX_CHARS
+            and len(line.split()) <= HEADING_MAX_WORDS
+            and ',' not in line
+            and not line.endswith('.')
+            and any(c.isalpha() for c in line))
+
+
+def _is_title(line: str) -> bool:
+    """
+    Upper case, a single word, or every longer word capitalised: set like a heading, not a description
+    """
+    words = [word for word in line.split() if word[0].isalpha()]
+    return line.isupper() or len(words) == 1 or all(word[0].isupper() for word in words if len(word) > 3)
+
+
+class _MenuBuilder:
+    def __init__(self):
+        self.restaurant = {'name': None, 'location': None}
+        self.sections = []
+        self.current_item = None
+        self.explained = 0
+        self.unexplained = 0
+
+    def section(self, name):
+        self.sections.append({'section_name': name, 'items': []})
+        self.current_item = None
+        self.explained += 1
+
+    def item(self, name, price, description=None):
+        if not self.sections:
+            self.sections.append({'section_name': 'Menu', 'items': []})
+        self.current_item = {
+            'name': name,
+            'description': description,
+            'price': price,
+            'dietary_restriction_id': 1,
+        }
+        self.sections[-1]['items'].append(self.current_item)
+        self.explained += 1
+
+    def describe(self, text):
+        if self.current_item is not None and not self.current_item['description']:
+            self.current_item['description'] = text
+            self.explained += 1
+        else:
+            self.unexplained += 1
+
+    def preamble(self, text):
+        """
+        Lines before the first section or item: restaurant name, then location
+        """
+        if self.sections:
+            self.unexplained += 1
+        elif self.restaurant['name'] is None:
+            self.restaurant['name'] = text
+            self.explained += 1
+        elif self.restaurant['location'] is None:
+            self.restaurant['location'] = text
+            self.explained += 1
+        else:
+            self.unexplained += 1
+
+    def result(self) -> Tuple[dict, float]:
+        items = [item for section in self.sections for item in section['items']]
+        for item in items:
+            item['dietary_restriction_id'] = guess_dietary_restriction(item['name'], item['description'])
+
+        structured = {
+            'restaurant': self.restaurant,
+            'menu_sections': [section for section in self.sections if section['items']],
+        }
+        return structured, self.confidence(items)
+
+    def confidence(self, items) -> float:
+        """
+        Share of lines the parser could account for, discounted for thin or implausible results
+        """
+        total = self.explained + self.unexplained
+        if not items or not total:
+            return 0.0
+        score = self.explained / total
+        if len(items) < 3:
+            score *= 0.5
+        if any(not 0 < item['price'] < MAX_PLAUSIBLE_PRICE for item in items):
+            score *= 0.5
+        if self.restaurant['name'] is None:
+            score *= 0.9
+        return round(score, 3)
+
+
+def _parse_compact(lines: List[str]) -> _MenuBuilder:
+    """
+    The layout extractor's "# Restaurant" / "## Section" / "name | description | price" form
+    """
+    builder = _MenuBuilder()
+    for line in lines:
+        if line.startswith('## '):
+            builder.section(line[3:].strip())
+        elif line.startswith('# '):
+            builder.preamble(line[2:].strip())
+        else:
+            fields = [field.strip() for field in line.split(' | ')]
+            try:
+                price = parse_price(fields[-1])
+            except ValueError:
+                builder.unexplained += 1
+                continue
+            if len(fields) == 2:
+                builder.item(fields[0], price)
+            elif len(fields) == 3:
+                builder.item(fields[0], price, fields[1] or None)
+            else:
+                builder.unexplained += 1
+    return builder
+
+
+def _starts_items(lines: List[str], index: int) -> bool:
+    """
+    True when the line at index begins an item: it carries a price or the next line is a bare price
+    """
+    if index >= len(lines):
+        return False
+    if split_price(lines[index])[1] is not None:
+        return True
+    return index + 1 < len(lines) and bool(PRICE_ONLY_RE.match(lines[index + 1]))
+
+
+def _parse_flat(lines: List[str]) -> _MenuBuilder:
+    """
+    Flat extract_text_from_pdf output: "Name ..... 12.50" lines, or a name followed by a price line
+    """
+    builder = _MenuBuilder()
+    pending_name = None
+
+    for index, line in enumerate(lines):
+        price_only = PRICE_ONLY_RE.match(line)
+        if price_only:
+            if pending_name is not None:
+                builder.item(pending_name, parse_price(price_only.group(1)))
+                pending_name = None
+            else:
+                builder.unexplained += 1
+            continue
+
+        name, price = split_price(line)
+        if price is not None:
+            builder.item(name, price)
+        elif index + 1 < len(lines) and PRICE_ONLY_RE.match(lines[index + 1]):
+            pending_name = line
+        elif (_looks_like_heading(line) and _starts_items(lines, index + 1)
+              and (_is_title(line) or builder.current_item is None or builder.current_item['description'])):
+            # A sentence-case line right under an undescribed item is more likely its description
+            builder.section(line)
+        elif builder.current_item is not None:
+            builder.describe(line)
+        else:
+            builder.preamble(line)
+
+    return builder
+
+
+def is_layout_text(text: Optional[str]) -> bool:
+    """
+    True for the layout extractor's compact form. Its lines were already recognised by the extractor,
+    so the coverage score says little there: callers should not skip Claude on it
+    """
+    return any(line.strip().startswith('## ') for line in (text or '').splitlines())
+
+
+def parse_menu_text(text: Optional[str]) -> Tuple[dict, float]:
+    """
+    Parse extracted menu text into the {restaurant, menu_sections[items]} schema that
+    insert_into_database consumes, without calling the LLM.
+    Returns (structured_data, confidence) with confidence in [0, 1]; callers should only use
+    the result when confidence clears settings.MENU_RULE_PARSER_MIN_CONFIDENCE.
+    """
+    lines = [line.strip() for line in (text or '').splitlines() if line.strip()]
+    if not lines:
+        return {'restaurant': {'name': None, 'location': None}, 'menu_sections': []}, 0.0
+
+    if is_layout_text(text):
+        return _parse_compact(lines).result()
+    return _parse_flat(lines).result()
@@ -1,11 +1,19 @@
 from rest_framework import serializers
-from .models import Restaurant, Menu, MenuSection, MenuItem
+from .models import Restaurant, Menu, MenuSection, MenuItem, MenuItemChange
 
 class MenuItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = MenuItem
         fields = '__all__'
 
+class MenuItemChangeSerializer(serializers.ModelSerializer):
+    version = serializers.IntegerField(source='menu.version', read_only=True)
+    date = serializers.DateField(source='menu.date', read_only=True)
+    class Meta:
+        model = MenuItemChange
+        fields = ['change_id', 'menu', 'version', 'date', 'kind', 'match_key', 'section_name', 'name',
+                  'old_price', 'new_price']
+
 class MenuSectionSerializer(serializers.ModelSerializer):
     items = MenuItemSerializer(many=True, read_only=True)
     class Meta:
@@ -0,0 +1,112 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .analytics import refresh_menu_stats
+from .analytics_cache import invalidate_analytics
+from .diff import item_match_key
+from .loader import refresh_current_menu
+from .models import DietaryRestriction, Menu, MenuDietaryStats, MenuItem, MenuSection, Restaurant
+
+# Edits made outside the loaders (API, admin) retire the cached analytics; the loaders'
+# bulk inserts send no signals and invalidate explicitly
+
+
+@receiver([post_save, post_delete], sender=MenuItem, dispatch_uid='menu_item_invalidates_analytics')
+@receiver([post_save, post_delete], sender=Restaurant, dispatch_uid='restaurant_invalidates_analytics')
+@receiver([post_save, post_delete], sender=DietaryRestriction, dispatch_uid='dietary_invalidates_analytics')
+def invalidate_cached_analytics(sender, using=None, **kwargs):
+    invalidate_analytics(using)
+
+
+@receiver(post_delete, sender=Menu, dispatch_uid='menu_delete_repoints_current_menu')
+def fall_back_to_previous_version(sender, instance, using=None, **kwargs):
+    # Deleting the current version makes the latest remaining one current
+    refresh_current_menu(instance.restaurant_id)
+    invalidate_analytics(using)
+
+
+# The loaders maintain the summary tables as they insert; single-row edits recompute the
+# summaries of the menus they touch, in the same transaction as the edit
+
+
+def _deleted_with(origin, *models):
+    # True when the deletion cascades from one of models, whose own receiver covers it
+    return (origin.model if isinstance(origin, QuerySet) else type(origin)) in models
+
+
+@receiver(pre_save, sender=MenuItem, dispatch_uid='menu_item_remembers_menu')
+def remember_item_menu(sender, instance, raw=False, **kwargs):
+    # An item moved to another section leaves its previous menu's summary behind
+    instance._previous_menu_id = None if raw or instance.pk is None else (
+        MenuItem.objects.filter(pk=instance.pk).values_list('section__menu_id', flat=True).first()
+    )
+
+
+@receiver(pre_save, sender=MenuSection, dispatch_uid='menu_section_remembers_menu')
+def remember_section_menu(sender, instance, raw=False, **kwargs):
+    previous = None if raw or instance.pk is None else (
+        MenuSection.objects.filter(pk=instance.pk).values_list('menu_id', 'section_name').first()
+    )
+    instance._previous_menu_id, instance._previous_section_name = previous or (None, None)
+
+
+@receiver(post_save, sender=MenuItem, dispatch_uid='menu_item_refreshes_stats')
+def refresh_item_stats(sender, instance, raw=False, **kwargs):
+    if not raw:
+        refresh_menu_stats([getattr(instance, '_previous_menu_id', None), instance.section.menu_id])
+
+
+@receiver(post_save, sender=MenuSection, dispatch_uid='menu_section_refreshes_stats')
+def refresh_section_stats(sender, instance, created=False, raw=False, **kwargs):
+    # A new section has no items yet; a moved one takes its items to another menu
+    previous_menu_id = getattr(instance, '_previous_menu_id', None)
+    if not (created or raw) and previous_menu_id != instance.menu_id:
+        refresh_menu_stats([previous_menu_id, instance.menu_id])
+
+
+@receiver(post_delete, sender=MenuItem, dispatch_uid='menu_item_delete_refreshes_stats')
+def refresh_deleted_item_stats(sender, instance, origin=None, **kwargs):
+    if not _deleted_with(origin, MenuSection, Menu, Restaurant):
+        refresh_menu_stats([instance.section.menu_id])
+
+
+@receiver(post_delete, sender=MenuSection, dispatch_uid='menu_section_delete_refreshes_stats')
+def refresh_deleted_section_stats(sender, instance, origin=None, **kwargs):
+    # A deleted menu takes its summary rows with it
+    if not _deleted_with(origin, Menu, Restaurant):
+        refresh_menu_stats([instance.menu_id])
+
+
+@receiver(pre_delete, sender=DietaryRestriction, dispatch_uid='dietary_remembers_menus')
+def remember_dietary_menus(sender, instance, **kwargs):
+    instance._menu_ids = list(
+        MenuDietaryStats.objects.filter(dietary_restriction_id=instance.pk).values_list('menu_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=DietaryRestriction, dispatch_uid='dietary_delete_refreshes_stats')
+def refresh_dietary_stats(sender, instance, **kwargs):
+    # Its items are counted as unrestricted from now on
+    refresh_menu_stats(getattr(instance, '_menu_ids', []))
+
+
+# Items are matched across versions by match_key (see diff); the loaders' bulk inserts set it
+# themselves, every other save (API, admin, ORM) keeps it in step with the section and name
+
+
+@receiver(pre_save, sender=MenuItem, dispatch_uid='menu_item_sets_match_key')
+def set_item_match_key(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance.match_key = item_match_key(instance.section.section_name, instance.name)
+
+
+@receiver(post_save, sender=MenuSection, dispatch_uid='menu_section_rekeys_items')
+def rekey_section_items(sender, instance, created=False, raw=False, **kwargs):
+    # Renaming a section changes the key of every item in it
+    if created or raw or getattr(instance, '_previous_section_name', None) == instance.section_name:
+        return
+    items = list(instance.items.only('item_id', 'name'))
+    for item in items:
+        item.match_key = item_match_key(instance.section_name, item.name)
+    MenuItem.objects.bulk_update(items, ['match_key'])
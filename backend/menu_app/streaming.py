@@ -0,0 +1,195 @@
+import json
+
+from .normalize import normalize_in_place
+from .pipeline import item_to_common_schema, validate_item
+
+
+class _Frame:
+    __slots__ = ('kind', 'start', 'key', 'pending_key', 'capture', 'emitted')
+
+    def __init__(self, kind, start, key, capture):
+        self.kind = kind            # '{' or '['
+        self.start = start          # absolute offset of the opening bracket
+        self.key = key              # key this container sits under; array elements get '<key>[]'
+        self.pending_key = None     # last object key seen, until its value is complete
+        self.capture = capture      # 'restaurant', 'section' or 'item' when the container is emitted
+        self.emitted = False
+
+
+class MenuStreamParser:
+    """
+    Incremental parser for the {restaurant, menu_sections[items]} JSON Claude streams back.
+
+    feed() takes response fragments as they arrive and returns the events completed so far:
+    ('restaurant', dict) once the restaurant object closes, ('section', dict) as soon as a
+    section's "items" array opens, and ('item', dict) for every closed item object. Text outside
+    the root object (markdown fences, chatter) is ignored and consumed input is discarded, so
+    memory stays proportional to the largest open section header or item, not the response.
+    """
+
+    def __init__(self):
+        self.text = ''
+        self.base = 0               # absolute offset of self.text[0]
+        self.pos = 0                # absolute offset of the next character to scan
+        self.stack = []
+        self.in_string = False
+        self.escape = False
+        self.string_start = None
+        self.last_string = None
+        self.started = False
+        self.done = False
+
+    def feed(self, fragment):
+        self.text += fragment
+        events = []
+        end = self.base + len(self.text)
+
+        while self.pos < end and not self.done:
+            i = self.pos
+            c = self.text[i - self.base]
+            self.pos += 1
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif c == '\\':
+                    self.escape = True
+                elif c == '"':
+                    self.in_string = False
+                    self.last_string = self._slice(self.string_start, i + 1)
+                continue
+
+            if not self.started:
+                if c == '{':
+                    self.started = True
+                    self.stack.append(_Frame('{', i, None, None))
+                continue
+
+            if c == '"':
+                self.in_string = True
+                self.string_start = i
+            elif c in '{[':
+                self._open(c, i, events)
+            elif c in '}]':
+                self._close(i, events)
+            elif c == ':':
+                self.stack[-1].pending_key = json.loads(self.last_string)
+            elif c == ',':
+                if self.stack[-1].kind == '{':
+                    self.stack[-1].pending_key = None
+
+        self._discard_consumed()
+        return events
+
+    def close(self):
+        """
+        Raise json.JSONDecodeError if the stream ended before the root JSON object was complete
+        """
+        if not self.done:
+            raise json.JSONDecodeError("Incomplete JSON in streamed response", self.text, len(self.text))
+
+    def _slice(self, start, stop):
+        return self.text[start - self.base:stop - self.base]
+
+    def _open(self, kind, i, events):
+        parent = self.stack[-1]
+        key = parent.pending_key if parent.kind == '{' else f'{parent.key}[]'
+        depth = len(self.stack)
+
+        capture = None
+        if kind == '{':
+            if depth == 1 and key == 'restaurant':
+                capture = 'restaurant'
+            elif key == 'menu_sections[]':
+                capture = 'section'
+            elif key == 'items[]' and len(self.stack) >= 2 and self.stack[-2].capture == 'section':
+                capture = 'item'
+        elif key == 'items' and parent.capture == 'section' and not parent.emitted:
+            # Everything before "items" is the section header; close it off to parse it now
+            header = json.loads(self._slice(parent.start, i) + '[]}')
+            parent.emitted = True
+            events.append(('section', header))
+
+        self.stack.append(_Frame(kind, i, key, capture))
+
+    def _close(self, i, events):
+        frame = self.stack.pop()
+        if not self.stack:
+            self.done = True
+            return
+        if frame.capture and not frame.emitted:
+            events.append((frame.capture, json.loads(self._slice(frame.start, i + 1))))
+
+    def _discard_consumed(self):
+        keep_from = self.pos
+        if self.in_string:
+            keep_from = min(keep_from, self.string_start)
+        for frame in self.stack:
+            if frame.capture and not frame.emitted:
+                keep_from = min(keep_from, frame.start)
+        if keep_from > self.base:
+            self.text = self.text[keep_from - self.base:]
+            self.base = keep_from
+
+
+def stream_claude_response(text):
+    """
+    Yield the fragments of Claude's structured-menu response as they are generated
+    """
+    # Imported here: views imports this module
+    from .views import ANTHROPIC_MODEL, build_menu_prompt
+    from .llm_gateway import get_llm_gateway
+
+    yield from get_llm_gateway().stream_text(
+        model=ANTHROPIC_MODEL,
+        max_tokens=4000,
+        messages=[{
+            "role": "user",
+            "content": build_menu_prompt(text)
+        }]
+    )
+
+
+def stream_menu_into_database(text, log_id=None, pdf_sha256=None, text_sha256=None, use_cache=True,
+                              claimed_at=None):
+    """
+    Structure menu text with a streamed Claude call, normalizing and validating each item as soon
+    as it is complete (items without a name are dropped) and writing items to the database in
+    batches while the response is still arriving.
+    A cached response for the same text is replayed through the same path without an API call.
+    Returns the new menu_id; raises on API, JSON or database errors (nothing is committed then).
+    """
+    from .views import ANTHROPIC_MODEL, PROMPT_VERSION, clean_response_text
+    from .llm_cache import lookup_llm_response, store_llm_response, llm_cache_bypassed
+    from .loader import StreamingMenuLoader
+
+    use_cache = use_cache and not llm_cache_bypassed()
+    cached = lookup_llm_response(ANTHROPIC_MODEL, PROMPT_VERSION, text) if use_cache else None
+    fragments = [cached] if cached is not None else stream_claude_response(text)
+    # Only a fresh response has to be kept whole, to be written to the cache once it proved valid
+    received = [] if use_cache and cached is None else None
+
+    parser = MenuStreamParser()
+    with StreamingMenuLoader(log_id=log_id, pdf_sha256=pdf_sha256, text_sha256=text_sha256,
+                             claimed_at=claimed_at) as menu_loader:
+        for fragment in fragments:
+            if received is not None:
+                received.append(fragment)
+            for kind, payload in parser.feed(fragment):
+                if kind == 'item':
+                    # The same checks ValidateStage applies to a whole menu on the non-streaming path
+                    item = validate_item(normalize_in_place(item_to_common_schema(payload)))
+                    if item is not None:
+                        menu_loader.add_item(item)
+                    continue
+                normalize_in_place(payload)
+                if kind == 'restaurant':
+                    menu_loader.set_restaurant(payload)
+                else:
+                    menu_loader.add_section(payload)
+        parser.close()
+        menu_id = menu_loader.finish()
+
+    if received is not None:
+        store_llm_response(ANTHROPIC_MODEL, PROMPT_VERSION, text, clean_response_text(''.join(received)))
+    return menu_id
@@ -1,7 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from . import views
-from .api import RestaurantViewSet, MenuViewSet, MenuItemViewSet, analytics_views
+from .api import RestaurantViewSet, MenuViewSet, MenuItemViewSet, analytics_views, ingestion_stats
 
 router = DefaultRouter()
 router.register(r'restaurants', RestaurantViewSet)
@@ -11,6 +11,9 @@ router.register(r'menuitems', MenuItemViewSet)
 urlpatterns = [
     path('api/', include(router.urls)),
     path('api/analytics/', analytics_views, name='analytics_views'),
+    path('api/ingestion/stats/', ingestion_stats, name='ingestion_stats'),
     path('upload-menu/', views.menu_upload_view, name='menu_upload'),
     path('process-menu-pdf/', views.process_menu_pdf, name='process_menu_pdf'),
+    path('process-menu-pdf/jobs/<int:job_id>/', views.menu_job_status, name='menu_job_status'),
+    path('metrics', views.metrics_view, name='metrics'),
 ]
\ No newline at end of file
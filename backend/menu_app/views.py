@@ -1,32 +1,98 @@
+import logging
 import os
-from django.http import JsonResponse
+import tempfile
+from contextlib import contextmanager
+from django.http import HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.conf import settings
 from django.shortcuts import render
+from django.urls import reverse
 from django.contrib import messages
 
 from .PDFreader import extract_text_from_pdf, extract_text_from_image
+from .layout import extract_layout_text
+from .rule_parser import is_layout_text, parse_menu_text
+from .jobs import enqueue_menu_pdf
+from .dedup import upload_sha256, find_duplicate
+from .llm_cache import cached_llm_call
+from .llm_gateway import get_llm_gateway
+from .chunking import structure_in_chunks
+from .loader import insert_into_database
+from .pipeline import IngestionError, MenuIngestion, build_pipeline
+from .metrics import collect, record_ingestion, render_metrics, span
+from .streaming import stream_menu_into_database
+from .models import ProcessingLog
+from .logging_utils import Payload
 import json
-import mysql.connector
-from datetime import datetime
-import anthropic
-import unicodedata
 
+logger = logging.getLogger(__name__)
 
-def process_with_anthropic_api(text):
-    try:
-        # Get API key from environment variable
-        api_key = os.getenv('ANTHROPIC_API_KEY')
-        if not api_key:
-            raise ValueError("ANTHROPIC_API_KEY environment variable not set")
 
-        client = anthropic.Anthropic(api_key=api_key)
+ANTHROPIC_MODEL = "claude-3-sonnet-20240229"
+# Bump whenever the prompt below changes so responses cached for the old prompt are not reused
+PROMPT_VERSION = "menu-structure-v2"
+
+
+def parse_with_rules(text):
+    """
+    Return the rule-based parse of the menu text when it is confident enough to skip Claude, else None
+    """
+    if not settings.MENU_RULE_PARSER_ENABLED:
+        return None
+    if is_layout_text(text):
+        logger.info("Layout extraction output, leaving it to Claude")
+        return None
+    structured_data, confidence = parse_menu_text(text)
+    if confidence >= settings.MENU_RULE_PARSER_MIN_CONFIDENCE:
+        logger.info("Parsed without the LLM: confidence=%.2f", confidence)
+        return structured_data
+    logger.info("Rule parser confidence=%.2f too low, falling back to Claude", confidence)
+    return None
+
+
+def structure_menu_text(text, use_cache=True, use_rules=True):
+    """
+    Structure extracted menu text and return the parsed menu dict.
+    Simple layouts are parsed locally when the rule-based parser is confident enough;
+    everything else goes to Claude. Long menus are split into chunks that are structured
+    concurrently and merged in order; identical requests are served from the LLM response cache.
+    """
+    if use_rules:
+        structured_data = parse_with_rules(text)
+        if structured_data is not None:
+            return structured_data
+
+    def structure_chunk(chunk):
+        return cached_llm_call(
+            ANTHROPIC_MODEL, PROMPT_VERSION, chunk,
+            lambda: _call_anthropic_api(chunk),
+            use_cache=use_cache,
+            parse=parse_response
+        )
+
+    return structure_in_chunks(text, structure_chunk)
 
-        # Print the extracted text for debugging
-        print("Extracted text being sent to Claude:", text)
 
-        # Simplify the prompt and make it more explicit
-        prompt = f"""
+def process_with_anthropic_api(text, use_cache=True):
+    """
+    Structure extracted menu text with Claude and return it as a JSON string.
+    """
+    return json.dumps(structure_menu_text(text, use_cache=use_cache))
+
+
+def parse_response(response_text):
+    with span('parse'):
+        return json.loads(response_text)
+
+
+def clean_response_text(response_text):
+    # Remove any markdown code block formatting
+    return response_text.strip().replace('```json', '').replace('```', '').strip()
+
+
+def build_menu_prompt(text):
+    # Simplify the prompt and make it more explicit
+    return f"""
         Given the following restaurant menu data:
 
         {text}
@@ -62,6 +128,8 @@ def process_with_anthropic_api(text):
         2. Descriptions: 5 words max or null
         3. Prices: must be > 0
         4. Remove Spanish accents
+        5. The menu data may be pre-structured: "# " marks the restaurant name, "## " starts a section
+           and item lines read "name | description | price" (or "name | price")
 
         For every item in the menu analyze or infer the ingredients to your knowledge and assign the correct dietary restriction that the item has.
         This is obligatory, no item should end up without a dietary restriction
@@ -69,176 +137,132 @@ def process_with_anthropic_api(text):
         Output ONLY valid JSON.
         """
 
-        # Make the API request
-        response = client.messages.create(
-            model="claude-3-sonnet-20240229",
+
+def _call_anthropic_api(text):
+    """
+    Call Claude and return the raw JSON text of its answer (parsed by the caller)
+    """
+    try:
+        logger.debug("Sending to Claude: chars=%d text=%s", len(text), Payload(text))
+
+        # Make the API request through the shared gateway (connection reuse, rate limits, retries)
+        response = get_llm_gateway().create(
+            model=ANTHROPIC_MODEL,
             max_tokens=4000,
             messages=[{
                 "role": "user",
-                "content": prompt
+                "content": build_menu_prompt(text)
             }]
         )
 
         # Get response text and clean it
-        response_text = response.content[0].text.strip()
-
-        # Remove any markdown code block formatting
-        response_text = response_text.replace('```json', '').replace('```', '').strip()
+        response_text = clean_response_text(response.content[0].text)
 
-        print("Raw response from Claude (after cleaning):", response_text)
-
-        # Try to parse JSON to validate it
-        try:
-            # Parse and re-serialize to ensure valid JSON
-            parsed_json = json.loads(response_text)
-            return json.dumps(parsed_json)
-        except json.JSONDecodeError as e:
-            print(f"JSON validation error: {e}")
-            print(f"Response that failed parsing: {response_text}")
-            raise
+        logger.debug("Claude response: chars=%d text=%s", len(response_text), Payload(response_text))
+        return response_text
 
     except Exception as e:
-        print(f"Error processing with Anthropic's Claude API: {e}")
-        print(f"Error type: {type(e)}")
+        logger.error("Error processing with Anthropic's Claude API: %s: %s", type(e).__name__, e)
         raise
 
 
-def normalize_spanish_text(text):
+def extract_menu_text(pdf_source, workers=None):
     """
-    Normalize Spanish text by removing accents and converting to standard characters
+    Extract menu text in the configured MENU_EXTRACTION_MODE: 'layout' returns the compact
+    pre-structured form (headings by font size/weight, prices split out), 'text' the flat page text.
+    Layout mode falls back to flat text when it recognises no priced items.
     """
-    if isinstance(text, str):
-        normalized = unicodedata.normalize('NFKD', text)
-        return ''.join(c for c in normalized if not unicodedata.combining(c))
-    return text
+    if getattr(settings, 'MENU_EXTRACTION_MODE', 'text') == 'layout':
+        compact = extract_layout_text(pdf_source)
+        if compact:
+            return compact
+    return extract_text_from_pdf(pdf_source, workers=workers)
 
 
-def clean_structured_data(structured_data):
+def _stream_into_database(ingestion):
     """
-    Clean the structured data by applying accent normalization
+    Structure and load while Claude is still responding; None when the menu needs more than one prompt
     """
+    if len(ingestion.text) > settings.LLM_CHUNK_MAX_CHARS:
+        return None
+    return stream_menu_into_database(
+        ingestion.text, log_id=ingestion.log_id, claimed_at=ingestion.claimed_at,
+        pdf_sha256=ingestion.pdf_sha256, text_sha256=ingestion.text_sha256
+    )
 
-    def deep_normalize(obj):
-        if isinstance(obj, dict):
-            return {k: deep_normalize(v) for k, v in obj.items()}
-        elif isinstance(obj, list):
-            return [deep_normalize(item) for item in obj]
-        elif isinstance(obj, str):
-            return normalize_spanish_text(obj)
-        return obj
 
-    return deep_normalize(structured_data)
+def build_menu_pipeline(extract_workers=None):
+    """
+    The ingestion pipeline behind the upload view, queued jobs and import_menus:
+    extract (layout or flat text, OCR fallback) -> dedup -> structure (rules first, then Claude,
+    streamed when ingestion.stream is set) -> normalize -> validate -> load.
+    Stages call this module's functions by name, so replacing one here affects every entry point.
+    """
+    return build_pipeline(
+        structure=lambda text: structure_menu_text(text, use_rules=False),
+        extract=lambda source: extract_menu_text(source, workers=extract_workers),
+        fallback=lambda source: extract_text_from_image(source),
+        rules=lambda text: parse_with_rules(text),
+        stream=lambda ingestion: _stream_into_database(ingestion),
+        load=lambda structured_data, **kwargs: insert_into_database(structured_data, **kwargs),
+    )
+
+
+@contextmanager
+def pdf_upload_source(pdf_file):
+    """
+    Yield something extract_text_from_pdf can open, isolated per request:
+    - uploads Django already streamed to disk are used in place (Django removes them),
+    - small uploads are read into memory and opened as a bytes stream,
+    - anything else is spooled to a unique temp file that is removed on exit.
+    """
+    if hasattr(pdf_file, 'temporary_file_path'):
+        yield pdf_file.temporary_file_path()
+        return
+
+    if pdf_file.size <= settings.MENU_PDF_IN_MEMORY_MAX_BYTES:
+        with span('spool'):
+            pdf_file.seek(0)
+            pdf_bytes = pdf_file.read()
+        yield pdf_bytes
+        return
+
+    os.makedirs(settings.MEDIA_ROOT, exist_ok=True)
+    fd, temp_pdf_path = tempfile.mkstemp(prefix='menu_', suffix='.pdf', dir=settings.MEDIA_ROOT)
+    try:
+        with span('spool'), os.fdopen(fd, 'wb') as destination:
+            for chunk in pdf_file.chunks():
+                destination.write(chunk)
+        yield temp_pdf_path
+    finally:
+        if os.path.exists(temp_pdf_path):
+            os.remove(temp_pdf_path)
 
 
-def insert_into_database(structured_data):
-    try:
-        conn = mysql.connector.connect(
-            host=settings.DATABASES['default']['HOST'],
-            port=settings.DATABASES['default'].get('PORT', 3306),
-            user=settings.DATABASES['default']['USER'],
-            password=settings.DATABASES['default']['PASSWORD'],
-            database=settings.DATABASES['default']['NAME']
-        )
-        cursor = conn.cursor(buffered=True)
-
-        # Insert all dietary restrictions first
-        dietary_restrictions = ['No Restriction', 'Vegan', 'Vegetarian', 'Gluten-Free', 'Lactose-Free']
-        for label in dietary_restrictions:
-            cursor.execute(
-                "INSERT IGNORE INTO menu_app_dietaryrestriction (label) VALUES (%s)",
-                (label,)
-            )
-
-        # Create a mapping of dietary restriction labels to their IDs
-        cursor.execute("SELECT restriction_id, label FROM menu_app_dietaryrestriction")
-        dietary_mapping = {label: id for id, label in cursor.fetchall()}
-
-        # Get restaurant name from structured data
-        restaurant_data = structured_data.get('restaurant', {})
-        restaurant_name = restaurant_data.get('name')
-
-        # Check if restaurant already exists
-        cursor.execute("SELECT restaurant_id FROM menu_app_restaurant WHERE name = %s", (restaurant_name,))
-        existing_restaurant = cursor.fetchone()
-
-        if existing_restaurant:
-            restaurant_id = existing_restaurant[0]
-            print(f"Using existing restaurant with ID: {restaurant_id}")
-
-            cursor.execute(
-                "SELECT MAX(version) FROM menu_app_menu WHERE restaurant_id = %s",
-                (restaurant_id,)
-            )
-            latest_version = cursor.fetchone()[0]
-            new_version = (latest_version or 0) + 1
-        else:
-            cursor.execute(
-                "INSERT INTO menu_app_restaurant (name, location) VALUES (%s, %s)",
-                (restaurant_name or 'Unknown', 'Unknown')
-            )
-            restaurant_id = cursor.lastrowid
-            new_version = 1
-            print(f"Created new restaurant with ID: {restaurant_id}")
-
-        cursor.execute(
-            "INSERT INTO menu_app_menu (restaurant_id, version, date) VALUES (%s, %s, %s)",
-            (restaurant_id, new_version, datetime.now().date())
-        )
-        menu_id = cursor.lastrowid
-
-        for section_order, section in enumerate(structured_data.get('menu_sections', []), 1):
-            cursor.execute(
-                "INSERT INTO menu_app_menusection (menu_id, section_name, section_order) VALUES (%s, %s, %s)",
-                (menu_id, section.get('section_name', 'Unknown Section'), section_order)
-            )
-            section_id = cursor.lastrowid
-
-            for item in section.get('items', []):
-                try:
-                    price = float(item.get('price', 0))
-                    if price <= 0:
-                        price = 0.01
-                except (TypeError, ValueError):
-                    price = 0.01
-
-                # Get dietary restriction ID from mapping or default to 'No Restriction'
-                dietary_label = {
-                    1: 'No Restriction',
-                    2: 'Vegan',
-                    3: 'Vegetarian',
-                    4: 'Gluten-Free',
-                    5: 'Lactose-Free'
-                }.get(item.get('dietary_restriction_id', 1), 'No Restriction')
-
-                dietary_id = dietary_mapping.get(dietary_label, dietary_mapping['No Restriction'])
-
-                cursor.execute(
-                    "INSERT INTO menu_app_menuitem (section_id, name, description, price, dietary_restriction_id) VALUES (%s, %s, %s, %s, %s)",
-                    (section_id,
-                     item.get('name', 'Unknown Item'),
-                     item.get('description'),
-                     price,
-                     dietary_id)
-                )
-
-        cursor.execute(
-            "INSERT INTO menu_app_processinglog (menu_id, status, error_message, timestamp) VALUES (%s, %s, %s, %s)",
-            (menu_id, 'successful', None, datetime.now())
-        )
+def _request_flag(request, name, default=False):
+    flag = request.POST.get(name, request.GET.get(name))
+    if flag is None:
+        return default
+    return flag.lower() in ('1', 'true', 'yes')
 
-        conn.commit()
-        print("Data successfully inserted into database")
-        return True
 
-    except Exception as e:
-        print(f"Database insertion error: {e}")
-        if conn:
-            conn.rollback()
-        return False
-    finally:
-        if 'conn' in locals() and conn.is_connected():
-            cursor.close()
-            conn.close()
+def _wants_async(request):
+    """
+    Queue the upload instead of processing it inline when ?async=1 is passed,
+    falling back to settings.MENU_INGESTION_ASYNC
+    """
+    return _request_flag(request, 'async', getattr(settings, 'MENU_INGESTION_ASYNC', False))
+
+
+def _duplicate_response(duplicate, matched_on):
+    return JsonResponse({
+        'status': 'success',
+        'message': 'Menu already ingested, returning the existing menu',
+        'duplicate': True,
+        'matched_on': matched_on,
+        'menu_id': duplicate.menu_id,
+        'version': duplicate.menu.version
+    })
 
 
 @csrf_exempt
@@ -252,70 +276,78 @@ def process_menu_pdf(request):
 
         pdf_file = request.FILES['pdf_file']
 
-        # Print file info for debugging
-        print(f"Received file: {pdf_file.name}, size: {pdf_file.size} bytes")
+        logger.info("Received upload: name=%s bytes=%d", pdf_file.name, pdf_file.size)
 
-        temp_pdf_path = os.path.join(settings.MEDIA_ROOT, 'temp_menu.pdf')
-        with open(temp_pdf_path, 'wb+') as destination:
-            for chunk in pdf_file.chunks():
-                destination.write(chunk)
+        # ?force=1 re-processes a menu even if identical content was already ingested
+        dedup = settings.MENU_DEDUP_ENABLED and not _request_flag(request, 'force')
+
+        pdf_hash = upload_sha256(pdf_file)
+        if dedup:
+            duplicate = find_duplicate(pdf_sha256=pdf_hash)
+            if duplicate:
+                return _duplicate_response(duplicate, 'pdf')
 
+        if _wants_async(request):
+            job = enqueue_menu_pdf(pdf_file, pdf_sha256=pdf_hash, force_reprocess=not dedup)
+            return JsonResponse({
+                'status': 'queued',
+                'job_id': job.log_id,
+                'status_url': reverse('menu_job_status', args=[job.log_id])
+            }, status=202)
+
+        ingestion = MenuIngestion(
+            pdf_sha256=pdf_hash,
+            dedup=dedup,
+            stream=_request_flag(request, 'stream', settings.MENU_STREAMING_INGESTION)
+        )
+        menu_pipeline = build_menu_pipeline()
+        outcome = 'failed'
         try:
-            extracted_text = extract_text_from_pdf(temp_pdf_path)
-
-            # Print extracted text for debugging
-            print("Extracted text from PDF:", extracted_text)
-
-            if not extracted_text:
-                extracted_text = extract_text_from_image(temp_pdf_path)
-                print("Extracted text from image:", extracted_text)
-
-            if not extracted_text:
-                return JsonResponse({
-                    'status': 'error',
-                    'message': 'Could not extract text from PDF'
-                }, status=400)
-
-            structured_data_json = process_with_anthropic_api(extracted_text)
-
-            if not structured_data_json:
-                return JsonResponse({
-                    'status': 'error',
-                    'message': 'Failed to process menu data with Claude API'
-                }, status=400)
-
-            # Clean and parse JSON
-            try:
-                structured_data = json.loads(structured_data_json)
-            except json.JSONDecodeError as e:
-                print(f"JSON parsing error. Raw data: {structured_data_json}")
-                return JsonResponse({
-                    'status': 'error',
-                    'message': f'JSON parsing error: {str(e)}'
-                }, status=400)
-
-            cleaned_data = clean_structured_data(structured_data)
-
-            if insert_into_database(cleaned_data):
-                return JsonResponse({
-                    'status': 'success',
-                    'message': 'Menu processed and inserted successfully'
-                })
-            else:
-                return JsonResponse({
-                    'status': 'error',
-                    'message': 'Failed to insert data into database'
-                }, status=500)
+            # The upload (or its spool file) is only needed for extraction and is released right after
+            with collect(ingestion), pdf_upload_source(pdf_file) as pdf_source:
+                ingestion.source = pdf_source
+                menu_pipeline.run(ingestion, only=('extract',))
+            ingestion.source = None
+
+            logger.debug("Extracted text: chars=%d text=%s", len(ingestion.text), Payload(ingestion.text))
+
+            menu_pipeline.run(ingestion, skip=('extract',))
+
+            # Same menu re-exported to a different PDF: no Claude call and no new version
+            if ingestion.duplicate:
+                outcome = 'duplicate'
+                return _duplicate_response(ingestion.duplicate, 'text')
+
+            outcome = 'success'
+            return JsonResponse({
+                'status': 'success',
+                'message': 'Menu processed and inserted successfully',
+                'menu_id': ingestion.menu_id
+            })
+
+        except IngestionError as e:
+            logger.warning("Ingestion failed at stage=%s: %s", e.stage, e)
+            return JsonResponse({
+                'status': 'error',
+                'message': str(e)
+            }, status=500 if e.stage == 'load' else 400)
+
+        except json.JSONDecodeError as e:
+            logger.warning("JSON parsing error: %s", e)
+            return JsonResponse({
+                'status': 'error',
+                'message': f'JSON parsing error: {str(e)}'
+            }, status=400)
 
         except Exception as e:
-            print(f"Processing error: {str(e)}")
+            logger.exception("Processing error")
             return JsonResponse({
                 'status': 'error',
                 'message': str(e)
             }, status=500)
+
         finally:
-            if os.path.exists(temp_pdf_path):
-                os.remove(temp_pdf_path)
+            record_ingestion(ingestion, outcome)
 
     return JsonResponse({
         'status': 'error',
@@ -328,4 +360,40 @@ def menu_upload_view(request):
     Render the menu upload template
     """
     if request.method == 'GET':
-        return render(request, 'menu_app/menu_upload.html')
\ No newline at end of file
+        return render(request, 'menu_app/menu_upload.html')
+
+
+def menu_job_status(request, job_id):
+    """
+    Report the state of a queued ingestion job and, once finished, its resulting menu
+    """
+    job = ProcessingLog.objects.select_related('menu__restaurant').filter(log_id=job_id).first()
+    if job is None:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Job not found'
+        }, status=404)
+
+    data = {
+        'job_id': job.log_id,
+        'status': job.status,
+        'error_message': job.error_message,
+        'timestamp': job.timestamp.isoformat() if job.timestamp else None,
+        'menu_id': job.menu_id,
+    }
+    if job.menu is not None:
+        data['result'] = {
+            'menu_id': job.menu.menu_id,
+            'version': job.menu.version,
+            'restaurant': job.menu.restaurant.name,
+        }
+    return JsonResponse(data)
+
+
+def metrics_view(request):
+    """
+    Ingestion latency histograms and LLM token counters of this process, for Prometheus to scrape.
+    Metrics live in process memory: ingestions run by run_ingestion_workers or import_menus are not
+    included here; their stage timings are stored in ProcessingLogStage.
+    """
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
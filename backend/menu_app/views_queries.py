@@ -1,25 +1,65 @@
-from django.db import connection
-
-def get_menu_items_per_restaurant():
-    with connection.cursor() as cursor:
-        cursor.execute("""
-            SELECT * FROM menu_items_per_restaurant
-        """)
-        columns = [col[0] for col in cursor.description]
-        return [dict(zip(columns, row)) for row in cursor.fetchall()]
-
-def get_dietary_restrictions_distribution():
-    with connection.cursor() as cursor:
-        cursor.execute("""
-            SELECT * FROM dietary_restrictions_distribution
-        """)
-        columns = [col[0] for col in cursor.description]
-        return [dict(zip(columns, row)) for row in cursor.fetchall()]
-
-def get_price_analysis():
-    with connection.cursor() as cursor:
-        cursor.execute("""
-            SELECT * FROM price_analysis_per_restaurant
-        """)
-        columns = [col[0] for col in cursor.description]
-        return [dict(zip(columns, row)) for row in cursor.fetchall()]
\ No newline at end of file
+from django.db.models import F, Max, Min, Sum
+
+from .models import DietaryRestriction, MenuDietaryStats, MenuStats
+
+# Analytics read the summary tables maintained by the loaders (see menu_app.analytics), so their
+# cost depends on the number of menus, not on the number of menu items. By default only each
+# restaurant's current menu counts; all_versions=True aggregates every version ever loaded.
+# Per-restaurant rows are converted as they are fetched (iterator) rather than cached on the queryset.
+
+ROW_CHUNK_SIZE = 2000
+
+
+def _menu_stats(all_versions):
+    stats = MenuStats.objects.all()
+    return stats if all_versions else stats.filter(restaurant__current_menu_id=F('menu_id'))
+
+
+def get_menu_items_per_restaurant(all_versions=False):
+    rows = (_menu_stats(all_versions).values('restaurant_id', 'restaurant__name')
+            .annotate(total_items=Sum('item_count'), price_sum=Sum('price_sum'))
+            .filter(total_items__gt=0)
+            .order_by('restaurant_id'))
+    return [
+        {
+            'restaurant_name': row['restaurant__name'],
+            'total_items': row['total_items'],
+            'average_price': row['price_sum'] / row['total_items'],
+        }
+        for row in rows.iterator(chunk_size=ROW_CHUNK_SIZE)
+    ]
+
+
+def get_dietary_restrictions_distribution(all_versions=False):
+    dietary_stats = MenuDietaryStats.objects.all()
+    if not all_versions:
+        dietary_stats = dietary_stats.filter(menu__restaurant__current_menu_id=F('menu_id'))
+    counts = dict(dietary_stats.values_list('dietary_restriction_id')
+                  .annotate(item_count=Sum('item_count')).order_by())
+    total = sum(counts.values())
+    return [
+        {
+            'restriction_type': label,
+            'item_count': counts.get(restriction_id, 0),
+            'percentage': counts.get(restriction_id, 0) * 100.0 / total if total else None,
+        }
+        for restriction_id, label in DietaryRestriction.objects.order_by('restriction_id')
+        .values_list('restriction_id', 'label')
+    ]
+
+
+def get_price_analysis(all_versions=False):
+    rows = (_menu_stats(all_versions).values('restaurant_id', 'restaurant__name')
+            .annotate(total_items=Sum('item_count'), price_sum=Sum('price_sum'),
+                      min_price=Min('min_price'), max_price=Max('max_price'))
+            .filter(total_items__gt=0)
+            .order_by('restaurant_id'))
+    return [
+        {
+            'restaurant_name': row['restaurant__name'],
+            'min_price': row['min_price'],
+            'max_price': row['max_price'],
+            'avg_price': row['price_sum'] / row['total_items'],
+        }
+        for row in rows.iterator(chunk_size=ROW_CHUNK_SIZE)
+    ]
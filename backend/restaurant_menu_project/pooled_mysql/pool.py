@@ -0,0 +1,79 @@
+"""
+Per-process pools of open DB-API connections used by the pooled MySQL backend
+"""
+import os
+import queue
+import threading
+
+
+class PoolTimeout(Exception):
+    """
+    Raised when no connection became free within the pool's timeout
+    """
+
+
+class ConnectionPool:
+    """
+    Bounded pool of open DB-API connections created on demand by connect(). At most max_size
+    connections are checked out at once; acquire() waits up to timeout seconds for one to be released.
+    """
+
+    def __init__(self, connect, max_size=10, timeout=30.0):
+        self.connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle = queue.LifoQueue(maxsize=max_size)
+        # One slot per connection that is checked out; idle connections hold none
+        self.slots = threading.BoundedSemaphore(max_size)
+
+    def acquire(self):
+        if not self.slots.acquire(timeout=self.timeout):
+            raise PoolTimeout(f"All {self.max_size} pooled connections stayed in use for {self.timeout}s")
+        try:
+            while True:
+                try:
+                    conn = self.idle.get_nowait()
+                except queue.Empty:
+                    return self.connect()
+                try:
+                    conn.ping()
+                    return conn
+                except Exception:
+                    # Dropped by the server while idle; discard it and try the next one
+                    self._discard(conn)
+        except BaseException:
+            self.slots.release()
+            raise
+
+    def release(self, conn):
+        try:
+            # Never hand out a connection with a half-finished transaction
+            conn.rollback()
+            self.idle.put_nowait(conn)
+        except Exception:
+            self._discard(conn)
+        finally:
+            self.slots.release()
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, connect, max_size, timeout=30.0):
+    # Keyed by PID so forked ingestion workers never share a parent's sockets
+    key = (os.getpid(), alias)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(connect, max_size, timeout)
+        return _pools[key]
+
+
+def get_existing_pool(alias):
+    return _pools.get((os.getpid(), alias))
@@ -15,6 +15,72 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Menu ingestion: queue uploads for `manage.py run_ingestion_workers` instead of processing them in the request
+MENU_INGESTION_ASYNC = os.getenv('MENU_INGESTION_ASYNC', 'False').lower() in ('1', 'true', 'yes')
+MENU_INGESTION_QUEUE_DIR = MEDIA_ROOT / 'ingestion_queue'
+# Workers send a heartbeat for their running job every HEARTBEAT_INTERVAL seconds; a job with no
+# heartbeat for JOB_TIMEOUT seconds belonged to a dead worker and is handed to another one
+MENU_INGESTION_HEARTBEAT_INTERVAL = int(os.getenv('MENU_INGESTION_HEARTBEAT_INTERVAL', 60))
+MENU_INGESTION_JOB_TIMEOUT = int(os.getenv('MENU_INGESTION_JOB_TIMEOUT', 5 * 60))
+
+# Uploads up to this size stay in memory and are opened by PyMuPDF as a byte stream; larger ones are
+# streamed to a unique temp file by Django's upload handler
+MENU_PDF_IN_MEMORY_MAX_BYTES = int(os.getenv('MENU_PDF_IN_MEMORY_MAX_BYTES', 5 * 1024 * 1024))
+FILE_UPLOAD_MAX_MEMORY_SIZE = MENU_PDF_IN_MEMORY_MAX_BYTES
+
+# Short-circuit uploads whose PDF bytes or normalized text match an already ingested menu
+MENU_DEDUP_ENABLED = os.getenv('MENU_DEDUP_ENABLED', 'True').lower() in ('1', 'true', 'yes')
+
+# Claude response cache keyed on (model, prompt version, text hash); set LLM_CACHE_BYPASS to always call the API
+LLM_CACHE = {
+    'BACKEND': 'menu_app.llm_cache.SQLiteLLMCache',
+    'OPTIONS': {
+        'path': os.getenv('LLM_CACHE_PATH', BASE_DIR / 'llm_cache.sqlite3'),
+        'max_entries': int(os.getenv('LLM_CACHE_MAX_ENTRIES', 10000)),
+        'max_bytes': int(os.getenv('LLM_CACHE_MAX_BYTES', 256 * 1024 * 1024)),
+        'ttl': int(os.getenv('LLM_CACHE_TTL', 30 * 24 * 3600)),
+    },
+}
+LLM_CACHE_BYPASS = os.getenv('LLM_CACHE_BYPASS', 'False').lower() in ('1', 'true', 'yes')
+
+# 'text' sends Claude the flat page text; 'layout' sends a compact pre-structured form built from
+# font sizes/weights and price patterns (fewer prompt tokens), falling back to text when nothing is recognised
+MENU_EXTRACTION_MODE = os.getenv('MENU_EXTRACTION_MODE', 'text')
+
+# When enabled, simple "Name ..... 12.50" flat-text menus are parsed locally and Claude is only called
+# below this confidence. Off by default until benchmark_rule_parser has been run against Claude's output.
+MENU_RULE_PARSER_ENABLED = os.getenv('MENU_RULE_PARSER_ENABLED', 'False').lower() in ('1', 'true', 'yes')
+MENU_RULE_PARSER_MIN_CONFIDENCE = float(os.getenv('MENU_RULE_PARSER_MIN_CONFIDENCE', 0.9))
+
+# OCR for image-only PDFs (needs pytesseract and the tesseract binary). DPI trades accuracy for speed:
+# 300 reads small print best, 150 is roughly twice as fast as 200. MENU_OCR_WORKERS=0 uses every CPU.
+MENU_OCR_DPI = int(os.getenv('MENU_OCR_DPI', 200))
+MENU_OCR_LANG = os.getenv('MENU_OCR_LANG', 'eng')
+MENU_OCR_CONFIG = os.getenv('MENU_OCR_CONFIG', '--psm 6')
+MENU_OCR_WORKERS = int(os.getenv('MENU_OCR_WORKERS', 0))
+MENU_OCR_PAGE_TIMEOUT = float(os.getenv('MENU_OCR_PAGE_TIMEOUT', 30))
+
+# Menus longer than this many characters are structured in chunks, at most LLM_MAX_CONCURRENCY at a time
+LLM_CHUNK_MAX_CHARS = int(os.getenv('LLM_CHUNK_MAX_CHARS', 12000))
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', 4))
+
+# Shared Anthropic client: requests/tokens per minute are shaped client-side, throttled calls (429/529)
+# halve the concurrency cap, which then grows back. BASE_URL points the client at a proxy or test stub.
+LLM_GATEWAY = {
+    'BASE_URL': os.getenv('ANTHROPIC_BASE_URL') or None,
+    'REQUESTS_PER_MINUTE': int(os.getenv('LLM_REQUESTS_PER_MINUTE', 50)),
+    'TOKENS_PER_MINUTE': int(os.getenv('LLM_TOKENS_PER_MINUTE', 40000)),
+    'MAX_CONCURRENCY': LLM_MAX_CONCURRENCY,
+    'MAX_RETRIES': int(os.getenv('LLM_MAX_RETRIES', 5)),
+    'TIMEOUT': float(os.getenv('LLM_TIMEOUT', 120)),
+}
+
+# Menu items per batched INSERT in the ingestion loader
+MENU_LOADER_BATCH_SIZE = int(os.getenv('MENU_LOADER_BATCH_SIZE', 500))
+
+# Stream Claude's response and load items while it is generated (also per request with ?stream=1)
+MENU_STREAMING_INGESTION = os.getenv('MENU_STREAMING_INGESTION', 'False').lower() in ('1', 'true', 'yes')
+
 # Security settings - load from environment variables
 SECRET_KEY = os.getenv('DJANGO_SECRET_KEY')
 ANTHROPIC_API_KEY = os.getenv('ANTHROPIC_API_KEY')
@@ -82,9 +148,53 @@ DATABASES = {
         'PASSWORD': os.getenv('DB_PASSWORD'),
         'HOST': os.getenv('DB_HOST', 'localhost'),
         'PORT': os.getenv('DB_PORT', '3306'),
+        # Keep connections open between requests/jobs instead of reconnecting every time
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Optional per-process connection pool shared across threads (see restaurant_menu_project/pooled_mysql)
+if os.getenv('DB_ENGINE') == 'restaurant_menu_project.pooled_mysql':
+    DATABASES['default']['ENGINE'] = 'restaurant_menu_project.pooled_mysql'
+    DATABASES['default']['OPTIONS'] = {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 10)),
+        'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', 30)),
+    }
+
+# Analytics queries run on this many threads, each with its own connection. Parallelism pays off
+# when connections come from the pool, so it is off unless the pooled backend is used
+ANALYTICS_QUERY_WORKERS = int(os.getenv(
+    'ANALYTICS_QUERY_WORKERS', 3 if DATABASES['default']['ENGINE'] == 'restaurant_menu_project.pooled_mysql' else 1
+))
+
+# API list endpoints are cursor-paginated on the primary key (see menu_app.pagination)
+API_MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', 500))
+REST_FRAMEWORK = {
+    'DEFAULT_PAGINATION_CLASS': 'menu_app.pagination.PrimaryKeyCursorPagination',
+    'PAGE_SIZE': int(os.getenv('API_PAGE_SIZE', 50)),
+}
+
+# Analytics endpoint results, cached per data version (see menu_app.analytics_cache). The version is a
+# database row, so any backend sees every process's loads; file (default, one host) or redis also share
+# the computed results between processes, locmem computes them once per process.
+_ANALYTICS_CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'menu-analytics'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', str(BASE_DIR / 'analytics_cache')),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1'),
+}
+_analytics_backend, _analytics_location = _ANALYTICS_CACHE_BACKENDS[os.getenv('ANALYTICS_CACHE_BACKEND', 'file')]
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'analytics': {
+        'BACKEND': _analytics_backend,
+        'LOCATION': os.getenv('ANALYTICS_CACHE_LOCATION', _analytics_location),
+        'TIMEOUT': int(os.getenv('ANALYTICS_CACHE_TIMEOUT', 3600)),
+    },
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -102,28 +212,51 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 # Logging configuration
+# Ingestion modules log under 'menu_app'; MENU_LOG_LEVEL=DEBUG adds extracted texts and raw LLM
+# responses, truncated to LOG_PAYLOAD_MAX_CHARS. Records are handed to the console and file
+# handlers by a background listener thread, so request threads never block on log I/O.
+MENU_LOG_LEVEL = os.getenv('MENU_LOG_LEVEL', 'INFO').upper()
+LOG_PAYLOAD_MAX_CHARS = int(os.getenv('LOG_PAYLOAD_MAX_CHARS', 500))
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'formatters': {
+        'structured': {
+            'format': '%(asctime)s %(levelname)s %(name)s pid=%(process)d %(message)s',
+        },
+    },
     'handlers': {
         'file': {
             'level': 'INFO',
             'class': 'logging.FileHandler',
             'filename': 'django_menu_processing.log',
+            'formatter': 'structured',
         },
         'console': {
-            'level': 'INFO',
+            'level': 'DEBUG',
             'class': 'logging.StreamHandler',
+            'formatter': 'structured',
+        },
+        'queue': {
+            'class': 'menu_app.logging_utils.QueueListenerHandler',
+            'handlers': ['cfg://handlers.console', 'cfg://handlers.file'],
+            'queue_size': int(os.getenv('LOG_QUEUE_SIZE', 10000)),
         },
     },
     'loggers': {
         'django': {
-            'handlers': ['file', 'console'],
+            'handlers': ['queue'],
             'level': 'INFO',
-            'propagate': True,
+            'propagate': False,
+        },
+        'menu_app': {
+            'handlers': ['queue'],
+            'level': MENU_LOG_LEVEL,
+            'propagate': False,
         },
         '': {
-            'handlers': ['file', 'console'],
+            'handlers': ['queue'],
             'level': 'INFO',
         },
     },
@@ -0,0 +1,12 @@
+import pytest
+from django.conf import settings
+from django.test.utils import override_settings
+
+
+@pytest.fixture(scope='session', autouse=True)
+def analytics_cache_location(tmp_path_factory):
+    # Set up before the test database (whose creation opens every cache), so the default
+    # file-based analytics cache is never created in the checkout
+    analytics = {**settings.CACHES['analytics'], 'LOCATION': str(tmp_path_factory.mktemp('analytics_cache'))}
+    with override_settings(CACHES={**settings.CACHES, 'analytics': analytics}):
+        yield
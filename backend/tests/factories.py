@@ -1,5 +1,6 @@
 from decimal import Decimal
 from django.utils import timezone
+from menu_app.loader import refresh_current_menu
 from menu_app.models import (
     Restaurant, Menu, MenuSection, MenuItem,
     DietaryRestriction, ProcessingLog
@@ -12,11 +13,14 @@ def make_restaurant(name="Test Restaurant", location="Madrid, Spain"):
 def make_menu(restaurant=None, version=1, date=None):
     # matches: menu(restaurant_id, version, date)
     restaurant = restaurant or make_restaurant()
-    return Menu.objects.create(
+    menu = Menu.objects.create(
         restaurant=restaurant,
         version=version,
         date=date or timezone.now().date()
     )
+    # the highest version becomes current, as when the loader writes it
+    refresh_current_menu(restaurant.pk)
+    return menu
 
 def make_section(menu=None, section_name="Appetizers", section_order=1):
     # matches: menusection(section_name, section_order)
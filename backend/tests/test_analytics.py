@@ -0,0 +1,246 @@
+import json
+from decimal import Decimal
+
+import pytest
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from menu_app import loader
+from menu_app.analytics_cache import analytics_version, bump_analytics_version, run_analytics_queries
+from menu_app.models import Menu, MenuDietaryStats, MenuItem, MenuSection, MenuStats, Restaurant
+from menu_app.views_queries import (
+    get_dietary_restrictions_distribution, get_menu_items_per_restaurant, get_price_analysis
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_restriction_cache():
+    loader.clear_dietary_restriction_cache()
+
+
+@pytest.fixture(autouse=True)
+def analytics_cache():
+    caches['analytics'].clear()
+    yield
+    caches['analytics'].clear()
+
+
+def load(name, prices, dietary_id=1):
+    return loader.insert_into_database({
+        "restaurant": {"name": name, "location": "Sevilla"},
+        "menu_sections": [{"section_name": "Tapas", "items": [
+            {"name": f"Dish {i}", "price": price, "dietary_restriction_id": dietary_id}
+            for i, price in enumerate(prices)
+        ]}],
+    })
+
+
+def snapshot(all_versions):
+    return (get_menu_items_per_restaurant(all_versions), get_dietary_restrictions_distribution(all_versions),
+            get_price_analysis(all_versions))
+
+
+@pytest.mark.django_db
+def test_loader_maintains_summary_tables():
+    load("Casa", [4, 6.5])
+    load("Casa", [10])
+    load("Mar", [3], dietary_id=2)
+
+    assert get_menu_items_per_restaurant(all_versions=True) == [
+        {"restaurant_name": "Casa", "total_items": 3, "average_price": Decimal("20.5") / 3},
+        {"restaurant_name": "Mar", "total_items": 1, "average_price": Decimal("3")},
+    ]
+    assert get_price_analysis(all_versions=True)[0] == {
+        "restaurant_name": "Casa", "min_price": Decimal("4"), "max_price": Decimal("10"),
+        "avg_price": Decimal("20.5") / 3,
+    }
+    dietary = {row["restriction_type"]: row for row in get_dietary_restrictions_distribution(all_versions=True)}
+    assert dietary["No Restriction"]["item_count"] == 3 and dietary["Vegan"]["percentage"] == 25.0
+    assert dietary["Vegetarian"]["item_count"] == 0
+
+    # A full rebuild reproduces the incrementally maintained rows
+    incremental = snapshot(True), snapshot(False)
+    call_command("refresh_analytics", stdout=open("/dev/null", "w"))
+    assert (snapshot(True), snapshot(False)) == incremental
+
+
+@pytest.mark.django_db
+def test_analytics_default_to_current_menus(client):
+    load("Casa", [4, 6.5])
+    load("Casa", [10])
+    load("Mar", [3], dietary_id=2)
+
+    assert get_menu_items_per_restaurant() == [
+        {"restaurant_name": "Casa", "total_items": 1, "average_price": Decimal("10")},
+        {"restaurant_name": "Mar", "total_items": 1, "average_price": Decimal("3")},
+    ]
+    dietary = {row["restriction_type"]: row["item_count"] for row in get_dietary_restrictions_distribution()}
+    assert dietary["No Restriction"] == 1 and dietary["Vegan"] == 1
+
+    url = reverse("analytics_views")
+    current = client.get(url).json()["price_analysis"][0]
+    history = client.get(url, {"all_versions": 1}).json()["price_analysis"][0]
+    assert (current["min_price"], history["min_price"]) == (10.0, 4.0)
+
+
+@pytest.mark.django_db
+def test_deleting_the_current_menu_falls_back_to_the_previous_version():
+    first = load("Casa", [4])
+    second = load("Casa", [10])
+    restaurant = Restaurant.objects.get(name="Casa")
+    assert restaurant.current_menu_id == second
+
+    Menu.objects.get(pk=second).delete()
+    restaurant.refresh_from_db()
+    assert restaurant.current_menu_id == first
+    assert get_menu_items_per_restaurant()[0]["average_price"] == Decimal("4")
+
+
+@pytest.mark.django_db
+def test_streamed_menus_are_counted():
+    with loader.StreamingMenuLoader(batch_size=1) as menu_loader:
+        menu_loader.set_restaurant({"name": "Casa"})
+        menu_loader.add_section({"section_name": "Tapas"})
+        for price in (2, 8):
+            menu_loader.add_item({"name": "Dish", "price": price})
+        menu_id = menu_loader.finish()
+
+    stats = MenuStats.objects.get(menu_id=menu_id)
+    assert (stats.item_count, stats.min_price, stats.max_price) == (2, Decimal("2"), Decimal("8"))
+    assert MenuDietaryStats.objects.get(menu_id=menu_id).item_count == 2
+
+
+@pytest.mark.django_db
+def test_api_item_edits_refresh_their_menu(client):
+    menu_id = load("Casa", [4, 6])
+    item = MenuItem.objects.filter(section__menu_id=menu_id).first()
+
+    client.patch(reverse("menuitem-detail", args=[item.pk]), data=json.dumps({"price": "20.00"}),
+                 content_type="application/json")
+    assert MenuStats.objects.get(menu_id=menu_id).max_price == Decimal("20")
+
+    client.delete(reverse("menuitem-detail", args=[item.pk]))
+    assert MenuStats.objects.get(menu_id=menu_id).item_count == 1
+
+
+@pytest.mark.django_db
+def test_orm_edits_refresh_the_menus_they_touch():
+    from tests.factories import make_dietary_restriction
+
+    first, second = load("Casa", [4, 6]), load("Mar", [3])
+    item = MenuItem.objects.filter(section__menu_id=first).first()
+    item.section = MenuSection.objects.get(menu_id=second)
+    item.save()
+    assert MenuStats.objects.get(menu_id=first).item_count == 1
+    assert MenuStats.objects.get(menu_id=second).item_count == 2
+
+    section = MenuSection.objects.get(menu_id=second)
+    section.menu_id = first
+    section.save()
+    assert MenuStats.objects.get(menu_id=first).item_count == 3
+    assert MenuStats.objects.get(menu_id=second).item_count == 0
+
+    raw = make_dietary_restriction("Raw food")
+    MenuItem.objects.filter(section__menu_id=first).update(dietary_restriction=raw)
+    MenuItem.objects.filter(section__menu_id=first).first().save()
+    assert MenuDietaryStats.objects.get(menu_id=first).dietary_restriction_id == raw.pk
+    raw.delete()
+    assert MenuDietaryStats.objects.get(menu_id=first).dietary_restriction_id is None
+
+    section.delete()
+    assert MenuStats.objects.get(menu_id=first).item_count == 1
+
+    # A deleted menu takes its summary with it rather than having it rebuilt
+    Menu.objects.get(pk=first).delete()
+    assert not MenuStats.objects.filter(menu_id=first).exists()
+
+
+@pytest.mark.django_db
+def test_analytics_queries_do_not_grow_with_items(client, django_capture_on_commit_callbacks):
+    def queries():
+        with CaptureQueriesContext(connection) as ctx:
+            assert client.get(reverse("analytics_views")).status_code == 200
+        return len(ctx.captured_queries)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        load("Casa", [4])
+    analytics_version()  # Seeds the version row, which only the first read ever does
+    few = queries()
+    with django_capture_on_commit_callbacks(execute=True):
+        load("Mar", list(range(1, 200)))
+    assert queries() == few > 0
+
+
+@pytest.mark.django_db
+def test_unchanged_analytics_are_served_from_cache_and_revalidated(client, django_capture_on_commit_callbacks):
+    url = reverse("analytics_views")
+    with django_capture_on_commit_callbacks(execute=True):
+        load("Casa", [4])
+    first = client.get(url)
+    etag = first["ETag"]
+    assert "no-cache" in first["Cache-Control"]
+
+    with CaptureQueriesContext(connection) as ctx:
+        assert client.get(url).json() == first.json()
+        not_modified = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert not_modified.status_code == 304
+    assert all("menu_app_analyticsversion" in query["sql"] for query in ctx.captured_queries)
+
+    # A committed load retires the cached result and the ETag
+    with django_capture_on_commit_callbacks(execute=True):
+        load("Mar", [3])
+    changed = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert changed.status_code == 200 and changed["ETag"] != etag
+    assert len(changed.json()["menu_items_per_restaurant"]) == 2
+
+
+@pytest.mark.django_db
+def test_item_edits_and_uncommitted_loads(client, django_capture_on_commit_callbacks):
+    url = reverse("analytics_views")
+    menu_id = load("Casa", [4, 6])
+    etag = client.get(url)["ETag"]
+
+    # Not committed yet (the test transaction never commits): nothing is invalidated
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    with django_capture_on_commit_callbacks(execute=True):
+        MenuItem.objects.filter(section__menu_id=menu_id).first().delete()
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_version_bumps_are_never_lost():
+    from concurrent.futures import ThreadPoolExecutor
+
+    def bump():
+        try:
+            for _ in range(10):
+                bump_analytics_version()
+        finally:
+            connection.close()
+
+    start = analytics_version()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        for future in [executor.submit(bump) for _ in range(4)]:
+            future.result()
+    assert analytics_version() == start + 40
+
+
+@pytest.mark.django_db(transaction=True)
+def test_analytics_queries_run_concurrently_on_their_own_connections(settings):
+    load("Casa", [4, 6])
+    load("Mar", [3], dietary_id=2)
+    sequential = run_analytics_queries()
+
+    settings.ANALYTICS_QUERY_WORKERS = 3
+    with CaptureQueriesContext(connection) as ctx:
+        assert run_analytics_queries() == sequential
+    assert ctx.captured_queries == []
+
+    # Inside a transaction the queries must see its uncommitted rows, so they stay on its connection
+    with transaction.atomic():
+        load("Sol", [8])
+        assert len(run_analytics_queries()["price_analysis"]) == 3
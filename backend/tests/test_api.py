@@ -3,7 +3,7 @@ import pytest
 from django.urls import reverse
 
 # factories now live in backend/tests/
-from tests.factories import make_menu, make_section, make_item
+from tests.factories import make_restaurant, make_menu, make_section, make_item
 
 @pytest.mark.django_db
 def test_get_restaurant_list(client):
@@ -18,7 +18,7 @@ def test_get_menu_list(client):
     url = reverse("menu-list")
     resp = client.get(url)
     assert resp.status_code == 200
-    data = resp.json()
+    data = resp.json()["results"]
     assert isinstance(data, list)
     assert len(data) >= 2
 
@@ -45,7 +45,7 @@ def test_get_menu_items(client):
     url = reverse("menuitem-list")
     resp = client.get(url)
     assert resp.status_code == 200
-    names = {row["name"] for row in resp.json()}
+    names = {row["name"] for row in resp.json()["results"]}
     assert {"Soup", "Salad"}.issubset(names)
 
 # --- ADDITIONAL TEST BELOW ---
@@ -61,5 +61,86 @@ def test_created_item_appears_in_list(client):
     )
     resp = client.get(url)
     assert resp.status_code == 200
-    names = {row["name"] for row in resp.json()}
+    names = {row["name"] for row in resp.json()["results"]}
     assert "Tea" in names
+
+# --- QUERY COUNT REGRESSION ---
+
+def make_restaurants(count, menus=2, sections=2, items=3):
+    for r in range(count):
+        restaurant = make_restaurant(name=f"R{r}")
+        for v in range(1, menus + 1):
+            menu = make_menu(restaurant=restaurant, version=v)
+            for s in range(sections):
+                section = make_section(menu=menu, section_name=f"S{s}", section_order=s)
+                for i in range(items):
+                    make_item(section=section, name=f"I{i}")
+
+
+def count_queries(client, url):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as ctx:
+        assert client.get(url).status_code == 200
+    return len(ctx.captured_queries)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("name, expected", [("restaurant-list", 4), ("menu-list", 3), ("menuitem-list", 1)])
+def test_list_query_count_does_not_grow_with_data(client, name, expected):
+    url = reverse(name)
+    make_restaurants(1)
+    small = count_queries(client, url)
+    make_restaurants(4, menus=3, sections=3)
+    assert count_queries(client, url) == small == expected
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("name, table", [("menu-list", "menu_app_menu"), ("menuitem-list", "menu_app_menuitem")])
+def test_list_selects_no_related_columns(client, name, table):
+    # Foreign keys are serialized as primary keys, so the list query should not pull in related rows
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    make_restaurants(1)
+    with CaptureQueriesContext(connection) as ctx:
+        assert client.get(reverse(name)).status_code == 200
+    columns = ctx.captured_queries[0]["sql"].split(" FROM ")[0]
+    assert columns.count('"menu_app_') == columns.count(f'"{table}"')
+
+
+@pytest.mark.django_db
+def test_restaurant_list_nests_menus_sections_and_items(client):
+    make_restaurants(1, menus=1, sections=1, items=2)
+    restaurant = client.get(reverse("restaurant-list")).json()["results"][0]
+    items = restaurant["menus"][0]["sections"][0]["items"]
+    assert sorted(item["name"] for item in items) == ["I0", "I1"]
+
+
+# --- PAGINATION ---
+
+@pytest.mark.django_db
+def test_menu_items_are_cursor_paginated_by_primary_key(client):
+    s = make_section()
+    created = [make_item(section=s, name=f"Dish {i}").pk for i in range(5)]
+
+    seen = []
+    url = reverse("menuitem-list") + "?page_size=2"
+    while url:
+        page = client.get(url).json()
+        assert len(page["results"]) <= 2
+        assert "count" not in page
+        seen += [row["item_id"] for row in page["results"]]
+        url = page["next"]
+    assert seen == created
+
+
+@pytest.mark.django_db
+def test_page_size_is_capped(client, settings):
+    settings.API_MAX_PAGE_SIZE = 3
+    s = make_section()
+    for i in range(5):
+        make_item(section=s, name=f"Dish {i}")
+    page = client.get(reverse("menuitem-list") + "?page_size=1000").json()
+    assert len(page["results"]) == 3
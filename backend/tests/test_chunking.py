@@ -0,0 +1,61 @@
+import json
+import threading
+
+from menu_app import views
+from menu_app.chunking import split_menu_text, merge_structured_chunks, structure_in_chunks
+
+
+def test_split_breaks_on_blank_lines_within_limit():
+    text = "\n\n".join(["STARTERS\nSoup 5", "MAINS\nSteak 20", "DESSERTS\nFlan 4"])
+    chunks = split_menu_text(text, max_chars=20)
+    assert chunks == ["STARTERS\nSoup 5", "MAINS\nSteak 20", "DESSERTS\nFlan 4"]
+    assert split_menu_text(text, max_chars=1000) == [text]
+
+
+def test_split_falls_back_to_lines_for_oversized_block():
+    block = "\n".join(f"Wine {i} 30" for i in range(20))
+    chunks = split_menu_text(block, max_chars=40)
+    assert all(len(chunk) <= 40 for chunk in chunks)
+    assert "\n".join(chunks) == block
+
+
+def test_merge_preserves_order_and_joins_continued_sections():
+    merged = merge_structured_chunks([
+        {"restaurant": {"name": "Casa"}, "menu_sections": [
+            {"section_name": "Starters", "items": [{"name": "Soup"}]},
+            {"section_name": "Wines", "items": [{"name": "Rioja"}]},
+        ]},
+        {"restaurant": {}, "menu_sections": [
+            {"section_name": "wines", "items": [{"name": "Albarino"}]},
+            {"section_name": "Desserts", "items": [{"name": "Flan"}]},
+        ]},
+    ])
+    assert merged["restaurant"] == {"name": "Casa"}
+    assert [s["section_name"] for s in merged["menu_sections"]] == ["Starters", "Wines", "Desserts"]
+    assert [s["section_order"] for s in merged["menu_sections"]] == [1, 2, 3]
+    assert [i["name"] for i in merged["menu_sections"][1]["items"]] == ["Rioja", "Albarino"]
+
+
+def test_structure_in_chunks_runs_chunks_concurrently():
+    barrier = threading.Barrier(3, timeout=5)
+
+    def structure_chunk(chunk):
+        barrier.wait()  # only passes if all three chunks are in flight at once
+        return {"menu_sections": [{"section_name": chunk.split("\n")[0], "items": []}]}
+
+    text = "A\nx\n\nB\ny\n\nC\nz"
+    merged = structure_in_chunks(text, structure_chunk, max_chars=4, max_workers=3)
+    assert [s["section_name"] for s in merged["menu_sections"]] == ["A", "B", "C"]
+
+
+def test_process_with_anthropic_api_merges_chunks(settings, monkeypatch):
+    settings.LLM_CHUNK_MAX_CHARS = 10
+    settings.LLM_CACHE_BYPASS = True
+
+    def fake_call(chunk):
+        name = chunk.split("\n")[0]
+        return json.dumps({"restaurant": {"name": "Casa"}, "menu_sections": [{"section_name": name, "items": []}]})
+
+    monkeypatch.setattr(views, "_call_anthropic_api", fake_call)
+    result = json.loads(views.process_with_anthropic_api("Tapas\n1\n\nVinos\n2"))
+    assert [s["section_name"] for s in result["menu_sections"]] == ["Tapas", "Vinos"]
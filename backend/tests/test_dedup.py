@@ -0,0 +1,100 @@
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+
+from menu_app import loader, views
+from menu_app.dedup import text_sha256, upload_sha256, get_dedup_stats, reset_dedup_stats
+from menu_app.models import Restaurant
+from tests.factories import make_menu, make_processing_log
+
+
+@pytest.fixture(autouse=True)
+def clean_stats():
+    reset_dedup_stats()
+
+
+def test_text_hash_ignores_accents_case_and_whitespace():
+    assert text_sha256("Paella  Valenciana\n12,50") == text_sha256("PAELLA valenciana 12,50 ")
+    assert text_sha256("Jamón ibérico") == text_sha256("Jamon iberico")
+    assert text_sha256("Soup 5.00") != text_sha256("Soup 6.00")
+
+
+@pytest.mark.django_db
+def test_same_pdf_returns_existing_menu_without_llm(client, monkeypatch):
+    menu = make_menu()
+    payload = b"%PDF-1.4 same menu"
+    log = make_processing_log(menu=menu, status="successful")
+    log.pdf_sha256 = upload_sha256(SimpleUploadedFile("m.pdf", payload))
+    log.save()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("duplicate upload must not reach extraction or the LLM")
+
+    monkeypatch.setattr(views, "extract_text_from_pdf", fail)
+    monkeypatch.setattr(views, "structure_menu_text", fail)
+
+    resp = client.post(reverse("process_menu_pdf"), {"pdf_file": SimpleUploadedFile("m.pdf", payload)})
+    body = resp.json()
+    assert resp.status_code == 200
+    assert body["duplicate"] is True and body["matched_on"] == "pdf"
+    assert body["menu_id"] == menu.menu_id
+    assert get_dedup_stats()["pdf_hits"] == 1
+
+
+@pytest.mark.django_db
+def test_same_text_in_new_pdf_skips_llm(client, monkeypatch):
+    menu = make_menu()
+    log = make_processing_log(menu=menu, status="successful")
+    log.text_sha256 = text_sha256("Soup 5.00")
+    log.save()
+
+    monkeypatch.setattr(views, "extract_text_from_pdf", lambda source, workers=None: "SOUP   5.00")
+    monkeypatch.setattr(views, "structure_menu_text", lambda text, **kwargs: pytest.fail("LLM called"))
+
+    resp = client.post(reverse("process_menu_pdf"), {"pdf_file": SimpleUploadedFile("m.pdf", b"%PDF new bytes")})
+    body = resp.json()
+    assert body["matched_on"] == "text"
+    assert body["menu_id"] == menu.menu_id
+
+    stats = client.get(reverse("ingestion_stats")).json()["dedup"]
+    assert stats["pdf_misses"] == 1 and stats["text_hits"] == 1
+
+
+@pytest.mark.django_db
+def test_force_bypasses_dedup(client, monkeypatch):
+    menu = make_menu()
+    log = make_processing_log(menu=menu, status="successful")
+    log.text_sha256 = text_sha256("Soup 5.00")
+    log.save()
+
+    calls = []
+    monkeypatch.setattr(views, "extract_text_from_pdf", lambda source, workers=None: "Soup 5.00")
+    monkeypatch.setattr(views, "structure_menu_text", lambda text, **kwargs: calls.append(text) or {"restaurant": {}})
+    monkeypatch.setattr(views, "insert_into_database", lambda data, **kwargs: 42)
+
+    resp = client.post(reverse("process_menu_pdf") + "?force=1", {"pdf_file": SimpleUploadedFile("m.pdf", b"%PDF x")})
+    assert resp.json()["menu_id"] == 42
+    assert calls == ["Soup 5.00"]
+
+
+@pytest.mark.django_db
+def test_going_back_to_an_earlier_menu_loads_it_again(client, monkeypatch):
+    loader.clear_dietary_restriction_cache()
+    cards = {b"%PDF card A": "Soup 5.00", b"%PDF card B": "Stew 9.00"}
+    monkeypatch.setattr(views, "extract_text_from_pdf", lambda source, workers=None: cards[source])
+    monkeypatch.setattr(views, "structure_menu_text", lambda text, **kwargs: {
+        "restaurant": {"name": "Casa"},
+        "menu_sections": [{"section_name": "Mains", "items": [{"name": text.split()[0], "price": 5}]}],
+    })
+
+    def upload(payload):
+        return client.post(reverse("process_menu_pdf"), {"pdf_file": SimpleUploadedFile("m.pdf", payload)}).json()
+
+    first, second = upload(b"%PDF card A"), upload(b"%PDF card B")
+    third = upload(b"%PDF card A")
+
+    assert not third.get("duplicate")
+    assert third["menu_id"] not in (first["menu_id"], second["menu_id"])
+    assert Restaurant.objects.get(name="Casa").current_menu_id == third["menu_id"]
+    # Uploading the current card again is still a duplicate
+    assert upload(b"%PDF card A")["menu_id"] == third["menu_id"]
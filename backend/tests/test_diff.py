@@ -0,0 +1,119 @@
+import json
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+from menu_app import loader
+from menu_app.diff import item_match_key
+from menu_app.models import MenuItem, MenuItemChange, Restaurant
+
+
+@pytest.fixture(autouse=True)
+def fresh_restriction_cache():
+    loader.clear_dietary_restriction_cache()
+
+
+def load(section_name, items):
+    return loader.insert_into_database({
+        "restaurant": {"name": "Casa", "location": "Sevilla"},
+        "menu_sections": [{"section_name": section_name, "items": [
+            {"name": name, "price": price} for name, price in items
+        ]}],
+    })
+
+
+@pytest.fixture
+def versions(db):
+    first = load("Tapas", [("Croquetas caseras", 6), ("Sopa", 4), ("Pan", 2)])
+    second = load("TAPAS", [("croquetas  CASERAS", 6), ("Sopa", 5), ("Gazpacho", 5)])
+    return first, second
+
+
+def changes(menu_id):
+    return sorted(MenuItemChange.objects.filter(menu_id=menu_id).values_list('kind', 'name', 'old_price', 'new_price'))
+
+
+def test_item_match_key_ignores_case_accents_and_spacing():
+    assert item_match_key("Entrantes ", "Jamón  Ibérico") == item_match_key("entrantes", "jamon iberico")
+    assert item_match_key("Postres", "Flan") != item_match_key("Entrantes", "Flan")
+
+
+def test_loads_record_changes_against_the_previous_version(versions):
+    first, second = versions
+    assert changes(first) == [
+        ("added", "Croquetas caseras", None, Decimal("6")),
+        ("added", "Pan", None, Decimal("2")),
+        ("added", "Sopa", None, Decimal("4")),
+    ]
+    assert changes(second) == [
+        ("added", "Gazpacho", None, Decimal("5")),
+        ("removed", "Pan", Decimal("2"), None),
+        ("repriced", "Sopa", Decimal("4"), Decimal("5")),
+    ]
+
+    # A rebuild reproduces what the loader recorded
+    call_command("rebuild_menu_changes", stdout=open("/dev/null", "w"))
+    assert changes(second)[2] == ("repriced", "Sopa", Decimal("4"), Decimal("5"))
+    assert MenuItemChange.objects.count() == 6
+
+
+def test_migration_backfill_matches_what_the_loader_records(versions):
+    from importlib import import_module
+
+    from django.apps import apps
+
+    def recorded():
+        return sorted(MenuItemChange.objects.values_list('menu_id', 'kind', 'match_key', 'name', 'section_name',
+                                                         'old_price', 'new_price'))
+
+    third = load("Tapas", [("Sopa", 5), ("Sopa", 7), ("Pan", 2)])
+    assert len(changes(third)) == 4
+    expected = recorded()
+    MenuItemChange.objects.all().delete()
+    import_module("menu_app.migrations.0009_item_changes").record_item_changes(apps, None)
+    assert recorded() == expected
+
+
+def test_menu_changes_and_price_history_endpoints(client, versions):
+    second = versions[1]
+    diff = client.get(reverse("menu-changes", args=[second])).json()
+    assert diff["version"] == 2
+    assert [change["name"] for change in diff["added"]] == ["Gazpacho"]
+    assert [change["name"] for change in diff["removed"]] == ["Pan"]
+    assert [(change["old_price"], change["new_price"]) for change in diff["repriced"]] == [("4.00", "5.00")]
+
+    restaurant_id = Restaurant.objects.get(name="Casa").pk
+    url = reverse("restaurant-price-history", args=[restaurant_id])
+    history = client.get(url, {"section": "tapas", "name": "SOPA"}).json()["results"]
+    assert [(row["version"], row["kind"], row["new_price"]) for row in history] == [
+        (1, "added", "4.00"), (2, "repriced", "5.00")]
+    assert len(client.get(url, {"name": "pan"}).json()["results"]) == 2
+    assert len(client.get(url, {"section": "Tapas"}).json()["results"]) == 6
+    assert client.get(reverse("restaurant-price-history", args=[restaurant_id + 1])).status_code == 404
+
+
+def test_api_items_get_a_match_key(client, versions):
+    section_id = MenuItem.objects.filter(section__menu_id=versions[1]).first().section_id
+    resp = client.post(reverse("menuitem-list"), content_type="application/json",
+                       data=json.dumps({"section": section_id, "name": "Flan Casero", "price": "3.00"}))
+    assert resp.json()["match_key"] == "tapas|flan casero"
+
+
+def test_every_save_keeps_the_match_key_in_step(client, versions):
+    item = MenuItem.objects.filter(section__menu_id=versions[1], name="Sopa").get()
+    resp = client.post(reverse("menuitem-list"), content_type="application/json",
+                       data=json.dumps({"section": item.section_id, "name": "Flan", "price": "3.00",
+                                        "match_key": "forged"}))
+    assert resp.json()["match_key"] == "tapas|flan"
+
+    item.name = "Sopa del día"
+    item.save()
+    assert MenuItem.objects.get(pk=item.pk).match_key == "tapas|sopa del dia"
+
+    section = item.section
+    section.section_name = "Entrantes"
+    section.save()
+    assert set(section.items.values_list("match_key", flat=True)) == {
+        "entrantes|croquetas caseras", "entrantes|sopa del dia", "entrantes|gazpacho", "entrantes|flan"}
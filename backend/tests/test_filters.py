@@ -0,0 +1,88 @@
+import pytest
+from django.db import connection
+from django.urls import reverse
+
+from menu_app.filters import filter_menu_items, filter_menus
+from menu_app.models import Menu, MenuItem
+from tests.factories import make_dietary_restriction, make_item, make_menu, make_restaurant, make_section
+
+
+def index_names(model, leading_column):
+    """
+    Indexes on model's table whose first column is leading_column
+    """
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+    return {name for name, info in constraints.items() if info['index'] and info['columns'][:1] == [leading_column]}
+
+
+def assert_uses_index(queryset, names):
+    plan = queryset.explain()
+    assert any(name in plan for name in names), plan
+
+
+@pytest.fixture
+def catalogue(db):
+    vegan = make_dietary_restriction(label="Vegan")
+    casa, mar = make_restaurant(name="Casa"), make_restaurant(name="Mar")
+    old, new = make_menu(restaurant=casa, version=1), make_menu(restaurant=casa, version=2)
+    other = make_menu(restaurant=mar, version=1)
+    tapas = make_section(menu=new, section_name="Tapas")
+    make_item(section=make_section(menu=old), name="Sopa", price="4.00")
+    make_item(section=tapas, name="Sopa de ajo", price="6.50", dietary_restriction=vegan)
+    make_item(section=tapas, name="Solomillo", price="19.00")
+    make_item(section=tapas, name="Croquetas", price="7.00", dietary_restriction=vegan)
+    make_item(section=make_section(menu=other), name="Sardinas", price="9.00")
+    return {"vegan": vegan, "casa": casa, "new": new, "tapas": tapas}
+
+
+def names(resp):
+    assert resp.status_code == 200
+    return [row["name"] for row in resp.json()["results"]]
+
+
+def test_menu_item_filters(client, catalogue):
+    url = reverse("menuitem-list")
+    assert names(client.get(url, {"min_price": "6", "max_price": "9"})) == ["Sopa de ajo", "Croquetas", "Sardinas"]
+    assert names(client.get(url, {"dietary_restriction": catalogue["vegan"].pk, "max_price": "7"})) == [
+        "Sopa de ajo", "Croquetas"]
+    assert names(client.get(url, {"section": catalogue["tapas"].pk, "name": "So"})) == ["Sopa de ajo", "Solomillo"]
+    assert names(client.get(url, {"restaurant": catalogue["casa"].pk, "version": 1})) == ["Sopa"]
+    assert names(client.get(url, {"menu": catalogue["new"].pk, "ordering": "-price"})) == [
+        "Solomillo", "Croquetas", "Sopa de ajo"]
+
+
+def test_menu_filters_and_bad_parameters(client, catalogue):
+    resp = client.get(reverse("menu-list"), {"restaurant": catalogue["casa"].pk, "version": 2})
+    assert [menu["menu_id"] for menu in resp.json()["results"]] == [catalogue["new"].pk]
+
+    resp = client.get(reverse("menuitem-list"), {"min_price": "cheap"})
+    assert resp.status_code == 400
+    assert "min_price" in resp.json()
+
+
+def test_menu_list_defaults_to_current_versions(client, catalogue):
+    url = reverse("menu-list")
+    current = [menu["version"] for menu in client.get(url, {"restaurant": catalogue["casa"].pk}).json()["results"]]
+    history = client.get(url, {"restaurant": catalogue["casa"].pk, "all_versions": 1}).json()["results"]
+    assert current == [2]
+    assert [menu["version"] for menu in history] == [1, 2]
+    # Older versions stay reachable by id
+    assert client.get(reverse("menu-detail", args=[history[0]["menu_id"]])).status_code == 200
+
+
+@pytest.mark.django_db
+def test_filters_are_served_by_indexes():
+    items = MenuItem.objects.order_by('pk')
+    assert_uses_index(filter_menu_items(items, {"min_price": "5", "max_price": "9"}), index_names(MenuItem, "price"))
+    assert_uses_index(filter_menu_items(items, {"section": "1", "name": "So"}), index_names(MenuItem, "section_id"))
+    if connection.vendor == 'mysql':
+        # Only MySQL range-scans a case-insensitive LIKE 'So%' (SQLite's needs a NOCASE column),
+        # and with it the (section, name) composite index
+        assert_uses_index(filter_menu_items(items, {"name": "So"}), index_names(MenuItem, "name"))
+        assert_uses_index(filter_menu_items(items, {"section": "1", "name": "So"}),
+                          ["menu_app_me_section_79d9de_idx"])
+    # (restaurant, version) composite index, or the unique constraint on the same columns
+    # (SQLite names the constraint's index sqlite_autoindex_<table>_<n>)
+    assert_uses_index(filter_menus(Menu.objects.order_by('pk'), {"restaurant": "1", "version": "2"}),
+                      ["menu_app_me_restaur_c88abf_idx", "unique_menu_version", "sqlite_autoindex_menu_app_menu"])
@@ -0,0 +1,65 @@
+import fitz
+import pytest
+from django.core.management import call_command
+
+from menu_app import loader, views
+from menu_app.models import Menu, ProcessingLog
+
+
+def write_pdf(path, text):
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), text)
+    doc.save(str(path))
+    doc.close()
+
+
+@pytest.fixture
+def menu_dir(tmp_path, monkeypatch):
+    loader.clear_dietary_restriction_cache()
+    write_pdf(tmp_path / "casa.pdf", "Casa Soup 5.00")
+    write_pdf(tmp_path / "mar.pdf", "Mar Fish 12.00")
+    (tmp_path / "notes.txt").write_text("not a menu")
+
+    def fake_structure(text, **kwargs):
+        name = text.split()[0]
+        return {"restaurant": {"name": name}, "menu_sections": [
+            {"section_name": "Main", "items": [{"name": text.split()[1], "price": 5}]}
+        ]}
+
+    monkeypatch.setattr(views, "structure_menu_text", fake_structure)
+    return tmp_path
+
+
+@pytest.mark.django_db
+def test_imports_directory_and_resumes(menu_dir, capsys):
+    call_command("import_menus", str(menu_dir), "--workers", "2")
+    assert set(Menu.objects.values_list("restaurant__name", flat=True)) == {"Casa", "Mar"}
+    assert ProcessingLog.objects.filter(status="successful").count() == 2
+
+    call_command("import_menus", str(menu_dir / "*.pdf"), "--workers", "1")
+    assert Menu.objects.count() == 2
+    assert "0 imported, 2 skipped" in capsys.readouterr().out
+
+
+@pytest.mark.django_db
+def test_dry_run_writes_nothing(menu_dir, capsys):
+    call_command("import_menus", str(menu_dir), "--workers", "1", "--dry-run")
+    assert not Menu.objects.exists()
+    assert not ProcessingLog.objects.exists()
+    assert "would import 1 section(s), 1 item(s)" in capsys.readouterr().out
+
+
+@pytest.mark.django_db
+def test_structuring_failure_is_logged_and_others_import(menu_dir, monkeypatch):
+    real = views.structure_menu_text
+
+    def flaky(text, **kwargs):
+        if text.startswith("Mar"):
+            raise ValueError("bad JSON")
+        return real(text)
+
+    monkeypatch.setattr(views, "structure_menu_text", flaky)
+    call_command("import_menus", str(menu_dir), "--workers", "1")
+    assert list(Menu.objects.values_list("restaurant__name", flat=True)) == ["Casa"]
+    failed = ProcessingLog.objects.get(status="failed")
+    assert failed.source_file.endswith("mar.pdf") and "bad JSON" in failed.error_message
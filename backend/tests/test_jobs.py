@@ -0,0 +1,126 @@
+import os
+from datetime import timedelta
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from django.utils import timezone
+
+from menu_app import jobs, views
+from menu_app.models import Menu, ProcessingLog
+from tests.factories import make_menu
+
+
+@pytest.fixture
+def queue_dir(settings, tmp_path):
+    settings.MENU_INGESTION_QUEUE_DIR = tmp_path
+    return tmp_path
+
+
+@pytest.mark.django_db
+def test_async_upload_returns_job_id(client, queue_dir):
+    upload = SimpleUploadedFile("menu.pdf", b"%PDF-1.4 fake", content_type="application/pdf")
+    resp = client.post(reverse("process_menu_pdf") + "?async=1", {"pdf_file": upload})
+    assert resp.status_code == 202
+    body = resp.json()
+    job = ProcessingLog.objects.get(log_id=body["job_id"])
+    assert job.status == ProcessingLog.STATUS_QUEUED
+    assert job.menu_id is None
+    assert job.source_file.startswith(str(queue_dir))
+
+    status = client.get(body["status_url"]).json()
+    assert status["status"] == "queued"
+    assert status["menu_id"] is None
+
+
+@pytest.mark.django_db
+def test_job_status_unknown_job(client):
+    resp = client.get(reverse("menu_job_status", args=[999]))
+    assert resp.status_code == 404
+
+
+@pytest.mark.django_db
+def test_worker_runs_queued_job(client, queue_dir, monkeypatch):
+    menu = make_menu()
+    upload = SimpleUploadedFile("menu.pdf", b"%PDF-1.4 fake", content_type="application/pdf")
+    job_id = client.post(reverse("process_menu_pdf") + "?async=1", {"pdf_file": upload}).json()["job_id"]
+
+    def fake_insert(structured_data, log_id=None, **hashes):
+        ProcessingLog.objects.filter(log_id=log_id).update(menu=menu, status=ProcessingLog.STATUS_SUCCESSFUL)
+        return menu.menu_id
+
+    monkeypatch.setattr(views, "extract_text_from_pdf", lambda path, workers=None: "Soup 5.00")
+    monkeypatch.setattr(views, "structure_menu_text", lambda text, **kwargs: {"restaurant": {"name": "X"}})
+    monkeypatch.setattr(views, "insert_into_database", fake_insert)
+
+    assert jobs.worker_loop(exit_when_idle=True) == 1
+
+    job = ProcessingLog.objects.get(log_id=job_id)
+    assert job.status == ProcessingLog.STATUS_SUCCESSFUL
+    assert not list(queue_dir.iterdir())
+    result = client.get(reverse("menu_job_status", args=[job_id])).json()
+    assert result["result"]["menu_id"] == menu.menu_id
+
+
+@pytest.mark.django_db
+def test_worker_marks_failed_job(client, queue_dir, monkeypatch):
+    upload = SimpleUploadedFile("menu.pdf", b"%PDF-1.4 fake", content_type="application/pdf")
+    job_id = client.post(reverse("process_menu_pdf") + "?async=1", {"pdf_file": upload}).json()["job_id"]
+
+    monkeypatch.setattr(views, "extract_text_from_pdf", lambda path, workers=None: None)
+    monkeypatch.setattr(views, "extract_text_from_image", lambda path: None)
+
+    jobs.worker_loop(exit_when_idle=True)
+
+    job = ProcessingLog.objects.get(log_id=job_id)
+    assert job.status == ProcessingLog.STATUS_FAILED
+    assert job.error_message
+
+
+@pytest.mark.django_db
+def test_jobs_left_processing_by_a_dead_worker_are_reclaimed(settings):
+    settings.MENU_INGESTION_JOB_TIMEOUT = 60
+    job = ProcessingLog.objects.create(status=ProcessingLog.STATUS_QUEUED, source_file="menu.pdf")
+    claimed = jobs.claim_next_job()
+    assert claimed.log_id == job.log_id
+    # Heartbeat within the timeout: the worker is busy with it
+    assert jobs.claim_next_job() is None
+
+    ProcessingLog.objects.filter(log_id=job.log_id).update(heartbeat_at=timezone.now() - timedelta(minutes=5))
+    reclaimed = jobs.claim_next_job()
+    assert reclaimed.log_id == job.log_id
+    assert reclaimed.claimed_at != claimed.claimed_at
+    # The first worker finds out it lost the job
+    assert not jobs.send_heartbeat(claimed)
+    assert jobs.send_heartbeat(reclaimed)
+
+
+@pytest.mark.django_db
+def test_jobs_without_heartbeat_are_not_reclaimed(settings):
+    settings.MENU_INGESTION_JOB_TIMEOUT = 60
+    ProcessingLog.objects.create(status=ProcessingLog.STATUS_PROCESSING, source_file="menu.pdf")
+    assert jobs.claim_next_job() is None
+
+
+@pytest.mark.django_db
+def test_run_that_lost_its_claim_writes_nothing(client, queue_dir, monkeypatch):
+    upload = SimpleUploadedFile("menu.pdf", b"%PDF-1.4 fake", content_type="application/pdf")
+    job_id = client.post(reverse("process_menu_pdf") + "?async=1", {"pdf_file": upload}).json()["job_id"]
+    job = jobs.claim_next_job()
+
+    def extract_while_reclaimed(path, workers=None):
+        # Another worker takes the job over while this one is still extracting
+        ProcessingLog.objects.filter(log_id=job_id).update(claimed_at=timezone.now() + timedelta(seconds=1))
+        return "Soup 5.00"
+
+    monkeypatch.setattr(views, "extract_text_from_pdf", extract_while_reclaimed)
+    monkeypatch.setattr(views, "structure_menu_text", lambda text, **kwargs: {
+        "restaurant": {"name": "X"}, "menu_sections": [{"section_name": "Soups", "items": [{"name": "Soup"}]}]
+    })
+
+    assert not jobs.run_job(job)
+    log = ProcessingLog.objects.get(log_id=job_id)
+    assert log.status == ProcessingLog.STATUS_PROCESSING and log.menu_id is None
+    assert not Menu.objects.exists()
+    # The file now belongs to the worker holding the job
+    assert os.path.exists(job.source_file)
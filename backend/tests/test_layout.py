@@ -0,0 +1,81 @@
+import fitz
+
+from menu_app import views
+from menu_app.layout import (
+    LayoutLine, extract_layout_lines, extract_layout_text, split_price, structure_layout, to_compact_text
+)
+
+
+def make_menu_pdf():
+    doc = fitz.open()
+    page = doc.new_page()
+    y = 60
+    for text, size, font in [
+        ("Casa Lola", 24, "hebo"),
+        ("Starters", 16, "hebo"),
+        ("Bruschetta ..... 7.50", 11, "helv"),
+        ("Tomato, basil and garlic", 11, "helv"),
+        ("Calamari 9,00 EUR", 11, "helv"),
+        ("Desserts", 16, "hebo"),
+        ("Flan", 11, "helv"),
+        ("4.50", 11, "helv"),
+    ]:
+        page.insert_text((72, y), text, fontsize=size, fontname=font)
+        y += size + 10
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def test_split_price_handles_leaders_and_currency():
+    assert split_price("Bruschetta ..... 7.50") == ("Bruschetta", 7.5)
+    assert split_price("Calamari 9,00 €") == ("Calamari", 9.0)
+    assert split_price("Tomato, basil and garlic") == ("Tomato, basil and garlic", None)
+
+
+def test_structure_layout_detects_headings_items_and_prices():
+    structured = structure_layout(extract_layout_lines(make_menu_pdf()))
+
+    assert structured["restaurant"]["name"] == "Casa Lola"
+    assert [s["section_name"] for s in structured["menu_sections"]] == ["Starters", "Desserts"]
+    starters, desserts = structured["menu_sections"]
+    assert [(i["name"], i["price"]) for i in starters["items"]] == [("Bruschetta", 7.5), ("Calamari", 9.0)]
+    assert starters["items"][0]["description"] == "Tomato, basil and garlic"
+    assert [(i["name"], i["price"]) for i in desserts["items"]] == [("Flan", 4.5)]
+
+
+def test_compact_text_and_extraction_mode(settings):
+    data = make_menu_pdf()
+    compact = extract_layout_text(data)
+    assert compact.startswith("# Casa Lola\n\n## Starters\nBruschetta | Tomato, basil and garlic | 7.50")
+    assert "Calamari | 9.00" in compact and "....." not in compact
+
+    settings.MENU_EXTRACTION_MODE = "layout"
+    assert views.extract_menu_text(data) == compact
+    settings.MENU_EXTRACTION_MODE = "text"
+    assert views.extract_menu_text(data) == views.extract_text_from_pdf(data)
+
+
+def test_unrecognised_lines_are_kept_as_notes():
+    lines = [LayoutLine(0, text, size, bold) for text, size, bold in [
+        ("Casa Lola", 24, True),
+        ("Calle Feria 12, Sevilla", 11, False),
+        ("Menu del dia", 16, True),
+        ("Primero, segundo y postre", 11, False),
+        ("Pan y bebida incluidos", 11, False),
+        ("Tapas", 16, True),
+        ("Bravas 5.00", 11, False),
+        ("Picantes", 11, False),
+        ("Con alioli", 11, False),
+    ]]
+    structured = structure_layout(lines)
+    assert structured["notes"] == ["Calle Feria 12, Sevilla"]
+    set_menu, tapas = structured["menu_sections"]
+    assert set_menu["notes"] == ["Primero, segundo y postre", "Pan y bebida incluidos"]
+    assert tapas["items"][0]["description"] == "Picantes Con alioli"
+
+    assert to_compact_text(structured) == (
+        "# Casa Lola\nCalle Feria 12, Sevilla\n\n"
+        "## Menu del dia\nPrimero, segundo y postre\nPan y bebida incluidos\n\n"
+        "## Tapas\nBravas | Picantes Con alioli | 5.00"
+    )
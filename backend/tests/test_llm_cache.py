@@ -0,0 +1,114 @@
+import time
+import types
+
+import pytest
+
+from menu_app import api_integration, views
+from menu_app.llm_cache import (
+    SQLiteLLMCache, make_cache_key, get_llm_cache_stats, reset_llm_cache
+)
+
+
+@pytest.fixture
+def llm_cache(settings, tmp_path):
+    settings.LLM_CACHE = {
+        'BACKEND': 'menu_app.llm_cache.SQLiteLLMCache',
+        'OPTIONS': {'path': tmp_path / 'llm.sqlite3'},
+    }
+    settings.LLM_CACHE_BYPASS = False
+    reset_llm_cache()
+    yield
+    reset_llm_cache()
+
+
+class FakeAnthropic:
+    calls = 0
+
+    def __init__(self, api_key=None):
+        self.messages = self
+
+    def create(self, **kwargs):
+        FakeAnthropic.calls += 1
+        text = '{"restaurant": {"name": "Casa"}, "menu_sections": []}'
+        return types.SimpleNamespace(content=[types.SimpleNamespace(text=text)])
+
+
+@pytest.fixture
+def fake_claude(monkeypatch):
+    FakeAnthropic.calls = 0
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+    monkeypatch.setattr(views, "get_llm_gateway", FakeAnthropic)
+    return FakeAnthropic
+
+
+def test_key_depends_on_model_prompt_version_and_text():
+    key = make_cache_key("m", "v1", "menu")
+    assert key == make_cache_key("m", "v1", "menu")
+    assert key != make_cache_key("m", "v2", "menu")
+    assert key != make_cache_key("other", "v1", "menu")
+    assert key != make_cache_key("m", "v1", "menu!")
+
+
+def test_sqlite_cache_expires_entries_after_ttl(tmp_path):
+    cache = SQLiteLLMCache(tmp_path / "c.sqlite3", ttl=1)
+    cache.set("k", "v")
+    assert cache.get("k") == "v"
+    cache.ttl = 0
+    time.sleep(0.01)
+    assert cache.get("k") is None
+
+
+def test_sqlite_cache_evicts_least_recently_used(tmp_path):
+    cache = SQLiteLLMCache(tmp_path / "c.sqlite3", max_entries=2)
+    cache.set("a", "1")
+    time.sleep(0.01)
+    cache.set("b", "2")
+    time.sleep(0.01)
+    cache.get("a")
+    time.sleep(0.01)
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
+
+
+def test_sqlite_cache_evicts_by_size(tmp_path):
+    cache = SQLiteLLMCache(tmp_path / "c.sqlite3", max_bytes=10)
+    cache.set("a", "x" * 6)
+    time.sleep(0.01)
+    cache.set("b", "y" * 6)
+    assert cache.get("a") is None
+    assert cache.get("b") == "y" * 6
+
+
+def test_repeated_text_is_served_from_cache(llm_cache, fake_claude):
+    first = views.process_with_anthropic_api("Soup 5.00")
+    second = views.process_with_anthropic_api("Soup 5.00")
+    assert first == second
+    assert fake_claude.calls == 1
+    stats = get_llm_cache_stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+
+def test_cache_bypass(llm_cache, fake_claude, settings):
+    views.process_with_anthropic_api("Soup 5.00")
+    views.process_with_anthropic_api("Soup 5.00", use_cache=False)
+    settings.LLM_CACHE_BYPASS = True
+    views.process_with_anthropic_api("Soup 5.00")
+    assert fake_claude.calls == 3
+
+
+def test_api_integration_does_not_cache_answers_without_json(llm_cache, monkeypatch):
+    answers = iter(["Sorry, I cannot help with that.", '{"restaurant_name": "Casa", "menu_sections": []}'])
+    calls = []
+
+    def fake_request(text, max_retries):
+        calls.append(text)
+        return next(answers)
+
+    monkeypatch.setattr(api_integration, "_request_claude_response", fake_request)
+
+    with pytest.raises(api_integration.ClaudeError):
+        api_integration.get_claude_response("Sopa 4.00")
+    assert api_integration.get_claude_response("Sopa 4.00")["restaurant_name"] == "Casa"
+    assert api_integration.get_claude_response("Sopa 4.00")["restaurant_name"] == "Casa"
+    assert len(calls) == 2
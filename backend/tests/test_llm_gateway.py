@@ -0,0 +1,183 @@
+import asyncio
+import json
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import anthropic
+import pytest
+
+from menu_app import views
+from menu_app.metrics import collect
+from menu_app.llm_gateway import AdaptiveConcurrencyLimit, LLMGateway, TokenBucket, reset_llm_gateway
+
+
+def message_body(text):
+    return {
+        "id": "msg_1", "type": "message", "role": "assistant", "model": "stub",
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn", "stop_sequence": None,
+        "usage": {"input_tokens": 12, "output_tokens": 7},
+    }
+
+
+def sse_body(fragments):
+    events = [("message_start", {"type": "message_start", "message": {**message_body(""), "content": [],
+                                                                     "stop_reason": None}}),
+              ("content_block_start", {"type": "content_block_start", "index": 0,
+                                       "content_block": {"type": "text", "text": ""}})]
+    events += [("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                        "delta": {"type": "text_delta", "text": fragment}})
+               for fragment in fragments]
+    events += [("content_block_stop", {"type": "content_block_stop", "index": 0}),
+               ("message_delta", {"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                  "usage": {"output_tokens": len(fragments)}}),
+               ("message_stop", {"type": "message_stop"})]
+    return "".join(f"event: {name}\ndata: {json.dumps(data)}\n\n" for name, data in events).encode()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["content-length"])))
+        self.server.requests.append(request)
+        status, headers, body = self.server.script.pop(0) if len(self.server.script) > 1 else self.server.script[0]
+        if status == 200 and request.get("stream"):
+            payload, content_type = sse_body(body), "text/event-stream"
+        elif status == 200:
+            payload, content_type = json.dumps(message_body(body)).encode(), "application/json"
+        else:
+            payload = json.dumps({"type": "error", "error": {"type": "rate_limit_error", "message": body}}).encode()
+            content_type = "application/json"
+        self.send_response(status)
+        self.send_header("content-type", content_type)
+        self.send_header("content-length", str(len(payload)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.requests = []
+    server.script = [(200, {}, "ok")]
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def gateway(stub_server):
+    gateway = LLMGateway(api_key="test", base_url=f"http://127.0.0.1:{stub_server.server_port}",
+                         requests_per_minute=600, tokens_per_minute=100000, max_concurrency=4,
+                         backoff_base=0.01, backoff_max=0.05, timeout=5)
+    yield gateway
+    gateway.close()
+
+
+def create(gateway, **kwargs):
+    return gateway.create(model="stub", max_tokens=10, messages=[{"role": "user", "content": "hi"}], **kwargs)
+
+
+def test_throttled_calls_are_retried_and_lower_concurrency(gateway, stub_server):
+    stub_server.script = [(429, {"retry-after": "0"}, "slow down"), (529, {}, "overloaded"), (200, {}, "menu")]
+
+    assert create(gateway).content[0].text == "menu"
+    stats = gateway.stats()
+    assert stats["requests"] == 3 and stats["retries"] == 2 and stats["throttled"] == 2
+    # 4 -> 2 -> 1 on the throttled attempts, then additive increase after the success
+    assert stats["concurrency_limit"] == 2
+    assert stats["input_tokens"] == 12 and stats["output_tokens"] == 7
+
+
+def test_client_errors_are_not_retried(gateway, stub_server):
+    stub_server.script = [(400, {}, "bad request")]
+    with pytest.raises(anthropic.BadRequestError):
+        create(gateway)
+    assert gateway.stats()["requests"] == 1 and gateway.stats()["errors"] == 1
+
+
+def test_retries_stop_after_max_retries(gateway, stub_server):
+    gateway.request_bucket = TokenBucket(per_minute=600, clock=lambda: 0.0)  # no refill
+    stub_server.script = [(503, {}, "unavailable")]
+    with pytest.raises(anthropic.InternalServerError):
+        create(gateway, max_retries=2)
+    assert len(stub_server.requests) == 3
+    # Every attempt went through the rate limiter, not just the first
+    assert gateway.request_bucket.tokens == 597
+
+
+def test_stream_text_yields_fragments(gateway, stub_server):
+    stub_server.script = [(200, {}, ['{"restaurant"', ': {}}'])]
+    fragments = list(gateway.stream_text(model="stub", max_tokens=10, messages=[{"role": "user", "content": "x"}]))
+    assert fragments == ['{"restaurant"', ': {}}']
+    assert gateway.stats()["in_flight"] == 0
+
+
+def test_views_share_the_configured_gateway(settings, monkeypatch, stub_server):
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test")
+    settings.LLM_GATEWAY = {"BASE_URL": f"http://127.0.0.1:{stub_server.server_port}", "MAX_RETRIES": 0}
+    stub_server.script = [(200, {}, '```json\n{"menu_sections": []}\n```')]
+    reset_llm_gateway()
+    try:
+        assert views._call_anthropic_api("Soup 5") == '{"menu_sections": []}'
+        assert views._call_anthropic_api("Soup 6") == '{"menu_sections": []}'
+        assert views.get_llm_gateway() is views.get_llm_gateway()
+    finally:
+        reset_llm_gateway()
+    assert [r["model"] for r in stub_server.requests] == [views.ANTHROPIC_MODEL] * 2
+
+
+def test_token_bucket_waits_for_refill():
+    async def run():
+        bucket = TokenBucket(per_minute=600)  # 10 per second
+        await bucket.acquire(600)
+        started = time.monotonic()
+        await bucket.acquire(2)
+        return time.monotonic() - started
+
+    assert 0.15 <= asyncio.run(run()) < 1.0
+
+
+def test_adaptive_limit_is_aimd():
+    async def run():
+        limit = AdaptiveConcurrencyLimit(4, maximum=8)
+        await limit.acquire()
+        await limit.release(throttled=True)
+        halved = limit.limit
+        for _ in range(8):
+            await limit.acquire()
+            await limit.release()
+        return halved, limit.limit
+
+    halved, recovered = asyncio.run(run())
+    assert halved == 2
+    assert 4 < recovered <= 8
+
+
+def test_calls_charge_the_ingestion_being_collected(gateway, stub_server):
+    ingestion = types.SimpleNamespace(timings={}, tokens={"input": 0, "output": 0})
+    with collect(ingestion):
+        create(gateway)
+        stub_server.script = [(200, {}, ["a", "b"])]
+        list(gateway.stream_text(model="stub", max_tokens=10, messages=[{"role": "user", "content": "x"}]))
+
+    assert "llm" in ingestion.timings
+    assert ingestion.tokens == {"input": 24, "output": 9}
+
+
+def test_streamed_calls_are_timed_as_llm(gateway, stub_server):
+    stub_server.script = [(200, {}, ["a", "b"])]
+    ingestion = types.SimpleNamespace(timings={}, tokens={"input": 0, "output": 0})
+    with collect(ingestion):
+        list(gateway.stream_text(model="stub", max_tokens=10, messages=[{"role": "user", "content": "x"}]))
+
+    assert ingestion.timings["llm"] > 0
+    assert ingestion.tokens == {"input": 12, "output": 2}
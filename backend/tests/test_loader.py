@@ -0,0 +1,153 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from decimal import Decimal
+from django.db import IntegrityError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from menu_app import loader
+from menu_app.models import Menu, MenuItem, ProcessingLog, Restaurant
+from restaurant_menu_project.pooled_mysql.pool import ConnectionPool, PoolTimeout
+from tests.factories import make_restaurant
+
+
+@pytest.fixture(autouse=True)
+def fresh_restriction_cache():
+    # Restriction IDs cached by an earlier test point at rows rolled back with that test
+    loader.clear_dietary_restriction_cache()
+
+
+def make_menu_data(sections, items_per_section, name="Casa"):
+    return {
+        "restaurant": {"name": name, "location": "Sevilla"},
+        "menu_sections": [
+            {"section_name": f"S{s}", "items": [
+                {"name": f"Item {s}-{i}", "price": 5, "dietary_restriction_id": 2} for i in range(items_per_section)
+            ]}
+            for s in range(sections)
+        ],
+    }
+
+
+def count_queries(data):
+    with CaptureQueriesContext(connection) as ctx:
+        assert loader.insert_into_database(data)
+    return len(ctx.captured_queries)
+
+
+@pytest.mark.django_db
+def test_queries_do_not_grow_with_menu_size(settings):
+    settings.MENU_LOADER_BATCH_SIZE = 1000
+    loader.get_dietary_restriction_ids()
+    small = count_queries(make_menu_data(2, 3, name="Small"))
+    large = count_queries(make_menu_data(10, 15, name="Large"))
+    assert small == large
+    assert MenuItem.objects.filter(section__menu__restaurant__name="Large").count() == 150
+
+
+@pytest.mark.django_db
+def test_loads_sections_items_and_log():
+    menu_id = loader.insert_into_database(make_menu_data(2, 2), pdf_sha256="a" * 64)
+    menu = Menu.objects.get(menu_id=menu_id)
+    assert menu.version == 1
+    assert menu.restaurant.location == "Sevilla"
+    assert list(menu.sections.order_by("section_order").values_list("section_name", flat=True)) == ["S0", "S1"]
+    item = MenuItem.objects.filter(section__menu=menu).first()
+    assert item.price == Decimal("5.00")
+    assert item.dietary_restriction.label == "Vegan"
+    log = ProcessingLog.objects.get(menu=menu)
+    assert log.status == ProcessingLog.STATUS_SUCCESSFUL and log.pdf_sha256 == "a" * 64
+
+
+@pytest.mark.django_db
+def test_existing_restaurant_gets_next_version_and_job_log_is_completed():
+    make_restaurant(name="Casa")
+    loader.insert_into_database(make_menu_data(1, 1))
+    job = ProcessingLog.objects.create(status=ProcessingLog.STATUS_PROCESSING)
+    menu_id = loader.insert_into_database(make_menu_data(1, 1), log_id=job.log_id)
+    assert Menu.objects.get(menu_id=menu_id).version == 2
+    assert Restaurant.objects.filter(name="Casa").count() == 1
+    job.refresh_from_db()
+    assert job.menu_id == menu_id and job.status == ProcessingLog.STATUS_SUCCESSFUL
+
+
+@pytest.mark.django_db
+def test_concurrently_created_restaurant_is_reused(monkeypatch):
+    loader.insert_into_database(make_menu_data(1, 1))
+    lock_restaurant = loader._lock_restaurant
+    calls = []
+
+    def not_committed_yet(name):
+        # The first lookup runs before the other load's restaurant was visible
+        calls.append(name)
+        return None if len(calls) == 1 else lock_restaurant(name)
+
+    monkeypatch.setattr(loader, "_lock_restaurant", not_committed_yet)
+    menu_id = loader.insert_into_database(make_menu_data(1, 1))
+
+    assert len(calls) == 2
+    assert Restaurant.objects.filter(name="Casa").count() == 1
+    assert Menu.objects.get(menu_id=menu_id).version == 2
+
+
+@pytest.mark.django_db
+def test_menu_versions_are_unique_per_restaurant():
+    restaurant = make_restaurant()
+    Menu.objects.create(restaurant=restaurant, version=1, date="2024-01-01")
+    with pytest.raises(IntegrityError), transaction.atomic():
+        Menu.objects.create(restaurant=restaurant, version=1, date="2024-02-01")
+
+
+def test_clean_price_defaults_invalid_values():
+    assert loader.clean_price("12.5") == 12.5
+    assert loader.clean_price(0) == 0.01
+    assert loader.clean_price("free") == 0.01
+    assert loader.clean_price(None) == 0.01
+
+
+class FakeConnection:
+    def __init__(self):
+        self.alive = True
+        self.closed = False
+
+    def ping(self):
+        if not self.alive:
+            raise OSError("gone away")
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def test_connection_pool_reuses_and_replaces_dead_connections():
+    created = []
+    pool = ConnectionPool(lambda: created.append(FakeConnection()) or created[-1], max_size=1)
+
+    first = pool.acquire()
+    pool.release(first)
+    assert pool.acquire() is first
+
+    pool.release(first)
+    first.alive = False
+    replacement = pool.acquire()
+    assert replacement is not first and first.closed
+    assert len(created) == 2
+
+
+def test_connection_pool_waits_for_a_free_connection():
+    pool = ConnectionPool(FakeConnection, max_size=2, timeout=5)
+    held = [pool.acquire(), pool.acquire()]
+    waiter = ThreadPoolExecutor(max_workers=1).submit(pool.acquire)
+
+    # The third checkout waits instead of opening a connection beyond max_size
+    time.sleep(0.1)
+    assert not waiter.done()
+    pool.release(held[0])
+    assert waiter.result(timeout=5) is held[0]
+
+    pool.timeout = 0.05
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
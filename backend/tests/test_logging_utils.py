@@ -0,0 +1,55 @@
+import logging
+import time
+
+from menu_app.logging_utils import Payload, QueueListenerHandler
+
+
+class CountingStr:
+    formatted = 0
+
+    def __repr__(self):
+        CountingStr.formatted += 1
+        return "counted"
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def test_payload_is_truncated_only_when_formatted():
+    assert str(Payload("abcdef", limit=3)) == "'abc'... [3 more chars]"
+    assert str(Payload("abc", limit=3)) == "'abc'"
+
+    logger = logging.getLogger("menu_app.tests.payload")
+    logger.setLevel(logging.INFO)
+    CountingStr.formatted = 0
+    logger.debug("payload %s", Payload(CountingStr()))
+    assert CountingStr.formatted == 0
+
+
+def test_queue_handler_delivers_in_the_background_and_drops_when_full():
+    target = ListHandler()
+    handler = QueueListenerHandler([target], queue_size=2)
+    logger = logging.getLogger("menu_app.tests.queue")
+    logger.addHandler(handler)
+    logger.propagate = False
+    try:
+        logger.warning("menu %d loaded", 7)
+        deadline = time.monotonic() + 2
+        while not target.messages and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert target.messages == ["menu 7 loaded"]
+
+        # Without a listener nothing drains the queue; extra records are dropped, never blocking
+        handler.listener.stop()
+        for i in range(5):
+            logger.warning("overflow %d", i)
+        assert handler.dropped == 3
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
@@ -0,0 +1,76 @@
+import types
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+
+from menu_app import loader, metrics, views
+from menu_app.models import ProcessingLog, ProcessingLogStage
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    metrics.reset_metrics()
+    loader.clear_dietary_restriction_cache()
+    yield
+    metrics.reset_metrics()
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = metrics.Histogram("t_seconds", "test", labelnames=("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, stage="llm")
+
+    assert list(histogram.samples()) == [
+        't_seconds_bucket{stage="llm",le="0.1"} 1',
+        't_seconds_bucket{stage="llm",le="1.0"} 2',
+        't_seconds_bucket{stage="llm",le="+Inf"} 3',
+        't_seconds_sum{stage="llm"} 5.55',
+        't_seconds_count{stage="llm"} 3',
+    ]
+
+
+def test_spans_are_only_collected_inside_collect():
+    ingestion = types.SimpleNamespace(timings={}, tokens={"input": 0, "output": 0})
+    with metrics.span("llm"):
+        pass
+    with metrics.collect(ingestion):
+        with metrics.span("llm"):
+            pass
+        with metrics.span("llm"):
+            pass
+        metrics.record_tokens(types.SimpleNamespace(input_tokens=10, output_tokens=4))
+
+    assert list(ingestion.timings) == ["llm"]
+    assert ingestion.tokens == {"input": 10, "output": 4}
+    assert metrics.LLM_TOKENS.value(direction="output") == 4
+
+
+class FakeGateway:
+    def create(self, **kwargs):
+        text = ('{"restaurant": {"name": "Casa"}, "menu_sections": [{"section_name": "Tapas", '
+                '"items": [{"name": "Olivas", "price": 3, "dietary_restriction_id": 2}]}]}')
+        return types.SimpleNamespace(content=[types.SimpleNamespace(text=text)])
+
+
+@pytest.mark.django_db
+def test_upload_stores_stage_timings_and_exposes_histograms(client, settings, monkeypatch):
+    settings.LLM_CACHE_BYPASS = True
+    settings.MENU_RULE_PARSER_ENABLED = False
+    monkeypatch.setattr(views, "extract_text_from_pdf", lambda source, workers=None: "Olivas 3")
+    monkeypatch.setattr(views, "get_llm_gateway", FakeGateway)
+
+    upload = SimpleUploadedFile("menu.pdf", b"%PDF-1.4 fake", content_type="application/pdf")
+    resp = client.post(reverse("process_menu_pdf"), {"pdf_file": upload})
+    assert resp.status_code == 200
+
+    log = ProcessingLog.objects.get(menu_id=resp.json()["menu_id"])
+    stages = dict(ProcessingLogStage.objects.filter(log=log).values_list("stage", "seconds"))
+    assert set(stages) == {"spool", "extract", "dedup", "structure", "parse", "normalize", "validate", "load"}
+    assert stages["parse"] <= stages["structure"]
+    assert log.duration_seconds == pytest.approx(sum(v for k, v in stages.items() if k != "parse"))
+
+    body = client.get(reverse("metrics")).content.decode()
+    assert "# TYPE menu_ingestion_stage_seconds histogram" in body
+    assert 'menu_ingestion_stage_seconds_count{stage="load"} 1' in body
+    assert 'menu_ingestion_seconds_count{outcome="success"} 1' in body
@@ -56,7 +56,7 @@ def test_sections_return_in_order():
     make_section(menu=m, section_name="Mains", section_order=2)
     make_section(menu=m, section_name="Starters", section_order=1)
     names = list(
-        m.menusection_set.order_by("section_order").values_list("section_name", flat=True)
+        m.sections.order_by("section_order").values_list("section_name", flat=True)
     )
     assert names == ["Starters", "Mains"]
 
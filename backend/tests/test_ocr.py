@@ -0,0 +1,73 @@
+import multiprocessing
+import time
+import types
+
+import fitz
+import pytest
+
+from menu_app import ocr
+from menu_app.PDFreader import extract_text_from_image
+from menu_app.llm_cache import reset_llm_cache
+
+
+def make_scanned_pdf(pages):
+    doc = fitz.open()
+    for shade in range(pages):
+        page = doc.new_page(width=100, height=100)
+        page.draw_rect(fitz.Rect(10, 10, 20 + shade * 10, 40), color=(0, 0, 0), fill=(0, 0, 0))
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+@pytest.fixture
+def fake_tesseract(settings, tmp_path, monkeypatch):
+    settings.LLM_CACHE = {
+        'BACKEND': 'menu_app.llm_cache.SQLiteLLMCache',
+        'OPTIONS': {'path': tmp_path / 'cache.sqlite3'},
+    }
+    settings.LLM_CACHE_BYPASS = False
+    settings.MENU_OCR_WORKERS = 1
+    settings.MENU_OCR_DPI = 50
+    reset_llm_cache()
+
+    calls = []
+
+    def image_to_string(image, lang, config, timeout):
+        calls.append(image.size)
+        if len(calls) == 2:
+            raise RuntimeError("Tesseract process timeout")
+        return f"page read at {image.size[0]}px"
+
+    monkeypatch.setattr(ocr, "pytesseract", types.SimpleNamespace(image_to_string=image_to_string))
+    yield calls
+    reset_llm_cache()
+
+
+def test_missing_pytesseract_returns_none(monkeypatch):
+    monkeypatch.setattr(ocr, "pytesseract", None)
+    assert extract_text_from_image(make_scanned_pdf(1)) is None
+
+
+def test_pages_are_ocred_and_cached_by_image(fake_tesseract):
+    data = make_scanned_pdf(3)
+
+    # The second page times out; the others are still returned
+    assert extract_text_from_image(data) == "page read at 70px\n\npage read at 70px"
+    assert len(fake_tesseract) == 3
+
+    # Pages read successfully come from the cache; only the failed page is retried
+    extract_text_from_image(data)
+    assert len(fake_tesseract) == 4
+
+
+def test_wedged_worker_is_terminated(fake_tesseract, settings, monkeypatch):
+    settings.MENU_OCR_WORKERS = 2
+    settings.MENU_OCR_PAGE_TIMEOUT = -9.5  # waits 0.5s per page for the worker
+    monkeypatch.setattr(ocr, "pytesseract", types.SimpleNamespace(
+        image_to_string=lambda image, lang, config, timeout: time.sleep(60)))
+
+    started = time.monotonic()
+    assert extract_text_from_image(make_scanned_pdf(2)) is None
+    assert time.monotonic() - started < 10
+    assert not multiprocessing.active_children()
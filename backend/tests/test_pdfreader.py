@@ -0,0 +1,50 @@
+import fitz
+
+from menu_app.PDFreader import _page_ranges, extract_text_from_pdf, iter_pdf_pages
+from menu_app.api_integration import parse_pdf
+
+
+def make_pdf_bytes(*page_texts):
+    doc = fitz.open()
+    for text in page_texts:
+        page = doc.new_page()
+        page.insert_text((72, 72), text)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def test_extract_text_from_bytes_and_path_match(tmp_path):
+    data = make_pdf_bytes("Starters", "Desserts")
+    path = tmp_path / "menu.pdf"
+    path.write_bytes(data)
+
+    from_bytes = extract_text_from_pdf(data)
+    assert "Starters" in from_bytes and "Desserts" in from_bytes
+    assert from_bytes == extract_text_from_pdf(str(path))
+
+
+def test_extract_text_from_invalid_bytes_returns_none():
+    assert extract_text_from_pdf(b"not a pdf") is None
+
+
+def test_page_ranges_cover_every_page_once():
+    assert _page_ranges(10, 3) == [(0, 4), (4, 7), (7, 10)]
+    assert _page_ranges(2, 8) == [(0, 1), (1, 2)]
+
+
+def test_parallel_extraction_matches_serial_in_page_order(tmp_path):
+    data = make_pdf_bytes(*[f"Page {n}" for n in range(6)])
+    path = tmp_path / "menu.pdf"
+    path.write_bytes(data)
+
+    serial = list(iter_pdf_pages(data, workers=1))
+    assert [page_num for page_num, _ in serial] == list(range(6))
+    assert list(iter_pdf_pages(data, workers=3)) == serial
+    assert extract_text_from_pdf(str(path), workers=3) == extract_text_from_pdf(str(path), workers=1)
+
+
+def test_parse_pdf_uses_shared_extractor(tmp_path):
+    path = tmp_path / "menu.pdf"
+    path.write_bytes(make_pdf_bytes("Starters", "Desserts"))
+    assert parse_pdf(str(path)) == extract_text_from_pdf(str(path))
@@ -0,0 +1,94 @@
+import fitz
+import pytest
+
+from menu_app import api_integration, loader
+from menu_app.models import Menu
+from menu_app.pipeline import (
+    IngestionError, MenuIngestion, Pipeline, Stage, build_pipeline, to_common_schema, validate_menu
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_restriction_cache():
+    loader.clear_dietary_restriction_cache()
+
+
+def test_legacy_schemas_are_brought_to_the_loader_schema():
+    data = to_common_schema({
+        "restaurant_name": "Casa",
+        "restaurant_location": "Madrid",
+        "menu_sections": [{"section_name": "Tapas", "items": [
+            {"name": "Pimientos", "price": 6, "dietary_restriction": "Vegan"},
+            {"name": "Jamon", "price": 9, "dietary_restriction": "Optional Dietary Info"},
+        ]}],
+    })
+    assert data["restaurant"] == {"name": "Casa", "location": "Madrid"}
+    assert [i["dietary_restriction_id"] for i in data["menu_sections"][0]["items"]] == [2, 1]
+
+
+def test_validate_drops_malformed_entries():
+    data = validate_menu({"restaurant": {}, "menu_sections": [
+        "junk",
+        {"section_name": "Tapas", "items": [{"name": ""}, {"name": "Olivas", "price": "3.5",
+                                                          "dietary_restriction_id": 42}]},
+    ]})
+    assert data["menu_sections"] == [{"section_name": "Tapas", "items": [
+        {"name": "Olivas", "price": 3.5, "dietary_restriction_id": 1}
+    ]}]
+    with pytest.raises(ValueError):
+        validate_menu(["not", "a", "menu"])
+
+
+class Recorder(Stage):
+    def __init__(self, name, calls, finish=False):
+        self.name = name
+        self.calls = calls
+        self.finish = finish
+
+    def run(self, ingestion):
+        self.calls.append(self.name)
+        if self.finish:
+            ingestion.menu_id = 1
+
+
+def test_pipeline_times_stages_and_honours_only_skip_and_early_finish():
+    calls = []
+    pipeline = Pipeline([Recorder("a", calls), Recorder("b", calls, finish=True), Recorder("c", calls)])
+
+    ingestion = pipeline.run(MenuIngestion(), only=("a",))
+    pipeline.run(ingestion, skip=("a",))
+    assert calls == ["a", "b"]
+    assert set(ingestion.timings) == {"a", "b"}
+
+
+@pytest.mark.django_db
+def test_standard_pipeline_loads_and_reports_failing_stage():
+    ingestion = MenuIngestion(source=b"%PDF")
+    build_pipeline(
+        structure=lambda text: {"restaurant_name": "Casa", "menu_sections": [
+            {"section_name": "Tapas", "items": [{"name": "Olivas", "price": 3, "dietary_restriction": "vegan"}]}
+        ]},
+        extract=lambda source: "Olivas 3",
+    ).run(ingestion)
+
+    menu = Menu.objects.get(pk=ingestion.menu_id)
+    assert menu.restaurant.name == "Casa"
+    assert list(ingestion.timings) == ["extract", "dedup", "structure", "normalize", "validate", "load"]
+
+    with pytest.raises(IngestionError) as error:
+        build_pipeline(structure=dict, extract=lambda source: None, fallback=None).run(MenuIngestion())
+    assert error.value.stage == "extract"
+
+
+def test_api_integration_returns_the_shared_schema(tmp_path, monkeypatch):
+    path = tmp_path / "menu.pdf"
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "Cafe Olé")
+    doc.save(str(path))
+    doc.close()
+
+    monkeypatch.setattr(api_integration, "get_claude_response", lambda text: {
+        "restaurant_name": text, "restaurant_location": "Sevilla", "menu_sections": []
+    })
+    data = api_integration.process_menu_pdf(str(path))
+    assert data == {"restaurant": {"name": "Cafe Ole", "location": "Sevilla"}, "menu_sections": []}
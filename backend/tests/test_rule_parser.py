@@ -0,0 +1,70 @@
+import json
+from pathlib import Path
+
+import pytest
+from django.core.management import call_command
+
+from menu_app import views
+from menu_app.management.commands.benchmark_rule_parser import score_parse
+from menu_app.rule_parser import parse_menu_text
+
+CORPUS = Path(__file__).parent / "fixtures" / "menus"
+
+
+@pytest.mark.parametrize("name", ["dotted_leaders", "price_lines"])
+def test_simple_layouts_parse_exactly_with_high_confidence(name):
+    parsed, confidence = parse_menu_text((CORPUS / f"{name}.txt").read_text())
+    expected = json.loads((CORPUS / f"{name}.json").read_text())
+
+    assert confidence >= 0.9
+    assert score_parse(parsed, expected)["f1"] == 1.0
+    assert parsed["restaurant"] == expected["restaurant"]
+
+
+def test_descriptions_and_dietary_markers():
+    parsed, _ = parse_menu_text((CORPUS / "dotted_leaders.txt").read_text())
+    starters = parsed["menu_sections"][0]["items"]
+    assert starters[0]["description"] == "Salsa brava casera"
+    assert starters[2]["dietary_restriction_id"] == 2
+    assert parsed["menu_sections"][1]["items"][1]["dietary_restriction_id"] == 3
+
+
+def test_prose_menu_has_low_confidence():
+    _, confidence = parse_menu_text((CORPUS / "prose_menu.txt").read_text())
+    assert confidence < 0.9
+    assert parse_menu_text("")[1] == 0.0
+
+
+def test_compact_layout_form_is_parsed():
+    parsed, confidence = parse_menu_text(
+        "# Casa Lola\n\n## Starters\nBruschetta | Tomato and basil | 7.50\nCalamari | 9.00\nOlives | 3.00"
+    )
+    assert confidence == 1.0
+    assert parsed["restaurant"]["name"] == "Casa Lola"
+    assert [i["name"] for i in parsed["menu_sections"][0]["items"]] == ["Bruschetta", "Calamari", "Olives"]
+
+
+def test_confident_parse_skips_llm(settings, monkeypatch):
+    settings.MENU_RULE_PARSER_ENABLED = True
+    monkeypatch.setattr(views, "_call_anthropic_api", lambda text: pytest.fail("LLM called"))
+    structured = views.structure_menu_text((CORPUS / "price_lines.txt").read_text())
+    assert len(structured["menu_sections"]) == 2
+
+    settings.MENU_RULE_PARSER_ENABLED = False
+    monkeypatch.setattr(views, "structure_in_chunks", lambda text, structure_chunk: {"llm": True})
+    assert views.structure_menu_text((CORPUS / "price_lines.txt").read_text()) == {"llm": True}
+
+
+def test_layout_output_always_goes_to_llm(settings):
+    settings.MENU_RULE_PARSER_ENABLED = True
+    compact = "# Casa Lola\n\n## Starters\nBruschetta | 7.50\nCalamari | 9.00\nOlives | 3.00"
+    assert parse_menu_text(compact)[1] == 1.0
+    assert views.parse_with_rules(compact) is None
+
+
+def test_benchmark_command_reports_accuracy_and_speed(capsys):
+    call_command("benchmark_rule_parser", str(CORPUS), "--repeat", "2")
+    out = capsys.readouterr().out
+    assert "prose_menu.txt: confidence 0.30 (LLM)" in out
+    assert "3 menu(s): 2 parsed without the LLM" in out
+    assert "f1 on the fast path 1.00" in out
@@ -0,0 +1,107 @@
+import json
+
+import pytest
+
+from menu_app import loader, streaming
+from menu_app.models import Menu, MenuItem, ProcessingLog
+from menu_app.streaming import MenuStreamParser
+
+RESPONSE = json.dumps({
+    "restaurant": {"name": "Café Sol", "location": "Málaga"},
+    "menu_sections": [
+        {"section_name": "Tapas", "items": [
+            {"name": "Jamón", "description": "Cured \"ibérico\" ham", "price": 12.5, "dietary_restriction_id": 1},
+            {"name": "Patatas {bravas}", "description": None, "price": 5, "dietary_restriction_id": 2},
+        ]},
+        {"section_name": "Postres", "items": [
+            {"name": "Flan", "description": "Egg custard", "price": 4, "dietary_restriction_id": 3},
+        ]},
+    ],
+})
+
+
+def feed_in_pieces(text, size):
+    parser = MenuStreamParser()
+    events = []
+    for start in range(0, len(text), size):
+        events.extend(parser.feed(text[start:start + size]))
+    parser.close()
+    return events
+
+
+@pytest.mark.parametrize("size", [1, 7, len(RESPONSE)])
+def test_parser_emits_events_in_order_for_any_fragmentation(size):
+    events = feed_in_pieces("```json\n" + RESPONSE + "\n```", size)
+    assert [kind for kind, _ in events] == ["restaurant", "section", "item", "item", "section", "item"]
+    assert events[0][1]["name"] == "Café Sol"
+    assert events[1][1]["section_name"] == "Tapas"
+    assert events[3][1]["name"] == "Patatas {bravas}"
+    assert events[2][1]["description"] == 'Cured "ibérico" ham'
+
+
+def test_parser_discards_consumed_input():
+    parser = MenuStreamParser()
+    for c in RESPONSE:
+        parser.feed(c)
+    assert len(parser.text) < 50
+
+
+def test_parser_rejects_truncated_response():
+    parser = MenuStreamParser()
+    parser.feed(RESPONSE[:-10])
+    with pytest.raises(json.JSONDecodeError):
+        parser.close()
+
+
+@pytest.fixture
+def fake_stream(monkeypatch, settings):
+    settings.LLM_CACHE_BYPASS = True
+    loader.clear_dietary_restriction_cache()
+
+    def use(response):
+        monkeypatch.setattr(streaming, "stream_claude_response",
+                            lambda text: (response[i:i + 16] for i in range(0, len(response), 16)))
+    return use
+
+
+@pytest.mark.django_db
+def test_stream_menu_into_database_loads_normalized_items(fake_stream, settings):
+    settings.MENU_LOADER_BATCH_SIZE = 2
+    fake_stream(RESPONSE)
+    menu_id = streaming.stream_menu_into_database("menu text", pdf_sha256="b" * 64)
+
+    menu = Menu.objects.get(menu_id=menu_id)
+    assert menu.restaurant.name == "Cafe Sol"
+    items = MenuItem.objects.filter(section__menu=menu).order_by("item_id")
+    assert [(i.section.section_name, i.name) for i in items] == [
+        ("Tapas", "Jamon"), ("Tapas", "Patatas {bravas}"), ("Postres", "Flan")
+    ]
+    assert items[2].dietary_restriction.label == "Vegetarian"
+    assert ProcessingLog.objects.get(menu=menu).pdf_sha256 == "b" * 64
+
+
+@pytest.mark.django_db
+def test_truncated_stream_commits_nothing(fake_stream):
+    fake_stream(RESPONSE[:-40])
+    with pytest.raises(json.JSONDecodeError):
+        streaming.stream_menu_into_database("menu text")
+    assert not Menu.objects.exists()
+    assert not MenuItem.objects.exists()
+
+
+@pytest.mark.django_db
+def test_streamed_items_are_validated_like_the_batch_path(fake_stream):
+    fake_stream(json.dumps({
+        "restaurant": {"name": "Casa"},
+        "menu_sections": [{"section_name": "Tapas", "items": [
+            {"name": "Olivas", "price": "n/a", "dietary_restriction": "Vegan"},
+            {"name": "  ", "price": 3, "dietary_restriction_id": 1},
+            {"name": "Pan", "price": "2.5", "dietary_restriction_id": 99},
+        ]}],
+    }))
+    menu_id = streaming.stream_menu_into_database("menu text")
+
+    items = MenuItem.objects.filter(section__menu_id=menu_id).order_by("item_id")
+    assert [(i.name, float(i.price), i.dietary_restriction_id) for i in items] == [
+        ("Olivas", 0.01, 2), ("Pan", 2.5, 1)
+    ]
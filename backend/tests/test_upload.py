@@ -0,0 +1,44 @@
+import os
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+
+from menu_app import views
+
+
+@pytest.mark.django_db
+def test_small_upload_is_processed_in_memory(client, settings, tmp_path, monkeypatch):
+    settings.MEDIA_ROOT = tmp_path
+    seen = []
+
+    def fake_extract(source, workers=None):
+        seen.append(source)
+        return None
+
+    monkeypatch.setattr(views, "extract_text_from_pdf", fake_extract)
+    monkeypatch.setattr(views, "extract_text_from_image", lambda source: None)
+
+    upload = SimpleUploadedFile("menu.pdf", b"%PDF-1.4 fake", content_type="application/pdf")
+    resp = client.post(reverse("process_menu_pdf"), {"pdf_file": upload})
+
+    assert resp.status_code == 400
+    assert seen == [b"%PDF-1.4 fake"]
+    assert not list(tmp_path.iterdir())
+
+
+def test_large_upload_spools_to_unique_file_and_cleans_up(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    settings.MENU_PDF_IN_MEMORY_MAX_BYTES = 4
+
+    first = SimpleUploadedFile("a.pdf", b"%PDF-1.4 first")
+    second = SimpleUploadedFile("b.pdf", b"%PDF-1.4 second")
+
+    with views.pdf_upload_source(first) as first_path, views.pdf_upload_source(second) as second_path:
+        assert first_path != second_path
+        with open(first_path, "rb") as f:
+            assert f.read() == b"%PDF-1.4 first"
+        with open(second_path, "rb") as f:
+            assert f.read() == b"%PDF-1.4 second"
+
+    assert not os.path.exists(first_path)
+    assert not os.path.exists(second_path)
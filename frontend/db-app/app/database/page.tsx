@@ -7,25 +7,33 @@ import { Button } from "@/components/ui/button"
 import { Input } from "@/components/ui/input"
 
 const ITEMS_PER_PAGE = 10
+// Filtering happens server-side: name is an indexed prefix match
+const firstPageUrl = (search) =>
+  `http://localhost:8000/api/menuitems/?page_size=${ITEMS_PER_PAGE}&name=${encodeURIComponent(search)}`
 
 export default function DatabasePage() {
   const [search, setSearch] = useState('')
   const [currentPage, setCurrentPage] = useState(1)
-  
-  const { data: menuItems, isLoading } = useQuery({
-    queryKey: ['menuItems'],
-    queryFn: () => axios.get('http://localhost:8000/api/menuitems/').then(res => res.data)
+  // The API is cursor-paginated: each page links to the next/previous one
+  const [pageUrl, setPageUrl] = useState(firstPageUrl(''))
+
+  const { data: page, isLoading } = useQuery({
+    queryKey: ['menuItems', pageUrl],
+    queryFn: () => axios.get(pageUrl).then(res => res.data)
   })
 
-  const filteredItems = menuItems?.filter(item => 
-    item.name.toLowerCase().includes(search.toLowerCase())
-  )?.sort((a, b) => b.id - a.id) // Sort by newest first
+  const paginatedItems = page?.results
 
-  const totalPages = Math.ceil((filteredItems?.length || 0) / ITEMS_PER_PAGE)
-  const paginatedItems = filteredItems?.slice(
-    (currentPage - 1) * ITEMS_PER_PAGE,
-    currentPage * ITEMS_PER_PAGE
-  )
+  const searchFor = (value) => {
+    setSearch(value)
+    setPageUrl(firstPageUrl(value))
+    setCurrentPage(1)
+  }
+
+  const goTo = (url, step) => {
+    setPageUrl(url)
+    setCurrentPage(p => p + step)
+  }
 
   if (isLoading) return <div>Loading...</div>
 
@@ -38,7 +46,7 @@ export default function DatabasePage() {
           className="max-w-sm" 
           placeholder="Search menu items..."
           value={search}
-          onChange={(e) => setSearch(e.target.value)}
+          onChange={(e) => searchFor(e.target.value)}
         />
         <Button>Add New Item</Button>
       </div>
@@ -56,7 +64,7 @@ export default function DatabasePage() {
         </TableHeader>
         <TableBody>
           {paginatedItems?.map((item) => (
-            <TableRow key={item.id}>
+            <TableRow key={item.item_id}>
               <TableCell>{item.name}</TableCell>
               <TableCell>{item.section}</TableCell>
               <TableCell>{item.description}</TableCell>
@@ -74,18 +82,18 @@ export default function DatabasePage() {
       <div className="flex justify-center gap-2">
         <Button 
           variant="outline" 
-          onClick={() => setCurrentPage(p => Math.max(1, p - 1))}
-          disabled={currentPage === 1}
+          onClick={() => goTo(page.previous, -1)}
+          disabled={!page?.previous}
         >
           Previous
         </Button>
         <span className="py-2 px-4">
-          Page {currentPage} of {totalPages}
+          Page {currentPage}
         </span>
         <Button 
           variant="outline" 
-          onClick={() => setCurrentPage(p => Math.min(totalPages, p + 1))}
-          disabled={currentPage === totalPages}
+          onClick={() => goTo(page.next, 1)}
+          disabled={!page?.next}
         >
           Next
         </Button>
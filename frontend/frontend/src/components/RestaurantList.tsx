@@ -3,10 +3,22 @@ import { useQuery } from '@tanstack/react-query'
 import axios from 'axios'
 import { API_BASE_URL } from '../api/config'
 
+// The list is cursor-paginated: follow `next` until the last page
+async function fetchAllRestaurants() {
+  const restaurants: any[] = []
+  let url: string | null = `${API_BASE_URL}/api/restaurants/`
+  while (url) {
+    const res: { data: { next: string | null, results: any[] } } = await axios.get(url)
+    restaurants.push(...res.data.results)
+    url = res.data.next
+  }
+  return restaurants
+}
+
 export default function RestaurantList() {
   const { data: restaurants, isLoading } = useQuery({
     queryKey: ['restaurants'],
-    queryFn: () => axios.get(`${API_BASE_URL}/api/restaurants/`).then(res => res.data)
+    queryFn: fetchAllRestaurants
   })
 
   if (isLoading) return <div>Loading...</div>